@@ -0,0 +1,31 @@
+"""
+A synthetic method table shaped like Etsy's v2 table, for benchmarks
+that must not touch the network.
+"""
+import random
+
+
+TYPES = ['int', 'float', 'string', 'text', 'boolean', 'array(string)',
+         'array(int)', 'user_id_or_name', 'shop_id_or_name', 'color_triplet',
+         'latitude', 'longitude', 'enum(created, price, score)']
+
+
+def method_table(n=350, seed=0):
+    rnd = random.Random(seed)
+    methods = []
+    for i in range(n):
+        params = dict(('param%d' % j, rnd.choice(TYPES)) for j in range(rnd.randint(2, 14)))
+        params.update({'limit': 'int', 'offset': 'int', 'page': 'int',
+                       'resource_id': 'int'})
+        methods.append({
+            'name': 'method%d' % i,
+            'uri': '/resources%d/:resource_id/children' % i,
+            'http_method': rnd.choice(['GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE']),
+            'params': params,
+            'defaults': dict((k, None) for k in list(params)[:3]),
+            'type': 'Resource%d' % i,
+            'visibility': rnd.choice(['public', 'private']),
+            'description': 'Synthetic method number %d, with a description about '
+                           'as long as the ones in the real table.' % i,
+        })
+    return methods
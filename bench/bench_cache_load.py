@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Time to create the first API object in a process from a method cache of
+a few hundred methods, in the JSON and binary cache formats. The table
+registry is cleared before every constructor, as in a new process.
+
+    $ python bench/bench_cache_load.py [runs]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from etsy2 import _registry
+from etsy2._core import API
+from _table import method_table
+
+
+class BenchAPI(API):
+    api_url = 'http://localhost'
+    api_version = 'v2'
+
+    def get_method_table(self):
+        return method_table()
+
+
+def measure(runs, cache, method_cache_format):
+    BenchAPI('key', method_cache=cache, method_snapshot=None,
+             method_cache_format=method_cache_format)
+    best = None
+    for _ in range(runs):
+        _registry.clear()
+        start = time.perf_counter()
+        BenchAPI('key', method_cache=cache, method_snapshot=None,
+                 method_cache_format=method_cache_format)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    d = tempfile.mkdtemp()
+    cache = os.path.join(d, 'methods.v2.json')
+    try:
+        for fmt in ('json', 'binary'):
+            t = measure(runs, cache, fmt)
+            print('%-7s %8.3f ms' % (fmt, t * 1000))
+        print('sizes   json %d bytes, binary %d bytes' % (
+                os.path.getsize(cache), os.path.getsize(cache[:-5] + '.bin')))
+    finally:
+        shutil.rmtree(d)
+
+
+if __name__ == '__main__':
+    main()
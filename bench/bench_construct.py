@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Time and memory to construct an API object from a cached method table
+of a few hundred methods, with methods materialized lazily (current
+behavior) and eagerly (the old behavior).
+
+    $ python bench/bench_construct.py [instances]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from etsy2._core import API, APIMethod
+from _table import method_table
+
+
+class BenchAPI(API):
+    api_url = 'http://localhost'
+    api_version = 'v2'
+
+
+class EagerAPI(BenchAPI):
+    def _get_methods(self, method_cache):
+        BenchAPI._get_methods(self, method_cache)
+        for method in self._methods.values():
+            setattr(self, method['name'], APIMethod(self, method))
+
+
+def measure(cls, cache, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        cls('key', method_cache=cache)
+    per_call = (time.perf_counter() - start) / n
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [cls('key', method_cache=cache) for _ in range(10)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(s.size_diff for s in after.compare_to(before, 'filename')) / len(instances)
+    return per_call, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fd, cache = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(method_table(), f)
+    try:
+        for name, cls in (('eager', EagerAPI), ('lazy', BenchAPI)):
+            per_call, size = measure(cls, cache, n)
+            print('%-6s %8.3f ms/constructor  %8.1f KiB/instance' % (
+                    name, per_call * 1000, size / 1024.0))
+    finally:
+        os.unlink(cache)
+
+
+if __name__ == '__main__':
+    main()
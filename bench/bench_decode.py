@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Time and peak memory spent decoding a large findAllShopListingsActive
+page requested with includes=Images. "text+json" is how responses were
+decoded before: response.text (which makes requests guess the charset
+when the server does not name one) and then json.loads. The other rows
+decode response.content, the raw bytes, with each installed decoder.
+
+    $ python bench/bench_decode.py [listings per page] [repeats]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from etsy2._decoder import get_decoder
+
+
+def listing(i):
+    return {
+        'listing_id': 100000000 + i,
+        'state': 'active',
+        'user_id': 5000 + i,
+        'title': u'Handmade ceramic mug no. %d – glazed stoneware' % i,
+        'description': u'Wheel thrown and glazed by hand. ☕ ' * 60,
+        'price': '%d.00' % (20 + i % 30),
+        'currency_code': 'USD',
+        'quantity': i % 10,
+        'tags': ['mug', 'ceramic', 'pottery', 'handmade', 'coffee', 'gift'],
+        'materials': ['stoneware', 'glaze'],
+        'views': i * 7,
+        'num_favorers': i * 3,
+        'Images': [{
+            'listing_image_id': 200000000 + i * 10 + j,
+            'hex_code': 'A1B2C3',
+            'red': 161, 'green': 178, 'blue': 195,
+            'rank': j + 1,
+            'url_75x75': 'https://i.etsystatic.com/1/r/il/abc/%d/il_75x75.%d_%d.jpg' % (i, i, j),
+            'url_170x135': 'https://i.etsystatic.com/1/r/il/abc/%d/il_170x135.%d_%d.jpg' % (i, i, j),
+            'url_570xN': 'https://i.etsystatic.com/1/r/il/abc/%d/il_570xN.%d_%d.jpg' % (i, i, j),
+            'url_fullxfull': 'https://i.etsystatic.com/1/r/il/abc/%d/il_fullxfull.%d_%d.jpg' % (i, i, j),
+            'full_height': 1500, 'full_width': 1500,
+        } for j in range(10)],
+    }
+
+
+def response(body):
+    r = requests.Response()
+    r.status_code = 200
+    r.headers['Content-Type'] = 'application/json'
+    r._content = body
+    return r
+
+
+def measure(decode, body, repeats):
+    best = None
+    for _ in range(repeats):
+        r = response(body)
+        start = time.perf_counter()
+        decode(r)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    r = response(body)
+    tracemalloc.start()
+    data = decode(r)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del data
+    return best, peak
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    page = {'count': 50000, 'results': [listing(i) for i in range(n)],
+            'params': {'limit': n, 'offset': 0, 'includes': 'Images'},
+            'type': 'Listing', 'pagination': {}}
+    body = json.dumps(page, ensure_ascii=False).encode('utf-8')
+    print('%d listings, %.1f MB' % (n, len(body) / 1e6))
+
+    rows = [('text+json', lambda r: json.loads(r.text))]
+    for name in ('json', 'ujson', 'orjson'):
+        try:
+            loads = get_decoder(name)
+        except ImportError:
+            continue
+        rows.append(('content+%s' % name, lambda r, loads=loads: loads(r.content)))
+
+    for name, decode in rows:
+        elapsed, peak = measure(decode, body, repeats)
+        print('%-16s %8.1f ms %8.1f MB peak' % (name, elapsed * 1000, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Calls per second of a getListing-shaped method with the network stubbed
+out, with no hooks, with a hook that implements all three methods and
+does nothing, and with OpenTelemetryHook writing to a tracer whose spans
+do nothing.
+
+    $ python bench/bench_hooks.py [calls]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_invoke import BenchAPI, run
+from etsy2 import OpenTelemetryHook
+
+
+class NoopHook(object):
+    def before_send(self, call):
+        pass
+
+    def after_receive(self, call):
+        pass
+
+    def on_error(self, call, error):
+        pass
+
+
+class NoopSpan(object):
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self):
+        pass
+
+
+class NoopTracer(object):
+    def start_span(self, name, **kwargs):
+        return NoopSpan()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    setups = (
+        ('none', None),
+        ('noop', [NoopHook()]),
+        ('noop x5', [NoopHook() for _ in range(5)]),
+        ('otel', [OpenTelemetryHook(NoopTracer())]),
+    )
+    for name, hooks in setups:
+        api = BenchAPI('key', method_cache=None, hooks=hooks)
+        run(api, 1000)
+        print('%-8s %10.0f calls/s' % (name, max(run(api, n) for _ in range(3))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Time to import etsy2 in a new interpreter, from python -X importtime,
+best of several runs, with the modules that take longest (not counting
+those imported at interpreter startup). Bytecode is
+written on the first run so that later runs measure loading, not
+compiling.
+
+    $ python bench/bench_import.py [runs] [module]
+"""
+import os
+import subprocess
+import sys
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def import_times(module):
+    env = dict(os.environ, PYTHONPATH=root)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    err = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                           env=env, stderr=subprocess.PIPE).communicate()[1]
+    times = {}
+    for line in err.decode('utf-8').splitlines():
+        fields = line.split(':', 1)[-1].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            name = fields[2].strip()
+            if name == 'site':
+                # everything before this was imported at startup
+                times.clear()
+                continue
+            times[name] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    module = sys.argv[2] if len(sys.argv) > 2 else 'etsy2'
+    import_times(module)
+    best = min((import_times(module) for _ in range(runs)),
+               key=lambda times: times[module][1])
+    print('import %s: %.1f ms, %d modules' % (
+            module, best[module][1] / 1000.0, len(best)))
+    for name, (own, total) in sorted(best.items(), key=lambda i: -i[1][1])[:10]:
+        print('  %-32s %8.1f ms' % (name, total / 1000.0))
+
+
+if __name__ == '__main__':
+    main()
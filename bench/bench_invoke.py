@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Calls per second through APIMethod.invoke for a getListing-shaped
+method, with the network stubbed out. "invoke" stops at API._call,
+"full" also builds the url and decodes a canned response.
+
+    $ python bench/bench_invoke.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from etsy2._core import API
+from etsy2._result import Result
+
+
+class CannedResponse(object):
+    status_code = 200
+    headers = {}
+    url = 'http://localhost'
+    content = text = '{"count": 1, "results": [{"listing_id": 1}]}'
+
+
+class BenchAPI(API):
+    api_url = 'http://localhost'
+    api_version = 'v2'
+
+    def get_method_table(self):
+        return [{'name': 'getListing',
+                 'uri': '/listings/:listing_id',
+                 'http_method': 'GET',
+                 'params': {'listing_id': 'array(int)', 'language': 'language',
+                            'includes': 'string',
+                            'sort_on': 'enum(created, price, score)',
+                            'limit': 'int', 'offset': 'int'},
+                 'type': 'Listing',
+                 'description': 'Retrieves a Listing by id.'}]
+
+    def _get_url(self, url, http_method, data):
+        return CannedResponse()
+
+
+class InvokeOnlyAPI(BenchAPI):
+    def _call(self, spec, http_method, url, kwargs, params=None, stream=False):
+        return self.result
+
+
+def run(api, n):
+    method = api.getListing
+    start = time.perf_counter()
+    for i in range(n):
+        method(listing_id=i, sort_on='price', limit=25, offset=50)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for name, cls in (('invoke', InvokeOnlyAPI), ('full', BenchAPI)):
+        api = cls('key', method_cache=None)
+        api.result = Result('getListing', 'GET', None, {})
+        run(api, 1000)
+        print('%-7s %10.0f calls/s' % (name, run(api, n)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Calls per second of a getListing-shaped method with the network stubbed
+out, under different logging setups:
+
+    eager     - the old behaviour: every call formats its url and data
+                with %r for a log callable that drops them
+    disabled  - no log callable, 'etsy2' logger above DEBUG
+    callable  - a log callable that drops what it receives
+    debug     - 'etsy2' logger at DEBUG, written to /dev/null
+
+    $ python bench/bench_log.py [calls]
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_invoke import BenchAPI, run
+
+
+class EagerAPI(BenchAPI):
+    def _get_url(self, url, http_method, data):
+        self.log('API._get_url: url = %r' % url)
+        return BenchAPI._get_url(self, url, http_method, data)
+
+    def _finish(self, result, response):
+        self.log('API._get: http_method = %r, url = %r, data = %r' % (
+            result.http_method, result.url, None))
+        return BenchAPI._finish(self, result, response)
+
+
+def drop(msg):
+    pass
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    logger = logging.getLogger('etsy2')
+    logger.propagate = False
+    devnull = open(os.devnull, 'w')
+    logger.addHandler(logging.StreamHandler(devnull))
+
+    setups = (
+        ('eager', EagerAPI, drop, logging.WARNING),
+        ('disabled', BenchAPI, None, logging.WARNING),
+        ('callable', BenchAPI, drop, logging.WARNING),
+        ('debug', BenchAPI, None, logging.DEBUG),
+    )
+    for name, cls, log, level in setups:
+        logger.setLevel(logging.WARNING)
+        api = cls('key', method_cache=None, log=log)
+        logger.setLevel(level)
+        run(api, 1000)
+        print('%-9s %10.0f calls/s' % (name, run(api, n)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Requests per second against a local keep-alive stub server, with and
+without the pooled session owned by the API object.
+
+    $ python bench/bench_pool.py [requests]
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from etsy2._core import API
+from test.util import StubServer
+
+
+class BenchAPI(API):
+    api_version = 'v2'
+
+    def __init__(self, url):
+        self.api_url = url
+        API.__init__(self, 'key', method_cache=None)
+
+    def get_method_table(self):
+        return []
+
+
+def unpooled(url, n):
+    for _ in range(n):
+        requests.request('GET', url)
+
+
+def pooled(url, n):
+    with BenchAPI(url.rstrip('/')) as api:
+        for _ in range(n):
+            api._get_url(url, 'GET', None)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with StubServer() as server:
+        url = server.url + '/'
+        for name, f in (('requests.request', unpooled), ('API.session', pooled)):
+            start = time.perf_counter()
+            f(url, n)
+            elapsed = time.perf_counter() - start
+            print('%-18s %6d requests  %8.1f req/s' % (name, n, n / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Constructor latency of an API object in a fresh process, with the
+method table downloaded (cold), read from the method cache (warm) and
+read from the packaged snapshot. The download is stubbed out with a
+sleep of the given latency plus decoding the table.
+
+    $ python bench/bench_startup.py [runs] [latency ms]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from etsy2 import _registry, _snapshot
+from etsy2._core import API
+from _table import method_table
+
+
+latency = 0.1
+table_json = json.dumps(method_table())
+
+
+class BenchAPI(API):
+    api_url = 'http://localhost'
+    api_version = 'v2'
+
+    def get_method_table(self):
+        time.sleep(latency)
+        return json.loads(table_json)
+
+
+def measure(runs, **kwargs):
+    best = None
+    for _ in range(runs):
+        # each run is a new process as far as the table registry goes
+        _registry.clear()
+        start = time.perf_counter()
+        BenchAPI('key', **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    global latency
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else latency
+    d = tempfile.mkdtemp()
+    cache = os.path.join(d, 'methods.v2.json')
+    snapshot = os.path.join(d, 'snapshot.v2.json')
+    with open(snapshot, 'wb') as f:
+        f.write(_snapshot.encode(method_table(), 'v2'))
+    try:
+        cold = measure(runs, method_cache=None, method_snapshot=None)
+        BenchAPI('key', method_cache=cache, method_snapshot=None)
+        warm = measure(runs, method_cache=cache, method_snapshot=None)
+        snap = measure(runs, method_cache=None, method_snapshot=snapshot)
+        for name, t in (('cold', cold), ('warm', warm), ('snapshot', snap)):
+            print('%-9s %8.2f ms' % (name, t * 1000))
+    finally:
+        for fn in (cache, snapshot):
+            if os.path.exists(fn):
+                os.unlink(fn)
+        os.rmdir(d)
+
+
+if __name__ == '__main__':
+    main()
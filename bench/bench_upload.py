@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Peak memory of uploading a large file as multipart/form-data to a local
+server that discards what it receives. "before" is how uploads were sent
+before: the file read into the data dict, the dict formatted with %r for
+the log, then encoded by requests (files=...). "after" streams a
+MultipartBody. Each mode runs in its own process, so max RSS is its own.
+
+    $ python bench/bench_upload.py [megabytes]
+"""
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import requests
+from etsy2._multipart import MultipartBody
+
+
+def sink_server():
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            left = int(self.headers['Content-Length'])
+            while left:
+                left -= len(self.rfile.read(min(left, 65536)))
+            body = b'{"count": 1, "results": [1]}'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:%d/listings/1/images' % server.server_address[1]
+
+
+def upload(mode, path):
+    server, url = sink_server()
+    session = requests.Session()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        if mode == 'before':
+            data = {'image': (f.name, f.read(), 'image/jpeg'), 'rank': (None, '1')}
+            logging.getLogger('etsy2').debug('API._get: data = %r' % data)
+            response = session.post(url, files=data)
+        else:
+            body = MultipartBody([('image', f), ('rank', 1)])
+            response = session.post(url, data=body,
+                                    headers={'Content-Type': body.content_type})
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    assert response.status_code == 200
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print('%-7s %7.0f ms %8.1f MB traced peak %8.1f MB max RSS' % (
+        mode, elapsed * 1000, peak / 1e6, maxrss))
+
+
+def main():
+    if len(sys.argv) > 2:
+        return upload(sys.argv[1], sys.argv[2])
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    fd, path = tempfile.mkstemp(suffix='.jpg')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for _ in range(megabytes):
+                f.write(os.urandom(1024 * 1024))
+        print('%d MB file' % megabytes)
+        for mode in ('before', 'after'):
+            subprocess.check_call([sys.executable, __file__, mode, path])
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
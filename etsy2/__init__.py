@@ -1,5 +1,15 @@
 from ._v2 import EtsyV2 as Etsy
+from ._async import AsyncEtsyV2 as AsyncEtsy
 from .etsy_env import EtsyEnvProduction
+from ._response_cache import ResponseCache
+from ._ratelimit import RateLimiter, RateLimitExceeded
+from ._quota import SharedQuota
+from ._retry import RetryPolicy
+from ._result import Result
+from ._singleflight import SingleFlight
+from ._metrics import Metrics
+from ._hooks import OpenTelemetryHook
+from ._batch import BatchLoader
 
 
 __version__ = '0.7.0'
@@ -7,4 +17,3 @@ __author__ = 'Sean Scheetz'
 __copyright__ = 'Copyright 2010, Etsy Inc.'
 __license__ = 'GPL v3'
 __email__ = 'file_an_issue_on_github@gmail.com'
-
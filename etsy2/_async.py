@@ -0,0 +1,360 @@
+import time
+from urllib.parse import urlencode
+from ._core import API, missing
+from ._v2 import EtsyV2
+from .etsy_env import EtsyEnvProduction
+from ._paginate import Page, AsyncResults, page_offsets
+from ._ratelimit import RateLimitExceeded
+from ._result import Result
+from ._stream import AsyncResultStream
+from ._multipart import MultipartBody
+from ._log import DEBUG, WARNING
+
+
+class BodyReader(object):
+    '''
+    Feeds a MultipartBody to aiohttp a chunk at a time.
+    '''
+    def __init__(self, body):
+        self._chunks = iter(body)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+
+class AsyncResponse(object):
+    '''
+    The parts of an aiohttp response that API._decode_response needs,
+    read while the connection was still open.
+    '''
+    def __init__(self, status_code, content, url, headers):
+        self.status_code = status_code
+        self.content = content
+        self.url = url
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+class AsyncStreamResponse(object):
+    '''
+    An aiohttp response whose body has not been read yet, for
+    AsyncResultStream to read a chunk at a time.
+    '''
+    def __init__(self, response):
+        self.status_code = response.status
+        self.url = str(response.url)
+        self.headers = response.headers
+        self._response = response
+
+    def chunks(self):
+        return self._response.content.iter_chunked(AsyncResultStream.chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+class AsyncEtsyV2(EtsyV2):
+    '''
+    asyncio counterpart of EtsyV2. Every API method returns an awaitable:
+
+        async with AsyncEtsyV2(api_key=key) as etsy:
+            listing = await etsy.getListing(listing_id=1)
+
+    Arguments are type checked and urls are built exactly as in EtsyV2;
+    bad arguments raise ValueError when the method is called, before
+    anything is awaited. Requests are sent through an aiohttp connection
+    pool, and at most max_concurrency of them are in flight at once.
+    A method's stream returns an awaitable of an AsyncResultStream.
+
+    The method table is fetched synchronously when the object is
+    created, like EtsyV2 does, so create the object once and reuse it.
+    Requires aiohttp.
+    '''
+    def __init__(self, api_key='', key_file=None, method_cache=missing,
+                 etsy_env=EtsyEnvProduction(), log=None, etsy_oauth_client=None,
+                 max_concurrency=100, **kwargs):
+        self.max_concurrency = max_concurrency
+        self._async_session = None
+        self._semaphore = None
+        kwargs.setdefault('pool_maxsize', max_concurrency)
+        super(AsyncEtsyV2, self).__init__(api_key, key_file, method_cache, etsy_env,
+                                          log, etsy_oauth_client, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        '''
+        Closes the aiohttp connection pool, and the blocking one used to
+        fetch the method table.
+        '''
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+        self.close()
+
+    def get_method_table(self):
+        return API._call(self, None, 'GET', '/', {}).results
+
+    def paginate(self, method_name, page_size=100, prefetch=False, **params):
+        '''
+        asyncio version of API.paginate. Returns an async iterator over
+        every result of a method that takes limit and offset parameters:
+
+            async for listing in etsy.paginate('findAllShopListingsActive',
+                                               shop_id=shop_id):
+                ...
+        '''
+        method = getattr(self, method_name)
+        offset = params.pop('offset', 0)
+
+        async def fetch(limit, offset):
+            result = await method.fetch(limit=limit, offset=offset, **params)
+            return result.results, result.count
+
+        return AsyncResults(fetch, page_size, offset, prefetch)
+
+    async def fetch_pages(self, method_name, page_size=100, ordered=True, **params):
+        '''
+        Coroutine version of API.fetch_pages. Fetches the first page, then
+        every remaining page concurrently (bounded by max_concurrency), and
+        returns a list of Page objects in offset order, or in the order
+        they arrived if ordered is False. A failed page has its error set.
+        '''
+        method = getattr(self, method_name)
+        offset = params.pop('offset', 0)
+
+        first = await method.fetch(limit=page_size, offset=offset, **params)
+        pages = [Page(offset, first.results)]
+        offsets = page_offsets(offset, first.results, first.count, page_size)
+
+        async def fetch_page(offset):
+            try:
+                return Page(offset, await method(limit=page_size, offset=offset, **params))
+            except Exception as e:
+                return Page(offset, error=e)
+
+        import asyncio
+        fetches = [fetch_page(o) for o in offsets]
+        if ordered:
+            pages.extend(await asyncio.gather(*fetches))
+        else:
+            for future in asyncio.as_completed(fetches):
+                pages.append(await future)
+        return pages
+
+    def _client_session(self):
+        if self._async_session is None:
+            import asyncio
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_connections * self.pool_maxsize,
+                limit_per_host=self.pool_maxsize)
+            self._async_session = aiohttp.ClientSession(
+                connector=connector, timeout=self._client_timeout(aiohttp))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_session
+
+    def _client_timeout(self, aiohttp):
+        if self.timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(total=None, connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=None, connect=self.timeout,
+                                     sock_read=self.timeout)
+
+    async def _results(self, result):
+        return (await result).results
+
+    async def _cached_get(self, spec, url, params, kwargs):
+        cache = self.response_cache
+        if spec['http_method'] != 'GET':
+            result = await self._call(spec, spec['http_method'], url, kwargs, params)
+            cache.invalidate(url)
+            return result
+
+        key = cache.key(spec['name'], params, self._auth_identity())
+        data = cache.get(key)
+        if data is not missing:
+            return self._cached_result(spec, params, data)
+        if self.metrics is not None:
+            self.metrics.record_cache(spec['name'], False)
+
+        result = await self._call(spec, 'GET', url, kwargs, params)
+        cache.set(key, result.data, url, result.size)
+        return result
+
+    async def _call(self, spec, http_method, url, kwargs, params=None, stream=False):
+        method_name = spec['name'] if spec else None
+        result = Result(method_name, http_method, None,
+                        dict(kwargs) if params is None else params)
+        url, data = self._prepare_request(http_method, url, kwargs)
+        result.url = url
+        self._state.set(result)
+        flight = self.single_flight
+        if flight is not None and http_method == 'GET' and not stream:
+            other, shared = await flight.do_async(
+                (url, self._auth_identity()),
+                lambda: self._dispatch_async(spec, result, data))
+            if shared:
+                result.share(other)
+            return result
+        return await self._dispatch_async(spec, result, data, stream)
+
+    async def _dispatch_async(self, spec, result, data, stream=False):
+        hooks = self.hooks
+        if hooks is None:
+            return await self._exchange_async(spec, result, data, stream)
+
+        call = hooks.before_send(self, spec, result, data)
+        try:
+            value = await self._exchange_async(spec, result, call.data, stream)
+        except Exception as e:
+            hooks.on_error(call, e)
+            raise
+        hooks.after_receive(call)
+        return value
+
+    async def _exchange_async(self, spec, result, data, stream=False):
+        method_name, http_method, url = result.method_name, result.http_method, result.url
+        policy = self.retry_policy
+        if policy is not None:
+            policy.record_request(method_name)
+
+        import asyncio
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            if self.quota is not None:
+                await self._acquire_quota()
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            sent = time.perf_counter()
+            try:
+                response = await self._get_url_async(url, http_method, data, stream)
+            except self._network_errors_async() as e:
+                if self.metrics is not None:
+                    self.metrics.record_error(method_name)
+                delay = policy and policy.retry_delay(http_method, method_name, attempt)
+                if delay is None:
+                    raise
+                if self.events.enabled(WARNING):
+                    self.events.event(WARNING, 'retry', method=method_name, url=url,
+                                      attempt=attempt, delay=delay, error=repr(e))
+            else:
+                if self.metrics is not None:
+                    self._record_response(method_name, response, data,
+                                          time.perf_counter() - sent, stream)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response.headers)
+                delay = policy and policy.retry_delay(http_method, method_name, attempt, response)
+                if delay is None:
+                    break
+                if stream:
+                    response.close()
+                if self.events.enabled(WARNING):
+                    self.events.event(WARNING, 'retry', method=method_name, url=url,
+                                      attempt=attempt, delay=delay,
+                                      status=response.status_code)
+            if self.metrics is not None:
+                self.metrics.record_retry(method_name)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        result.elapsed = time.perf_counter() - start
+        if self.events.enabled(DEBUG):
+            self._log_request(spec, result, response, attempt, stream)
+
+        if stream:
+            result.status_code = response.status_code
+            result.headers = response.headers
+            return AsyncResultStream(result, response.chunks(), response.close)
+        return self._finish(result, response)
+
+    def _network_errors_async(self):
+        """
+        Exceptions raised by _get_url_async for failures a retry might
+        fix. The sync _get_url, still used to download the method table,
+        raises those of API._network_errors.
+        """
+        import asyncio
+        import aiohttp
+        return (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+    async def _acquire_quota(self):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        waited = 0
+        while True:
+            # reserve may wait up to a minute for the quota file's lock,
+            # so it runs on the loop's default executor
+            wait = await loop.run_in_executor(None, self.quota.reserve)
+            if not wait:
+                return
+            if self.quota.max_wait is not None and waited + wait > self.quota.max_wait:
+                raise RateLimitExceeded(
+                    'Shared quota used up; next request allowed in %.1f seconds.' % wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def _get_url_async(self, url, http_method, data, stream=False):
+        session = self._client_session()
+        url, headers, body = self._encode_body(url, http_method, data)
+        async with self._semaphore:
+            if stream:
+                # the body is read after the semaphore is released, at the
+                # pace the caller iterates over the stream
+                response = await session.request(http_method, url, data=body,
+                                                 headers=headers)
+                return AsyncStreamResponse(response)
+            async with session.request(http_method, url, data=body,
+                                       headers=headers) as response:
+                content = await response.read()
+                return AsyncResponse(response.status, content, str(response.url),
+                                     response.headers)
+
+    def _encode_body(self, url, http_method, data):
+        '''
+        Turns the data dict built by _prepare_request into an aiohttp
+        request body, encoded the same way EtsyV2 sends it: multipart for
+        oauth POSTs, form-urlencoded otherwise. Signs the request when an
+        oauth client is configured; multipart bodies are not part of the
+        signature.
+        '''
+        headers = {}
+        body = None
+        if (isinstance(data, dict) and http_method == 'POST' and
+                self.etsy_oauth_client is not None):
+            data = MultipartBody([(name, value[1]) for name, value in data.items()])
+        if isinstance(data, MultipartBody):
+            body = BodyReader(data)
+            headers['Content-Type'] = data.content_type
+            headers['Content-Length'] = str(len(data))
+            multipart = True
+        else:
+            if data is not None:
+                body = urlencode([(name, value[1]) for name, value in data.items()])
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            multipart = False
+
+        if self.etsy_oauth_client is not None:
+            url, headers, signed_body = self.etsy_oauth_client.sign(
+                url, http_method, None if multipart else body, headers)
+            if not multipart:
+                body = signed_body
+        return url, headers, body
@@ -0,0 +1,278 @@
+import threading
+
+
+class Pending(object):
+    """
+    The eventual result of one key loaded by a thread.
+    """
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+    def set(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self.done.set()
+
+
+    def get(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+
+class Batch(object):
+    __slots__ = ('keys', 'pending', 'closed', 'full')
+
+    def __init__(self):
+        self.keys = []
+        self.pending = {}
+        self.closed = False
+        self.full = threading.Event()
+
+
+    def add(self, key, make):
+        p = self.pending.get(key)
+        if p is None:
+            p = self.pending[key] = make()
+            self.keys.append(key)
+        return p
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+
+class BatchLoader(object):
+    """
+    Merges calls that each load one item by id into batched calls, for
+    methods that accept a comma separated list of up to 100 ids, such
+    as getListing, getUser and getShop:
+
+        listings = BatchLoader(api, 'getListing', 'listing_id', includes='Images')
+
+        # on many threads at once
+        listing = listings.load(listing_id)
+
+        # or in asyncio tasks, with an AsyncEtsy
+        listing = await listings.load_async(listing_id)
+
+    Ids asked for within window seconds of each other, from any thread
+    (or any task on one event loop), are sent as one call of at most
+    max_batch ids. Each caller gets the result whose key field matches
+    the id it asked for. An id with no matching result raises KeyError
+    for its caller only. If a batched call fails, its ids are requested
+    one at a time, so that one bad id only fails its own caller.
+
+    Results are matched to ids by comparing str() of both, so ids may be
+    given as ints or strings. Methods like getUser also accept names,
+    which only match if key picks the field holding the name.
+    """
+    def __init__(self, api, method_name, param, key=None, max_batch=100,
+                 window=0.005, split_on_error=True, **params):
+        """
+        Parameters:
+            api          - The API object to make calls with.
+            method_name  - Name of the API method to call.
+            param        - The method's parameter that takes the ids.
+            key          - Name of the result field that holds the id,
+                           or a function returning it from a result.
+                           Defaults to param.
+            max_batch    - Most ids sent in one call.
+            window       - Seconds to wait for more ids before sending
+                           a batch that is not full.
+            split_on_error - If True, a batch whose call fails is
+                           retried one id at a time.
+            params       - Other parameters passed with every call.
+        """
+        self.api = api
+        self.method_name = method_name
+        self.param = param
+        if key is None:
+            key = param
+        self.key = key if callable(key) else (lambda result: result[key])
+        self.max_batch = max_batch
+        self.window = window
+        self.split_on_error = split_on_error
+        self.params = params
+
+        self._lock = threading.Lock()
+        self._batch = None
+        self._async_batches = {}
+        self.calls = 0
+
+
+    def _kwargs(self, keys):
+        kwargs = dict(self.params)
+        kwargs[self.param] = list(keys)
+        return kwargs
+
+
+    def _split(self, keys, results):
+        """
+        Returns a dict of each key to its result, or to a KeyError if no
+        result has that key.
+        """
+        by_key = {}
+        for result in results:
+            by_key[str(self.key(result))] = result
+        out = {}
+        for k in keys:
+            found = by_key.get(str(k))
+            out[k] = found if found is not None else KeyError(
+                'No %s result for %s=%s.' % (self.method_name, self.param, k))
+        return out
+
+
+    def load(self, key):
+        """
+        Returns the result for key, waiting for the batch it is sent in.
+        """
+        entry = self._enqueue(key)
+        self._settle(*entry[1:])
+        return entry[0].get()
+
+
+    def load_many(self, keys):
+        """
+        Returns the results for keys, in order. Raises the first error.
+        The last batch is sent as soon as every key has been queued,
+        without waiting out the window.
+        """
+        entries = [self._enqueue(k) for k in keys]
+        for entry in entries:
+            self._settle(*entry[1:], wait=False)
+        return [entry[0].get() for entry in entries]
+
+
+    def _enqueue(self, key):
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = Batch()
+            pending = batch.add(key, Pending)
+            full = len(batch) >= self.max_batch
+            if full:
+                batch.closed = True
+                self._batch = None
+        if full:
+            batch.full.set()
+        return pending, batch, leader, full
+
+
+    def _settle(self, batch, leader, full, wait=True):
+        """
+        Sends batch if this caller filled it, or if it started it and no
+        one else filled it within the window (or at once, if wait is
+        False).
+        """
+        if not full:
+            if not leader:
+                return
+            if wait:
+                batch.full.wait(self.window)
+            with self._lock:
+                if batch.closed:
+                    return
+                batch.closed = True
+                if self._batch is batch:
+                    self._batch = None
+        self._run(batch)
+
+
+    def _run(self, batch):
+        method = getattr(self.api, self.method_name)
+        try:
+            try:
+                self.calls += 1
+                found = self._split(batch.keys, method(**self._kwargs(batch.keys)))
+            except Exception as e:
+                if not self.split_on_error or len(batch) == 1:
+                    found = dict((k, e) for k in batch.keys)
+                else:
+                    found = {}
+                    for k in batch.keys:
+                        try:
+                            self.calls += 1
+                            found.update(self._split([k], method(**self._kwargs([k]))))
+                        except Exception as e:
+                            found[k] = e
+            for k, p in batch.pending.items():
+                value = found[k]
+                if isinstance(value, Exception):
+                    p.set(error=value)
+                else:
+                    p.set(value)
+        finally:
+            for p in batch.pending.values():
+                if not p.done.is_set():
+                    p.set(error=RuntimeError('Batch was not sent.'))
+
+
+    async def load_async(self, key):
+        """
+        Coroutine version of load, for use with AsyncEtsy.
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        batch = self._async_batches.get(loop)
+        if batch is None:
+            batch = self._async_batches[loop] = Batch()
+            loop.call_later(self.window, self._flush_async, loop, batch)
+        future = batch.add(key, loop.create_future)
+        if len(batch) >= self.max_batch:
+            self._flush_async(loop, batch)
+        return await asyncio.shield(future)
+
+
+    async def load_many_async(self, keys):
+        import asyncio
+        return await asyncio.gather(*[self.load_async(k) for k in keys])
+
+
+    def _flush_async(self, loop, batch):
+        if batch.closed:
+            return
+        batch.closed = True
+        if self._async_batches.get(loop) is batch:
+            del self._async_batches[loop]
+        loop.create_task(self._run_async(batch))
+
+
+    async def _run_async(self, batch):
+        method = getattr(self.api, self.method_name)
+        try:
+            try:
+                self.calls += 1
+                found = self._split(batch.keys, await method(**self._kwargs(batch.keys)))
+            except Exception as e:
+                if not self.split_on_error or len(batch) == 1:
+                    found = dict((k, e) for k in batch.keys)
+                else:
+                    found = {}
+                    for k in batch.keys:
+                        try:
+                            self.calls += 1
+                            found.update(self._split([k], await method(**self._kwargs([k]))))
+                        except Exception as e:
+                            found[k] = e
+            for k, future in batch.pending.items():
+                value = found[k]
+                if future.done():
+                    continue
+                if isinstance(value, Exception):
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+        finally:
+            for future in batch.pending.values():
+                if not future.done():
+                    future.cancel()
@@ -0,0 +1,55 @@
+"""
+The binary method table cache format: a one line header, then the list
+of method specs in marshal format, which loads several times faster
+than JSON.
+
+The header names the format version, the marshal version and the digest
+of the JSON encoding of the same table, so that a table has the same
+identity in the table registry whichever format it was read from. A
+file with any other header is ignored and the JSON cache used instead.
+
+Like pickle, marshal must not be used to load untrusted data, so the
+method table cache only keeps a binary copy outside the shared temp
+directory.
+"""
+import marshal
+
+
+magic = b'etsy2-methods'
+format_version = 1
+
+
+def binary_file(json_file):
+    """
+    The binary cache file kept next to a JSON cache file.
+    """
+    base = json_file
+    if json_file.endswith('.json'):
+        base = json_file[:-len('.json')]
+    return base + '.bin'
+
+
+def encode(methods, digest):
+    header = b'%s %d %d %s\n' % (magic, format_version, marshal.version,
+                                 digest.encode('ascii'))
+    return header + marshal.dumps(methods)
+
+
+def read_header(f):
+    """
+    Reads the header of an open binary cache file. Returns the table
+    digest, or None if the file is not in a format this version reads.
+    """
+    fields = f.readline(256).split()
+    if (len(fields) != 4 or fields[0] != magic or
+            fields[1] != str(format_version).encode('ascii') or
+            fields[2] != str(marshal.version).encode('ascii')):
+        return None
+    return fields[3].decode('ascii')
+
+
+def decode(payload):
+    methods = marshal.loads(payload)
+    if not isinstance(methods, list):
+        raise ValueError('Binary method table cache does not hold a table.')
+    return methods
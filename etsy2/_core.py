@@ -2,11 +2,17 @@ from __future__ import with_statement
 import json
 from urllib.parse import urlencode, quote
 import os
-import re
-import tempfile
-import mimetypes
 import time
-import requests
+import threading
+from ._paginate import iter_pages, fan_out
+from . import _registry, _snapshot, _bincache
+from ._result import Result, CallState
+from ._decoder import get_decoder
+from ._stream import ResultStream
+from ._multipart import MultipartBody
+from ._log import EventLog, DEBUG, WARNING
+from ._hooks import Hooks
+from ._singleflight import SingleFlight
 
 
 missing = object()
@@ -15,50 +21,81 @@ missing = object()
 
 
 class TypeChecker(object):
+    """
+    Validates parameter values against the types in the method table
+    and converts them to the form Etsy expects. See
+    https://www.etsy.com/developers/documentation/getting_started/api_basics#section_parameter_types
+
+    A checker takes a value and returns an (ok, converted) tuple.
+    Checkers are compiled once per type string and cached. Types this
+    class does not know are not checked.
+    """
+    color_patterns = None
+
     def __init__(self):
         self.checkers = {
             'int': self.check_int,
             'float': self.check_float,
             'string': self.check_string,
-            'boolean': self.check_boolean
+            'text': self.check_string,
+            'boolean': self.check_boolean,
+            'user_id_or_name': self.check_id_or_name,
+            'shop_id_or_name': self.check_id_or_name,
+            'team_id_or_name': self.check_id_or_name,
+            'color_triplet': self.check_color_triplet,
+            'color_wiggle': self.check_color_wiggle,
+            'latitude': self.check_latitude,
+            'longitude': self.check_longitude,
+            'image': self.check_file,
+            'imagefile': self.check_file,
             }
 
 
-    def __call__(self, method, **kwargs):
-        params = method['params']
-        for k, v in kwargs.items():
-            if k == 'includes': continue
-
-            if k not in params:
-                raise ValueError('Unexpected argument: %s=%s' % (k, v))
-
-            t = params[k]
-            checker = self.checkers.get(t, None) or self.compile(t)
-            ok, converted = checker(v)
-            if not ok:
-                raise ValueError(
-                    "Bad value for parameter %s of type '%s' - %s" % (k, t, v))
-            kwargs[k] = converted
-
-
     def compile(self, t):
         if t.startswith('enum'):
             f = self.compile_enum(t)
+        elif t.startswith('array(') and t.endswith(')'):
+            f = self.compile_array(t)
         else:
-            # TODO write checkers for complex etsy types
-            # https://www.etsy.com/developers/documentation/getting_started/api_basics#section_parameter_types
             f = self.always_ok
         self.checkers[t] = f
         return f
 
 
+    def compile_array(self, t):
+        check_item = self.checker(t[6:-1].strip())
+        def check_array(value):
+            if not isinstance(value, (list, tuple, set, frozenset)):
+                # a single item, or items already joined by the caller
+                if isinstance(value, str):
+                    return True, value
+                ok, converted = check_item(value)
+                return ok, str(converted)
+            items = []
+            for item in value:
+                ok, converted = check_item(item)
+                if not ok:
+                    return False, value
+                items.append(str(converted))
+            return True, ','.join(items)
+        return check_array
+
+
     def compile_enum(self, t):
-        terms = [x.strip() for x in t[5:-1].split(',')]
+        terms = frozenset(x.strip() for x in t[5:-1].split(','))
         def check_enum(value):
-            return (value in terms), value
+            try:
+                return (value in terms), value
+            except TypeError:
+                # unhashable values are never enum members
+                return False, value
         return check_enum
 
 
+    def checker(self, t):
+        return self.checkers.get(t, None) or self.compile(t)
+
+
     def always_ok(self, value):
         return True, value
 
@@ -81,12 +118,109 @@ class TypeChecker(object):
         return isinstance(value, bool), value
 
 
+    def check_id_or_name(self, value):
+        if isinstance(value, int):
+            return not isinstance(value, bool), value
+        return isinstance(value, str) and value != '', value
+
+
+    def check_color_triplet(self, value):
+        if isinstance(value, (list, tuple)):
+            ok = (len(value) == 3 and
+                  all(isinstance(x, int) and 0 <= x <= 255 for x in value))
+            return ok, ','.join(str(x) for x in value) if ok else value
+        if not isinstance(value, str):
+            return False, value
+        patterns = TypeChecker.color_patterns
+        if patterns is None:
+            # compiled on first use, so that importing etsy2 does not need re
+            import re
+            patterns = TypeChecker.color_patterns = tuple(re.compile(p) for p in (
+                r'^#?[0-9a-fA-F]{6}$',
+                r'^\s*\d{1,3}\s*,\s*\d{1,3}\s*,\s*\d{1,3}\s*$',
+                r'^\s*\d{1,3}\s*;\s*\d{1,3}\s*;\s*\d{1,3}\s*$'))
+        return any(p.match(value) for p in patterns), value
+
+
+    def check_color_wiggle(self, value):
+        return isinstance(value, int) and 0 <= value <= 30, value
+
+
+    def check_latitude(self, value):
+        return self.check_float(value)[0] and -90 <= value <= 90, value
+
+
+    def check_longitude(self, value):
+        return self.check_float(value)[0] and -180 <= value <= 180, value
+
+
+    def check_file(self, value):
+        return hasattr(value, 'read'), value
+
+
+# compiled checkers only depend on the type string, so every API object
+# shares them
+shared_type_checker = TypeChecker()
+
+
+
+
+class RequestPlan(object):
+    """
+    Everything about a method that does not change between calls,
+    worked out once and shared by every API object using the method:
+    the uri as a %-format template, the names of the parameters it
+    takes from the path, and a checker for every parameter.
+    """
+    def __init__(self, spec, type_checker):
+        self.spec = spec
+        segments = spec['uri'].replace('%', '%%').split('/')
+        self.path_params = tuple(s[1:] for s in segments if s.startswith(':'))
+        self.uri_template = '/'.join(
+            '%s' if s.startswith(':') else s for s in segments)
+        self.checkers = dict((name, (t, type_checker.checker(t)))
+                             for name, t in spec['params'].items())
+
+
+    def check(self, name, value):
+        """
+        Returns value converted for sending, or raises ValueError if
+        the method does not take it.
+        """
+        try:
+            t, checker = self.checkers[name]
+        except KeyError:
+            if name == 'includes':
+                return value
+            raise ValueError('Unexpected argument: %s=%s' % (name, value))
+        ok, converted = checker(value)
+        if not ok:
+            raise ValueError(
+                "Bad value for parameter %s of type '%s' - %s" % (name, t, value))
+        return converted
+
+
+    def validate(self, params):
+        """
+        Checks a complete set of arguments for a call. Returns them
+        converted for sending, or raises ValueError as the call would.
+        """
+        for name in self.path_params:
+            if name not in params:
+                raise ValueError("Required argument '%s' not provided." % name)
+        check = self.check
+        return dict((name, check(name, value)) for name, value in params.items())
+
+
+
+
 class APIMethod(object):
     def __init__(self, api, spec):
         """
         Parameters:
             api          - API object that this method is associated with.
-            spec         - dict with the method specification; e.g.:
+            spec         - mapping with the method specification, as
+                           found in api.method_table; e.g.:
 
               {'name': 'createListing', 'uri': '/listings', 'visibility':
               'private', 'http_method': 'POST', 'params': {'description':
@@ -103,12 +237,6 @@ class APIMethod(object):
         self.__doc__ = self.spec['description']
         self.compiled = False
 
-        # HACK: etsy api metadata isn't correct for submitTracking.
-        # We patch the correct data here.
-        if self.spec['name'] == 'submitTracking':
-            self.spec['params']['shop_id'] = 'shop_id_or_name'
-            self.spec['params']['receipt_id'] = 'int'
-
 
     def __call__(self, **kwargs):
         if not self.compiled:
@@ -117,41 +245,141 @@ class APIMethod(object):
 
 
     def compile(self):
-        uri = self.spec['uri']
-        self.uri_params = [uri_param for uri_param in uri.split('/') if uri_param.startswith(':')]
+        # plans are shared through the method table when there is one
+        table = getattr(self.api, 'method_table', None)
+        plans = table.plans if table is not None else {}
+        plan = plans.get(self.spec['name'])
+        if plan is None or plan.spec is not self.spec:
+            plan = plans[self.spec['name']] = RequestPlan(self.spec, self.type_checker)
+        self.plan = plan
+        self.uri_params = [':' + p for p in plan.path_params]
         self.compiled = True
 
 
+    def validate(self, **kwargs):
+        """
+        Checks arguments without calling the method. Returns them
+        converted for sending, or raises ValueError as a call would.
+        """
+        if not self.compiled:
+            self.compile()
+        return self.plan.validate(kwargs)
+
+
+    def validate_many(self, params_list):
+        """
+        Checks many sets of arguments at once, e.g. every row of a bulk
+        job before any of it is sent. Returns a list with, for each dict
+        in params_list, the ValueError it fails with or None if it is
+        valid.
+        """
+        if not self.compiled:
+            self.compile()
+        validate = self.plan.validate
+        errors = []
+        for params in params_list:
+            try:
+                validate(params)
+                errors.append(None)
+            except ValueError as e:
+                errors.append(e)
+        return errors
+
+
+    def fetch(self, **kwargs):
+        """
+        Calls the method like __call__, but returns a Result holding the
+        count, pagination, status, headers and timing of the call along
+        with its results.
+        """
+        if not self.compiled:
+            self.compile()
+        return self._send(kwargs)
+
+
+    def stream(self, **kwargs):
+        """
+        Calls the method and returns a ResultStream, which yields the
+        results one at a time as they are parsed from the response, so
+        that the whole response is never held in memory at once:
+
+            for listing in api.findAllShopListingsActive.stream(
+                    shop_id=1, limit=100, includes='Images,Inventory'):
+                save(listing)
+
+        Streamed calls are never served from or saved to a ResponseCache.
+        With an AsyncEtsy, returns an awaitable of an AsyncResultStream.
+        """
+        if not self.compiled:
+            self.compile()
+        return self._send(kwargs, stream=True)
+
+
     def invoke(self, **kwargs):
+        return self.api._results(self._send(kwargs))
+
+
+    def _send(self, kwargs, stream=False):
+        plan = self.plan
         ps = {}
-        for p in self.uri_params:
-            # remove the starting ":" from the param
-            kwarg_key = p[1:]
-            if p[1:] not in kwargs:
-                raise ValueError("Required argument '%s' not provided." % kwarg_key)
-            # need to remove : from ps key as weel so it can be used in type_checker
-            ps[kwarg_key] = kwargs[kwarg_key]
-            del kwargs[kwarg_key]
+        for name in plan.path_params:
+            if name not in kwargs:
+                raise ValueError("Required argument '%s' not provided." % name)
+            ps[name] = kwargs.pop(name)
 
-        self.type_checker(self.spec, **ps)
-        self.type_checker(self.spec, **kwargs)
+        check = plan.check
+        path_values = tuple(quote(str(check(name, ps[name])), safe='/,')
+                            for name in plan.path_params)
+        for name, value in kwargs.items():
+            kwargs[name] = check(name, value)
 
-        applied_url = self.spec['uri']
-        for key, value in ps.items():
-            applied_url = applied_url.replace(":" + key, quote(str(value)))
-        return self.api._get(self.spec['http_method'], applied_url, **kwargs)
+        applied_url = plan.uri_template % path_values
+        ps.update(kwargs)
+        if stream:
+            return self.api._call(self.spec, self.spec['http_method'], applied_url,
+                                  kwargs, ps, stream=True)
+        if self.api.response_cache is not None:
+            return self.api._cached_get(self.spec, applied_url, ps, kwargs)
+        return self.api._call(self.spec, self.spec['http_method'], applied_url, kwargs, ps)
 
 
 
 
 class MethodTableCache(object):
+    """
+    The method table cache file. A cache older than max_age is still
+    used while it is less than max_age + max_stale old, but is marked
+    stale so that the API object refreshes it on a background thread.
+    Only one process refreshes a stale cache at a time; the others see
+    its lock file and keep using the stale table. The file is replaced
+    atomically, and only if the table has changed.
+
+    With format='binary', a binary copy of the table is kept next to the
+    JSON file and read instead of it when its format is one this version
+    reads; see _bincache. Since any user can write to the shared temp
+    directory and marshal must not load untrusted data, no binary copy is
+    kept for a cache file there.
+    """
     max_age = 60*60*24
+    max_stale = 60*60*24*7
+    lock_timeout = 60
 
-    def __init__(self, api, method_cache):
+    def __init__(self, api, method_cache, method_snapshot=None, format='json'):
+        if format not in ('json', 'binary'):
+            raise ValueError("Method cache format must be 'json' or 'binary'.")
         self.api = api
         self.filename = self.resolve_file(method_cache)
+        self.binary_file = None
+        if (format == 'binary' and self.filename is not None and
+                not self.in_temp_dir(self.filename)):
+            self.binary_file = _bincache.binary_file(self.filename)
+        self.snapshot_file = method_snapshot
         self.used_cache = False
+        self.used_snapshot = False
         self.wrote_cache = False
+        self.stale = False
+        self.digest = None
+        self.binary_digest = None
 
 
     def resolve_file(self, method_cache):
@@ -166,10 +394,20 @@ class MethodTableCache(object):
 
     def default_file(self):
         etsy_home = self.etsy_home()
-        d = etsy_home if os.path.isdir(etsy_home) else tempfile.gettempdir()
+        if os.path.isdir(etsy_home):
+            d = etsy_home
+        else:
+            import tempfile
+            d = tempfile.gettempdir()
         return os.path.join(d, 'methods.%s.json' % self.api.api_version)
 
 
+    def in_temp_dir(self, filename):
+        import tempfile
+        d = os.path.dirname(os.path.realpath(filename))
+        return d == os.path.realpath(tempfile.gettempdir())
+
+
     def get(self):
         ms = self.get_cached()
         if not ms:
@@ -178,34 +416,263 @@ class MethodTableCache(object):
         return ms
 
 
+    def get_table(self):
+        """
+        Returns the shared MethodTable for this api. The cache file is
+        only parsed if no other API object in this process has already
+        loaded a table with the same contents.
+        """
+        found = self.read_binary()
+        if found is not None:
+            self.digest, payload = found
+            return _registry.get_table(self.api.api_url, self.api.api_version,
+                                       self.digest, lambda: self.load_binary(payload))
+        raw = self.read_cached()
+        if raw is not None:
+            load = lambda: self.load_json(raw)
+        else:
+            raw = self.read_snapshot()
+            if raw is not None:
+                load = lambda: _snapshot.decode(raw, self.api.api_version)
+            else:
+                return self.refresh()
+        return _registry.get_table(self.api.api_url, self.api.api_version,
+                                   _registry.digest(raw), load)
+
+
+    def refresh(self):
+        """
+        Downloads the live method table and caches it. Returns its shared
+        MethodTable.
+        """
+        ms = self.api.get_method_table()
+        self.cache(ms)
+        return _registry.get_table(self.api.api_url, self.api.api_version,
+                                   self.digest, lambda: ms)
+
+
+    def revalidate(self):
+        """
+        Refreshes the cache unless another process is already doing so.
+        Returns the new MethodTable, or None if the cache was locked.
+        If the table in use was stale, and another process has refreshed
+        the cache since it was read, the cache is read instead.
+        """
+        if not self.lock():
+            self.api.log('Method table is being refreshed by another process.')
+            return None
+        try:
+            if (self.stale or self.used_snapshot) and self.fresh():
+                self.api.log('Method table was refreshed by another process.')
+                self.stale = False
+                return self.get_table()
+            return self.refresh()
+        finally:
+            self.unlock()
+
+
+    def fresh(self):
+        """
+        Returns whether the cache file exists and is less than max_age old.
+        """
+        if self.filename is None:
+            return False
+        try:
+            return time.time() - os.stat(self.filename).st_mtime <= self.max_age
+        except FileNotFoundError:
+            return False
+
+
+    def lock_file(self):
+        return self.filename + '.lock'
+
+
+    def lock(self):
+        """
+        Creates the lock file. Returns False if another process holds it.
+        A lock older than lock_timeout was left by a process that died,
+        and is taken over.
+        """
+        if self.filename is None:
+            return True
+        fn = self.lock_file()
+        for _ in range(2):
+            try:
+                fd = os.open(fn, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(fn).st_mtime < self.lock_timeout:
+                        return False
+                    os.unlink(fn)
+                except FileNotFoundError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode('ascii'))
+            os.close(fd)
+            return True
+        return False
+
+
+    def unlock(self):
+        if self.filename is None:
+            return
+        try:
+            os.unlink(self.lock_file())
+        except FileNotFoundError:
+            pass
+
+
     def get_cached(self):
+        raw = self.read_cached()
+        if raw is None:
+            return None
+        return json.loads(raw.decode('utf-8'))
+
+
+    def read_cached(self):
+        """
+        Returns the encoded contents of the cache file, or None if there
+        is no usable cache.
+        """
         if self.filename is None or not os.path.isfile(self.filename):
             self.api.log('Not using cached method table.')
             return None
-        if time.time() - os.stat(self.filename).st_mtime > self.max_age:
-            self.api.log('Method table too old.')
+        if not self.usable(self.filename):
             return None
-        with open(self.filename, 'r') as f:
+        with open(self.filename, 'rb') as f:
             self.used_cache = True
             self.api.log('Reading method table cache: %s' % self.filename)
-            return json.loads(f.read())
+            raw = f.read()
+        self.digest = _registry.digest(raw)
+        return raw
+
+
+    def usable(self, filename):
+        """
+        Returns whether a cache file is new enough to use. Marks the cache
+        stale if it is older than max_age.
+        """
+        age = time.time() - os.stat(filename).st_mtime
+        if age > self.max_age:
+            self.api.log('Method table too old.')
+            if age > self.max_age + self.max_stale:
+                return False
+            self.stale = True
+        return True
+
+
+    def read_binary(self):
+        """
+        Returns the digest and encoded methods from the binary cache file,
+        or None if there is no usable one. The binary copy is not used if
+        the JSON file is missing or has been written since, e.g. by a
+        process using the JSON format only.
+        """
+        if self.binary_file is None or not os.path.isfile(self.binary_file):
+            return None
+        if not os.path.isfile(self.filename):
+            return None
+        if os.stat(self.filename).st_mtime > os.stat(self.binary_file).st_mtime:
+            self.api.log('Ignoring binary method table cache older than %s'
+                         % self.filename)
+            return None
+        if not self.usable(self.binary_file):
+            return None
+        with open(self.binary_file, 'rb') as f:
+            digest = _bincache.read_header(f)
+            if digest is None:
+                self.api.log('Ignoring binary method table cache in another '
+                             'format: %s' % self.binary_file)
+                return None
+            payload = f.read()
+        self.used_cache = True
+        self.binary_digest = digest
+        self.api.log('Reading method table cache: %s' % self.binary_file)
+        return digest, payload
+
+
+    def load_json(self, raw):
+        ms = json.loads(raw.decode('utf-8'))
+        if self.binary_file is not None and self.binary_digest != self.digest:
+            # so that the next process can read the binary copy
+            try:
+                self.replace(self.binary_file, _bincache.encode(ms, self.digest))
+            except OSError as e:
+                self.api.log('Could not write method table cache: %s' % e)
+            else:
+                self.binary_digest = self.digest
+                self.api.log('Wrote method table cache: %s' % self.binary_file)
+        return ms
+
+
+    def load_binary(self, payload):
+        try:
+            return _bincache.decode(payload)
+        except (ValueError, EOFError, TypeError):
+            self.api.log('Binary method table cache is damaged: %s' % self.binary_file)
+            return self.get_cached() or self.api.get_method_table()
+
+
+    def read_snapshot(self):
+        """
+        Returns the encoded method table snapshot in snapshot_file, or
+        None if there is none.
+        """
+        if self.snapshot_file is None or not os.path.isfile(self.snapshot_file):
+            return None
+        with open(self.snapshot_file, 'rb') as f:
+            self.used_snapshot = True
+            self.api.log('Reading method table snapshot: %s' % self.snapshot_file)
+            return f.read()
 
 
     def cache(self, methods):
+        """
+        Writes methods to the cache file. Returns their encoded form.
+        """
+        raw = json.dumps(methods).encode('utf-8')
+        digest = _registry.digest(raw)
         if self.filename is None:
             self.api.log('Method table caching disabled, not writing new cache.')
-            return
-        with open(self.filename, 'w') as f:
-            json.dump(methods, f)
+        elif digest == self.digest and os.path.isfile(self.filename):
+            # unchanged, so only mark it fresh again
+            os.utime(self.filename, None)
+            self.api.log('Method table unchanged: %s' % self.filename)
+        else:
+            self.replace(self.filename, raw)
             self.wrote_cache = True
             self.api.log('Wrote method table cache: %s' % self.filename)
+        if self.binary_file is not None:
+            if digest == self.binary_digest and os.path.isfile(self.binary_file):
+                os.utime(self.binary_file, None)
+            else:
+                self.replace(self.binary_file, _bincache.encode(methods, digest))
+                self.api.log('Wrote method table cache: %s' % self.binary_file)
+            self.binary_digest = digest
+        self.digest = digest
+        self.stale = False
+        return raw
+
+
+    def replace(self, filename, data):
+        # write a temp file and rename it, so that readers never see a
+        # partly written cache
+        tmp = '%s.%d.%d.tmp' % (filename, os.getpid(), threading.get_ident())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
 
 
 
 
 class API(object):
     def __init__(self, api_key='', key_file=None, method_cache=missing,
-                 log=None):
+                 log=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, timeout=None, response_cache=None,
+                 rate_limiter=None, quota=None, retry_policy=None,
+                 json_decoder=None, metrics=None, hooks=None,
+                 single_flight=None, method_snapshot=None,
+                 revalidate_methods=False, method_cache_format='json'):
         """
         Creates a new API instance. When called with no arguments,
         reads the appropriate API key from the default ($HOME/.etsy/keys)
@@ -218,8 +685,55 @@ class API(object):
                            24 hours. This speeds up the creation of API
                            objects.
             log          - An callable that accepts a string parameter.
-                           Receives log messages. No logging is done if
-                           this is None.
+                           Receives log messages and events. If this is
+                           None, they go to the 'etsy2' logger of the
+                           logging module instead.
+            pool_connections - Number of per-host connection pools kept
+                           alive by the HTTP session.
+            pool_maxsize - Maximum number of keep-alive connections
+                           kept open to a single host.
+            pool_block   - If True, never open more than pool_maxsize
+                           connections to a host; callers wait for a
+                           free connection instead.
+            timeout      - Seconds to wait for the server to connect or
+                           respond, or a (connect, read) tuple. None
+                           waits forever.
+            response_cache - A ResponseCache to serve repeated GET
+                           calls from. No caching is done if this is
+                           None.
+            rate_limiter - A RateLimiter that every request waits on
+                           before it is sent. Share one between all API
+                           objects using the same api key.
+            quota        - A SharedQuota to reserve each request from,
+                           coordinating the daily budget with other
+                           processes using the same api key.
+            retry_policy - A RetryPolicy deciding which failed requests
+                           are sent again. Nothing is retried if this is
+                           None.
+            json_decoder - The library responses are decoded with:
+                           'orjson', 'ujson' or 'json', or a callable
+                           taking the response body as bytes. Defaults
+                           to the fastest one installed.
+            metrics      - A Metrics to record request counts, latency,
+                           bytes, retries and cache hits in. Nothing is
+                           recorded if this is None.
+            hooks        - A list of hook objects whose before_send,
+                           after_receive and on_error methods are called
+                           around every request. See Hooks.
+            single_flight - A SingleFlight that lets identical GET
+                           requests in flight at the same time share one
+                           request. Pass True for one private to this
+                           object.
+            method_snapshot - File of a method table snapshot to use
+                           when there is no fresh method cache, instead
+                           of downloading the table, as written by
+                           python -m etsy2._snapshot. None disables it.
+            revalidate_methods - If True and the method table came from
+                           the snapshot, download the live table on a
+                           background thread and switch to it.
+            method_cache_format - 'json', or 'binary' to also keep a copy
+                           of the method cache in a binary format that
+                           loads faster, and read that when possible.
 
         Only one of api_key and key_file may be passed.
 
@@ -246,35 +760,162 @@ class API(object):
         elif key_file:
             self.api_key = self._read_key(key_file)
 
-        self.log = log or self._ignore
-        if not callable(self.log):
+        if log is not None and not callable(log):
             raise ValueError('log must be a callable.')
-
-        self.type_checker = TypeChecker()
-
-        self.decode = json.loads
+        self.events = EventLog(log)
+        self.log = log or self.events.message
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeout = timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._state = CallState()
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.quota = quota
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.hooks = Hooks(hooks) if hooks else None
+        self.single_flight = SingleFlight() if single_flight is True else single_flight
+        if quota is not None:
+            quota.resolve_file(self)
+
+        self.type_checker = shared_type_checker
+
+        self.decode = get_decoder(json_decoder)
 
         self.log('Creating %s Etsy API, base url=%s.' % (
                 self.api_version, self.api_url))
+        self.method_snapshot = method_snapshot
+        self.method_cache_format = method_cache_format
         self._get_methods(method_cache)
+        cache = getattr(self, 'method_cache', None)
+        if cache is not None and (cache.stale or (revalidate_methods and
+                                                  cache.used_snapshot)):
+            self.refresh_methods(background=True)
 
 
 
-    def _ignore(self, _):
-        pass
+    def __enter__(self):
+        return self
 
 
-    def _get_methods(self, method_cache):
-        self.method_cache = MethodTableCache(self, method_cache)
-        ms = self.method_cache.get()
-        self._methods = dict([(m['name'], m) for m in ms])
+    def __exit__(self, *exc_info):
+        self.close()
+
 
-        for method in ms:
-            setattr(self, method['name'], APIMethod(self, method))
+    @property
+    def session(self):
+        """
+        The requests.Session that owns this object's keep-alive
+        connection pool. Created on first use.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    self.mount_adapters(session)
+                    self._session = session
+        return self._session
+
+
+    def mount_adapters(self, session):
+        """
+        Mounts this object's connection pool on another requests
+        session, so that requests made through it reuse the same
+        keep-alive connections.
+        """
+        adapter = getattr(self, '_adapter', None)
+        if adapter is None:
+            import requests.adapters
+            adapter = self._adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+
+    def close(self):
+        """
+        Closes all pooled connections. The object can still be used
+        afterwards; connections are reopened on the next request.
+        """
+        adapter = getattr(self, '_adapter', None)
+        if adapter is not None:
+            adapter.close()
+
+
+    def _get_methods(self, method_cache):
+        self.method_cache = MethodTableCache(
+            self, method_cache, getattr(self, 'method_snapshot', None),
+            getattr(self, 'method_cache_format', 'json'))
+        # the table is shared with every other API object using it, and
+        # APIMethod objects are created by __getattr__ on first use
+        self.method_table = self.method_cache.get_table()
+        self._methods = self.method_table.methods
 
         # self.log('API._get_methods: self._methods = %r' % self._methods)
 
 
+    def refresh_methods(self, background=False):
+        """
+        Downloads the live method table, caches it and switches this
+        object to it. Returns the new MethodTable.
+
+        If background is True, does this on a daemon thread instead and
+        returns the thread. The thread does nothing if another process
+        is already refreshing the cache file. Errors on it are logged,
+        and the object keeps its current table.
+        """
+        if background:
+            thread = threading.Thread(target=self._revalidate_methods,
+                                      name='etsy2-refresh-methods')
+            thread.daemon = True
+            thread.start()
+            return thread
+        self._use_table(self.method_cache.refresh())
+        return self.method_table
+
+
+    def _revalidate_methods(self):
+        try:
+            table = self.method_cache.revalidate()
+            if table is not None:
+                self._use_table(table)
+        except Exception as e:
+            self.events.event(WARNING, 'refresh_methods_failed', error=repr(e))
+
+
+    def _use_table(self, table):
+        old = self._methods
+        self.method_table = table
+        self._methods = table.methods
+        # drop APIMethods made from the old table, __getattr__ remakes them
+        for name in list(self.__dict__):
+            if name in old and isinstance(self.__dict__[name], APIMethod):
+                self.__dict__.pop(name, None)
+
+
+    def __getattr__(self, name):
+        methods = self.__dict__.get('_methods')
+        if methods is None or name not in methods:
+            raise AttributeError("'%s' object has no attribute '%s'" % (
+                    type(self).__name__, name))
+        method = APIMethod(self, methods[name])
+        setattr(self, name, method)
+        return method
+
+
+    def __dir__(self):
+        names = set(super(API, self).__dir__())
+        names.update(self.__dict__.get('_methods', ()))
+        return sorted(names)
+
+
     def etsy_home(self):
         return os.path.expanduser('~/.etsy')
 
@@ -284,6 +925,64 @@ class API(object):
         return cache
 
 
+    def paginate(self, method_name, page_size=100, prefetch=False, **params):
+        """
+        Iterates over every result of a method that takes limit and
+        offset parameters, e.g.
+
+            for listing in api.paginate('findAllShopListingsActive',
+                                        shop_id=shop_id):
+                ...
+
+        Pages of page_size results are requested one at a time, as the
+        iteration reaches them, until the count returned by Etsy has
+        been seen. Pass offset to start somewhere other than the first
+        result. With prefetch=True the next page is requested in the
+        background while the current one is being consumed.
+        """
+        method = getattr(self, method_name)
+        offset = params.pop('offset', 0)
+
+        def fetch(limit, offset):
+            result = method.fetch(limit=limit, offset=offset, **params)
+            return result.results, result.count
+
+        for page in iter_pages(fetch, page_size, offset, prefetch):
+            for result in page:
+                yield result
+
+
+    def fetch_pages(self, method_name, page_size=100, max_workers=8,
+                    ordered=True, **params):
+        """
+        Fetches every page of a method that takes limit and offset
+        parameters, several pages at a time. Yields Page objects, each
+        with an offset and either results or an error:
+
+            for page in api.fetch_pages('findAllShopListingsActive',
+                                        shop_id=shop_id, max_workers=16):
+                if page.ok:
+                    export(page.results)
+                else:
+                    retry_later(page.offset, page.error)
+
+        The first page is requested on the calling thread to learn the
+        total count, then the remaining pages are requested on up to
+        max_workers threads. Pages are yielded in offset order, or as
+        they arrive if ordered is False. A failed page does not stop the
+        others. Use a pool_maxsize of at least max_workers so that every
+        worker gets a kept-alive connection.
+        """
+        method = getattr(self, method_name)
+        offset = params.pop('offset', 0)
+
+        def fetch(limit, offset):
+            result = method.fetch(limit=limit, offset=offset, **params)
+            return result.results, result.count
+
+        return fan_out(fetch, page_size, offset, max_workers, ordered)
+
+
     def _read_key(self, key_file):
         key_file = key_file or os.path.join(self.etsy_home(), 'keys')
         if not os.path.isfile(key_file):
@@ -297,40 +996,301 @@ class API(object):
         return gs[self.api_version]
 
 
-    def _get_url(self, url, http_method, data):
-        self.log("API._get_url: url = %r" % url)
-        return requests.request(http_method, url, data=data)
+    def _get_url(self, url, http_method, data, stream=False):
+        headers = None
+        if isinstance(data, MultipartBody):
+            headers = {'Content-Type': data.content_type}
+        return self.session.request(http_method, url, data=data, headers=headers,
+                                    timeout=self.timeout, stream=stream)
+
+    def _auth_identity(self):
+        """
+        Identifies who calls are made as, so that responses cached for
+        one user are never served to another.
+        """
+        return getattr(self, 'api_key', None)
+
+
+    @property
+    def last_result(self):
+        """
+        The Result of the last call made through this object by the
+        current thread (or asyncio task), or None.
+        """
+        return self._state.get()
+
+
+    @property
+    def last_url(self):
+        result = self._state.get()
+        return result.url if result is not None else None
+
+
+    @property
+    def data(self):
+        result = self._state.get()
+        return result.data if result is not None else None
+
+
+    @property
+    def count(self):
+        result = self._state.get()
+        return result.count if result is not None else None
+
+
+    def _results(self, result):
+        return result.results
+
+
+    def _cached_result(self, spec, params, data):
+        result = Result(spec['name'], spec['http_method'], None, params)
+        result.set_data(data)
+        result.from_cache = True
+        self._state.set(result)
+        if self.metrics is not None:
+            self.metrics.record_cache(spec['name'], True)
+        if self.events.enabled(DEBUG):
+            self.events.event(DEBUG, 'cache_hit', method=spec['name'],
+                              uri=spec['uri'], params=params)
+        return result
+
+
+    def _cached_get(self, spec, url, params, kwargs):
+        cache = self.response_cache
+        if spec['http_method'] != 'GET':
+            result = self._call(spec, spec['http_method'], url, kwargs, params)
+            cache.invalidate(url)
+            return result
+
+        key = cache.key(spec['name'], params, self._auth_identity())
+        data = cache.get(key)
+        if data is not missing:
+            return self._cached_result(spec, params, data)
+        if self.metrics is not None:
+            self.metrics.record_cache(spec['name'], False)
+
+        result = self._call(spec, 'GET', url, kwargs, params)
+        cache.set(key, result.data, url, result.size)
+        return result
+
 
     def _get(self, http_method, url, **kwargs):
-        if hasattr(self, 'api_key'):
-            kwargs.update(dict(api_key=self.api_key))
+        return self._call(None, http_method, url, kwargs).results
+
 
+    def _call(self, spec, http_method, url, kwargs, params=None, stream=False):
+        """
+        Sends a request and returns its Result, or a ResultStream if
+        stream is True. spec is the method spec of the APIMethod making
+        the call, or None. params are all of the call's arguments,
+        including those in the url; defaults to kwargs.
+        """
+        method_name = spec['name'] if spec else None
+        result = Result(method_name, http_method, None,
+                        dict(kwargs) if params is None else params)
+        url, data = self._prepare_request(http_method, url, kwargs)
+        result.url = url
+        self._state.set(result)
+        flight = self.single_flight
+        if flight is not None and http_method == 'GET' and not stream:
+            other, shared = flight.do((url, self._auth_identity()),
+                                      lambda: self._dispatch(spec, result, data))
+            if shared:
+                result.share(other)
+            return result
+        return self._dispatch(spec, result, data, stream)
+
+
+    def _dispatch(self, spec, result, data, stream=False):
+        hooks = self.hooks
+        if hooks is None:
+            return self._exchange(spec, result, data, stream)
+
+        call = hooks.before_send(self, spec, result, data)
+        try:
+            value = self._exchange(spec, result, call.data, stream)
+        except Exception as e:
+            hooks.on_error(call, e)
+            raise
+        hooks.after_receive(call)
+        return value
+
+
+    def _exchange(self, spec, result, data, stream=False):
+        """
+        Sends a prepared request, retrying as the retry policy allows,
+        and returns the call's Result or ResultStream.
+        """
+        method_name, http_method, url = result.method_name, result.http_method, result.url
+        policy = self.retry_policy
+        if policy is not None:
+            policy.record_request(method_name)
+
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            if self.quota is not None:
+                self.quota.acquire()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            sent = time.perf_counter()
+            try:
+                if stream:
+                    response = self._get_url(url, http_method, data, stream=True)
+                else:
+                    response = self._get_url(url, http_method, data)
+            except self._network_errors() as e:
+                if self.metrics is not None:
+                    self.metrics.record_error(method_name)
+                delay = policy and policy.retry_delay(http_method, method_name, attempt)
+                if delay is None:
+                    raise
+                if self.events.enabled(WARNING):
+                    self.events.event(WARNING, 'retry', method=method_name, url=url,
+                                      attempt=attempt, delay=delay, error=repr(e))
+            else:
+                if self.metrics is not None:
+                    self._record_response(method_name, response, data,
+                                          time.perf_counter() - sent, stream)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(getattr(response, 'headers', None))
+                delay = policy and policy.retry_delay(http_method, method_name, attempt, response)
+                if delay is None:
+                    break
+                if stream:
+                    response.close()
+                if self.events.enabled(WARNING):
+                    self.events.event(WARNING, 'retry', method=method_name, url=url,
+                                      attempt=attempt, delay=delay,
+                                      status=response.status_code)
+            if self.metrics is not None:
+                self.metrics.record_retry(method_name)
+            policy.sleep(delay)
+            if isinstance(data, MultipartBody):
+                data.rewind()
+            attempt += 1
+
+        result.elapsed = time.perf_counter() - start
+        if self.events.enabled(DEBUG):
+            self._log_request(spec, result, response, attempt, stream)
+
+        if stream:
+            return self._open_stream(result, response)
+        return self._finish(result, response)
+
+
+    def _log_request(self, spec, result, response, attempts, stream=False):
+        size = None
+        if not stream:
+            body = getattr(response, 'content', None)
+            size = len(body if body is not None else response.text)
+        self.events.event(
+            DEBUG, 'request', method=result.method_name,
+            http_method=result.http_method, uri=spec['uri'] if spec else None,
+            url=result.url, params=result.params, status=response.status_code,
+            bytes=size, elapsed=round(result.elapsed, 6), attempts=attempts)
+
+
+    def _finish(self, result, response):
+        result.status_code = response.status_code
+        result.headers = getattr(response, 'headers', None)
+        body = getattr(response, 'content', None)
+        result.size = len(body if body is not None else response.text)
+        if self.metrics is None:
+            result.set_data(self._decode_response(response))
+        else:
+            start = time.perf_counter()
+            result.set_data(self._decode_response(response))
+            self.metrics.record_decode(result.method_name, time.perf_counter() - start)
+        return result
+
+
+    def _record_response(self, method_name, response, data, elapsed, stream=False):
+        # requests measures the time until the response headers arrived
+        ttfb = getattr(response, 'elapsed', None)
+        if ttfb is not None:
+            ttfb = ttfb.total_seconds()
+        if isinstance(data, MultipartBody):
+            request_bytes = len(data)
+        else:
+            request = getattr(response, 'request', None)
+            request_bytes = request is not None and request.headers.get('Content-Length')
+        headers = getattr(response, 'headers', None)
+        if stream:
+            response_bytes = headers and headers.get('Content-Length')
+        else:
+            body = getattr(response, 'content', None)
+            response_bytes = len(body if body is not None else response.text)
+        self.metrics.record_response(method_name, response.status_code, elapsed, ttfb,
+                                     int(request_bytes or 0), int(response_bytes or 0))
+
+
+    def _open_stream(self, result, response):
+        result.status_code = response.status_code
+        result.headers = getattr(response, 'headers', None)
+        if hasattr(response, 'iter_content'):
+            chunks = response.iter_content(ResultStream.chunk_size)
+        else:
+            body = getattr(response, 'content', None)
+            chunks = [response.text if body is None else body]
+        return ResultStream(result, chunks, getattr(response, 'close', None))
+
+
+    def _network_errors(self):
+        """
+        Exceptions raised by _get_url for failures a retry might fix.
+        """
+        import requests
+        return (requests.ConnectionError, requests.Timeout)
+
+
+    def _query_base(self):
+        """
+        The encoded query string parameters sent with every GET and
+        DELETE request, i.e. the api key.
+        """
+        api_key = getattr(self, 'api_key', None)
+        cached = self.__dict__.get('_query_base_for')
+        if cached is None or cached[0] != api_key:
+            base = urlencode({'api_key': api_key}) if api_key is not None else ''
+            cached = self._query_base_for = (api_key, base)
+        return cached[1]
+
+
+    def _prepare_request(self, http_method, url, kwargs):
+        """
+        Builds the full url and request body for a call. Returns a
+        (url, data) tuple; data is None for GET and DELETE requests, and
+        a MultipartBody for calls that upload files.
+        """
         data = None
         if http_method == 'GET' or http_method == 'DELETE':
             url = '%s%s' % (self.api_url, url)
+            query = self._query_base()
             if kwargs:
-                url += '?%s' % urlencode(kwargs)
+                query = '%s&%s' % (query, urlencode(kwargs)) if query else urlencode(kwargs)
+            if query:
+                url += '?%s' % query
         elif http_method == 'POST' or http_method == 'PUT':
+            if hasattr(self, 'api_key'):
+                kwargs.update(dict(api_key=self.api_key))
             url = '%s%s' % (self.api_url, url)
 
+            if any(hasattr(value, 'read') for value in kwargs.values()):
+                # files are read a chunk at a time as the body is sent
+                return url, MultipartBody(list(kwargs.items()))
             data = {}
             for name, value in kwargs.items():
-                if hasattr(value, 'read'):
-                    file_mimetype = mimetypes.guess_type(value.name) or 'application/octet-stream'
-                    data[name] = (value.name, value.read(), file_mimetype)
-                else:
-                    data[name] = (None, str(value))
-
-        self.last_url = url
-        response = self._get_url(url, http_method, data)
+                data[name] = (None, str(value))
+        return url, data
 
-        self.log('API._get: http_method = %r, url = %r, data = %r' % (http_method, url, data))
 
+    def _decode_response(self, response):
+        body = getattr(response, 'content', None)
+        if body is None:
+            body = response.text
         try:
-            self.data = self.decode(response.text)
-        except json.JSONDecodeError:
+            return self.decode(body)
+        except ValueError:
             raise ValueError('Could not decode response from Etsy as JSON: status_code: %r, text: %r, url %r' \
-                % (response.status_code, response.text, response.url))
-
-        self.count = self.data['count']
-        return self.data['results']
+                % (response.status_code, body, getattr(response, 'url', None)))
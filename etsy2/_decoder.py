@@ -0,0 +1,55 @@
+"""
+JSON decoders for response bodies.
+
+Responses are decoded straight from the bytes read off the socket,
+without first building a str of the whole body. orjson is used when it
+is installed, then ujson, then the json module from the standard
+library. Etsy sends UTF-8, which all three read from bytes directly.
+"""
+import json
+import sys
+
+
+def _json_loads(raw):
+    if isinstance(raw, bytes) and sys.version_info < (3, 6):
+        raw = raw.decode('utf-8')
+    return json.loads(raw)
+
+
+def _orjson_loads():
+    import orjson
+    return orjson.loads
+
+
+def _ujson_loads():
+    import ujson
+    return ujson.loads
+
+
+_decoders = (
+    ('orjson', _orjson_loads),
+    ('ujson', _ujson_loads),
+    ('json', lambda: _json_loads),
+)
+
+
+def get_decoder(decoder=None):
+    """
+    Returns a function that decodes JSON from bytes or str.
+
+    Parameters:
+        decoder      - None for the fastest installed library, the name
+                       of one ('orjson', 'ujson' or 'json'), or a
+                       callable, which is returned as is. It should
+                       raise ValueError on invalid input.
+    """
+    if callable(decoder):
+        return decoder
+    for name, load in _decoders:
+        if decoder is None or decoder == name:
+            try:
+                return load()
+            except ImportError:
+                if decoder is not None:
+                    raise
+    raise ValueError('Unknown JSON decoder: %r' % decoder)
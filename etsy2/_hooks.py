@@ -0,0 +1,145 @@
+import time
+
+from ._log import redact_url
+
+
+class Call(object):
+    """
+    One API call, as seen by hooks. Hooks may change url and data in
+    before_send, e.g. to route the request elsewhere, and may set their
+    own attributes to keep state between before_send and after_receive
+    or on_error.
+
+    Attributes:
+        api          - The API object making the call.
+        spec         - The method spec, or None for calls made with
+                       API._get.
+        method_name  - Name of the API method, or None.
+        http_method  - 'GET', 'POST', 'PUT' or 'DELETE'.
+        url          - The full url the request will be sent to.
+        data         - The request body built by the API object: None,
+                       a dict of form fields, or a MultipartBody.
+        params       - The arguments the method was called with.
+        result       - The call's Result. Filled in by the time
+                       after_receive is called.
+        start        - time.perf_counter() when before_send was called.
+        elapsed      - Seconds from before_send until after_receive or
+                       on_error, including retries.
+    """
+    def __init__(self, api, spec, result, data):
+        self.api = api
+        self.spec = spec
+        self.method_name = result.method_name
+        self.http_method = result.http_method
+        self.url = result.url
+        self.data = data
+        self.params = result.params
+        self.result = result
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+
+
+class Hooks(object):
+    """
+    Runs hook objects around every request an API object sends. A hook
+    is any object with one or more of these methods, each given a Call:
+
+        before_send(call)   - before the request is first sent
+        after_receive(call) - after the response has been received and
+                              decoded (or, for APIMethod.stream, opened)
+        on_error(call, error) - when the call fails with an exception,
+                              after any retries
+
+    before_send hooks run in the order given; after_receive and on_error
+    hooks run in reverse order, so that each hook wraps the ones after
+    it. Calls answered from a ResponseCache are not sent and do not run
+    hooks.
+    """
+    def __init__(self, hooks):
+        hooks = list(hooks)
+        self.hooks = hooks
+        self.before = [h.before_send for h in hooks if hasattr(h, 'before_send')]
+        self.after = [h.after_receive for h in reversed(hooks)
+                      if hasattr(h, 'after_receive')]
+        self.error = [h.on_error for h in reversed(hooks) if hasattr(h, 'on_error')]
+
+
+    def before_send(self, api, spec, result, data):
+        call = Call(api, spec, result, data)
+        for hook in self.before:
+            hook(call)
+        result.url = call.url
+        return call
+
+
+    def after_receive(self, call):
+        call.elapsed = time.perf_counter() - call.start
+        for hook in self.after:
+            hook(call)
+
+
+    def on_error(self, call, error):
+        call.elapsed = time.perf_counter() - call.start
+        for hook in self.error:
+            hook(call, error)
+
+
+
+class OpenTelemetryHook(object):
+    """
+    A hook that records a client span for every call:
+
+        api = Etsy(api_key=key, hooks=[OpenTelemetryHook()])
+
+    Spans are named after the API method and carry the http method,
+    redacted url, url template and status code. Failed calls record the
+    exception and an error status.
+
+    Parameters:
+        tracer       - The tracer to start spans with. Defaults to
+                       opentelemetry.trace.get_tracer('etsy2'), which
+                       requires the opentelemetry-api package.
+    """
+    def __init__(self, tracer=None):
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer('etsy2')
+        self.tracer = tracer
+        try:
+            from opentelemetry.trace import SpanKind, Status, StatusCode
+        except ImportError:
+            self._kind = self._error = None
+        else:
+            self._kind = SpanKind.CLIENT
+            self._error = lambda e: Status(StatusCode.ERROR, str(e))
+
+
+    def before_send(self, call):
+        attributes = {'http.method': call.http_method,
+                      'http.url': redact_url(call.url)}
+        if call.spec is not None:
+            attributes['etsy.method'] = call.method_name
+            attributes['etsy.uri'] = call.spec['uri']
+        name = 'etsy2 %s' % (call.method_name or call.http_method)
+        if self._kind is not None:
+            call.span = self.tracer.start_span(name, kind=self._kind, attributes=attributes)
+        else:
+            call.span = self.tracer.start_span(name, attributes=attributes)
+
+
+    def after_receive(self, call):
+        span = call.span
+        if call.result.status_code is not None:
+            span.set_attribute('http.status_code', call.result.status_code)
+        if call.result.count is not None:
+            span.set_attribute('etsy.count', call.result.count)
+        span.end()
+
+
+    def on_error(self, call, error):
+        span = call.span
+        span.record_exception(error)
+        if self._error is not None:
+            span.set_status(self._error(error))
+        span.end()
@@ -0,0 +1,155 @@
+"""
+Structured, lazily formatted logging of API calls.
+
+Every request produces an event with the method name, url template,
+status, response size and elapsed time. Events are only formatted when
+something will read them: the log callable passed to the API object, or
+else the 'etsy2' logger of the standard logging module when it is
+enabled for the event's level. Secrets and file contents are redacted.
+
+The logging module is only imported once an EventLog is created.
+"""
+
+# the same as logging.DEBUG and logging.WARNING
+DEBUG = 10
+WARNING = 30
+
+# parameters whose values are never logged
+secrets = frozenset(['api_key', 'oauth_token', 'oauth_signature',
+                     'oauth_consumer_key', 'password'])
+
+max_value_length = 100
+
+
+def redact_url(url):
+    """
+    url with the values of secret query parameters replaced.
+    """
+    base, sep, query = url.partition('?')
+    if not sep:
+        return url
+    items = []
+    for item in query.split('&'):
+        name = item.split('=', 1)[0]
+        items.append('%s=REDACTED' % name if name in secrets else item)
+    return '%s?%s' % (base, '&'.join(items))
+
+
+def redact_text(text):
+    """
+    text with the values of secret parameters replaced wherever they
+    appear, e.g. in the urls quoted by exception messages.
+    """
+    for name in secrets:
+        marker = name + '='
+        start = text.find(marker)
+        while start >= 0:
+            begin = start + len(marker)
+            quote = text[begin:begin + 1]
+            if quote in ('"', "'"):
+                begin += 1
+                stops = quote
+            else:
+                stops = '&\'" ),;\n'
+            end = begin
+            while end < len(text) and text[end] not in stops:
+                end += 1
+            text = text[:begin] + 'REDACTED' + text[end:]
+            start = text.find(marker, begin + len('REDACTED'))
+    return text
+
+
+def redact_value(name, value):
+    if name in secrets:
+        return 'REDACTED'
+    if hasattr(value, 'read'):
+        return '<file %s>' % getattr(value, 'name', '?')
+    if isinstance(value, (bytes, bytearray)):
+        return '<%d bytes>' % len(value)
+    if isinstance(value, str) and len(value) > max_value_length:
+        return value[:max_value_length] + '...'
+    return value
+
+
+
+class Event(object):
+    """
+    One log event. Formatted by str(), which logging only calls if a
+    handler emits the record.
+    """
+    __slots__ = ('name', 'fields', 'redact')
+
+    def __init__(self, name, fields, redact=True):
+        self.name = name
+        self.fields = fields
+        self.redact = redact
+
+
+    def redacted(self):
+        """
+        The event's fields, with secrets and file contents replaced.
+        """
+        fields = dict(self.fields)
+        if not self.redact:
+            return fields
+        if fields.get('url'):
+            fields['url'] = redact_url(fields['url'])
+        if isinstance(fields.get('error'), str):
+            fields['error'] = redact_text(fields['error'])
+        if fields.get('params'):
+            fields['params'] = dict((k, redact_value(k, v))
+                                    for k, v in fields['params'].items())
+        return fields
+
+
+    def __str__(self):
+        fields = self.redacted()
+        return '%s %s' % (self.name, ' '.join(
+            '%s=%r' % (k, fields[k]) for k in sorted(fields)
+            if fields[k] is not None))
+
+
+
+class EventLog(object):
+    """
+    Where an API object sends its events. If sink is given, it receives
+    every event and message as a string; otherwise they go to the
+    'etsy2' logger, with the event's fields in record.etsy_event.
+
+    Set redact to False to log secrets and the values of long or binary
+    parameters as they are.
+    """
+    def __init__(self, sink=None, redact=True, logger=None):
+        if logger is None:
+            import logging
+            logger = logging.getLogger('etsy2')
+        self.sink = sink
+        self.redact = redact
+        self.logger = logger
+
+
+    def enabled(self, level):
+        """
+        Whether an event at level would be used. Check this before
+        gathering an event's fields.
+        """
+        return self.sink is not None or self.logger.isEnabledFor(level)
+
+
+    def event(self, level, name, **fields):
+        event = Event(name, fields, self.redact)
+        if self.sink is not None:
+            self.sink(str(event))
+        elif self.logger.isEnabledFor(level):
+            self.logger.log(level, '%s', event, extra={'etsy_event': event})
+
+
+    def message(self, msg, level=DEBUG):
+        """
+        Logs a plain message. Used as API.log when no log callable is
+        given.
+        """
+        if self.sink is not None:
+            self.sink(msg)
+        else:
+            self.logger.log(level, msg)
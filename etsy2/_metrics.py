@@ -0,0 +1,235 @@
+import threading
+
+
+class Histogram(object):
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+    def snapshot(self):
+        """
+        Cumulative counts per upper bound, as in the exposition format.
+        """
+        cumulative = []
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            cumulative.append((bound, total))
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+
+class Metrics(object):
+    """
+    Counts requests, statuses, bytes, retries and cache hits, and records
+    latency histograms, per API method. Pass one to API objects with the
+    metrics parameter; one Metrics can be shared by many of them:
+
+        metrics = Metrics()
+        api = Etsy(api_key=key, metrics=metrics)
+        ...
+        metrics.snapshot()['findAllShopListingsActive']['requests']
+        metrics.serve(9464)   # or serve metrics.exposition() yourself
+
+    Latency is recorded for these phases:
+
+        total  - sending a request until its response has arrived; each
+                 retry is recorded separately
+        ttfb   - sending the request until the response headers have
+                 arrived (only for requests made with the requests
+                 library, which measures it)
+        decode - decoding the JSON response
+
+    DNS and connect times are not recorded, since neither requests nor
+    aiohttp report them per request.
+    """
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+               float('inf'))
+
+    def __init__(self, buckets=None, prefix='etsy2'):
+        """
+        Parameters:
+            buckets      - Upper bounds of the latency histogram buckets,
+                           in seconds.
+            prefix       - Prepended to metric names in the exposition
+                           format.
+        """
+        if buckets is not None:
+            self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._methods = {}
+
+
+    def _method(self, name):
+        m = self._methods.get(name)
+        if m is None:
+            m = self._methods[name] = {
+                'requests': {}, 'errors': 0, 'retries': 0,
+                'cache_hits': 0, 'cache_misses': 0,
+                'request_bytes': 0, 'response_bytes': 0, 'latency': {}}
+        return m
+
+
+    def _observe(self, m, phase, seconds):
+        h = m['latency'].get(phase)
+        if h is None:
+            h = m['latency'][phase] = Histogram(self.buckets)
+        h.observe(seconds)
+
+
+    def record_response(self, method, status, elapsed, ttfb=None,
+                        request_bytes=None, response_bytes=None):
+        status_class = '%dxx' % (status // 100)
+        with self._lock:
+            m = self._method(method or '')
+            m['requests'][status_class] = m['requests'].get(status_class, 0) + 1
+            self._observe(m, 'total', elapsed)
+            if ttfb is not None:
+                self._observe(m, 'ttfb', ttfb)
+            if request_bytes:
+                m['request_bytes'] += request_bytes
+            if response_bytes:
+                m['response_bytes'] += response_bytes
+
+
+    def record_decode(self, method, seconds):
+        with self._lock:
+            self._observe(self._method(method or ''), 'decode', seconds)
+
+
+    def record_error(self, method):
+        """
+        Records a request that failed without a response.
+        """
+        with self._lock:
+            self._method(method or '')['errors'] += 1
+
+
+    def record_retry(self, method):
+        with self._lock:
+            self._method(method or '')['retries'] += 1
+
+
+    def record_cache(self, method, hit):
+        with self._lock:
+            self._method(method or '')['cache_hits' if hit else 'cache_misses'] += 1
+
+
+    def snapshot(self):
+        """
+        Everything recorded so far, as a dict of method name to a dict
+        with requests (a dict of status class to count), errors,
+        retries, cache_hits, cache_misses, request_bytes, response_bytes
+        and latency (a dict of phase to histogram).
+        """
+        with self._lock:
+            out = {}
+            for name, m in self._methods.items():
+                m = dict(m)
+                m['requests'] = dict(m['requests'])
+                m['latency'] = dict((phase, h.snapshot())
+                                    for phase, h in m['latency'].items())
+                out[name] = m
+            return out
+
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+
+    def exposition(self):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        methods = sorted(snapshot)
+        p = self.prefix
+        lines = []
+
+        def header(name, kind, help):
+            lines.append('# HELP %s_%s %s' % (p, name, help))
+            lines.append('# TYPE %s_%s %s' % (p, name, kind))
+
+        header('requests_total', 'counter',
+               'Responses received, by API method and status class.')
+        for method in methods:
+            for status, n in sorted(snapshot[method]['requests'].items()):
+                lines.append('%s_requests_total%s %d' % (
+                    p, labels(method=method, status=status), n))
+
+        for key, kind, help in (
+                ('errors', 'counter', 'Requests that failed without a response.'),
+                ('retries', 'counter', 'Requests sent again after a failure.'),
+                ('cache_hits', 'counter', 'Calls answered from the response cache.'),
+                ('cache_misses', 'counter', 'Calls not found in the response cache.'),
+                ('request_bytes', 'counter', 'Request body bytes sent.'),
+                ('response_bytes', 'counter', 'Response body bytes received.')):
+            header('%s_total' % key, kind, help)
+            for method in methods:
+                lines.append('%s_%s_total%s %d' % (
+                    p, key, labels(method=method), snapshot[method][key]))
+
+        header('request_duration_seconds', 'histogram',
+               'Request latency, by API method and phase.')
+        for method in methods:
+            for phase, h in sorted(snapshot[method]['latency'].items()):
+                for bound, n in h['buckets']:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('%s_request_duration_seconds_bucket%s %d' % (
+                        p, labels(method=method, phase=phase, le=le), n))
+                lines.append('%s_request_duration_seconds_sum%s %r' % (
+                    p, labels(method=method, phase=phase), h['sum']))
+                lines.append('%s_request_duration_seconds_count%s %d' % (
+                    p, labels(method=method, phase=phase), h['count']))
+        return '\n'.join(lines) + '\n'
+
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """
+        Serves exposition() over HTTP on a background thread, for a
+        Prometheus server to scrape. Returns the HTTPServer; its
+        server_address has the port, and shutdown() stops it.
+        """
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+
+def labels(**values):
+    return '{%s}' % ','.join(
+        '%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in sorted(values.items()))
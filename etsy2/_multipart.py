@@ -0,0 +1,119 @@
+import binascii
+import os
+
+
+class MultipartBody(object):
+    """
+    A multipart/form-data request body that reads its files a chunk at a
+    time while it is being sent, instead of holding them in memory.
+
+    Files may be any object with read, seek and tell, such as open files
+    or mmap objects; each is sent from its current position to its end.
+    Files that cannot seek are read into memory. Used by API objects for
+    calls that upload files, e.g. uploadListingImage.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, fields, boundary=None):
+        """
+        Parameters:
+            fields       - A list of (name, value) pairs. A value with a
+                           read method is sent as a file, anything else
+                           as text.
+            boundary     - The multipart boundary; random by default.
+        """
+        self.boundary = boundary or binascii.hexlify(os.urandom(16)).decode('ascii')
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self._parts = []
+        self._files = []
+        for name, value in fields:
+            if hasattr(value, 'read'):
+                self._add_file(name, value)
+            else:
+                self._parts.append(self._field_header(name, None, None)
+                                   + str(value).encode('utf-8') + b'\r\n')
+        self._parts.append(('--%s--\r\n' % self.boundary).encode('ascii'))
+        self._length = sum(len(p) if isinstance(p, bytes) else p[2]
+                           for p in self._parts)
+        self.rewind()
+
+
+    def _field_header(self, name, filename, content_type):
+        header = '--%s\r\nContent-Disposition: form-data; name="%s"' % (
+            self.boundary, name)
+        if filename is not None:
+            header += '; filename="%s"\r\nContent-Type: %s' % (filename, content_type)
+        return (header + '\r\n\r\n').encode('utf-8')
+
+
+    def _add_file(self, name, f):
+        filename = os.path.basename(getattr(f, 'name', None) or name)
+        import mimetypes
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self._parts.append(self._field_header(name, filename, content_type))
+        try:
+            start = f.tell()
+            f.seek(0, 2)
+            size = f.tell() - start
+            f.seek(start)
+        except (AttributeError, OSError, ValueError):
+            self._parts.append(f.read())
+        else:
+            self._parts.append((f, start, size, name))
+            self._files.append((name, filename, size))
+        self._parts.append(b'\r\n')
+
+
+    def __len__(self):
+        return self._length
+
+
+    def rewind(self):
+        """
+        Goes back to the start of the body, so that it can be sent again.
+        """
+        self._index = 0
+        self._offset = 0
+
+
+    def read(self, size=-1):
+        """
+        Returns the next size bytes of the body, or all that is left if
+        size is negative. Returns b'' at the end.
+        """
+        if size is None or size < 0:
+            size = self._length
+        out = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, bytes):
+                chunk = part[self._offset:self._offset + size]
+                remaining = len(part) - self._offset
+            else:
+                f, start, length, name = part
+                if self._offset == 0:
+                    f.seek(start)
+                chunk = f.read(min(size, length - self._offset))
+                remaining = length - self._offset
+                if not chunk and remaining:
+                    raise IOError('File for field %r ended early.' % name)
+            out.append(chunk)
+            size -= len(chunk)
+            self._offset += len(chunk)
+            if len(chunk) >= remaining:
+                self._index += 1
+                self._offset = 0
+        return b''.join(out)
+
+
+    def __iter__(self):
+        self.rewind()
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+    def __repr__(self):
+        return '<MultipartBody %d bytes, files=%r>' % (self._length, self._files)
@@ -0,0 +1,173 @@
+class Page(object):
+    """
+    One page of results from a parallel pagination. If the request for
+    the page failed, results is None and error holds the exception.
+    """
+    def __init__(self, offset, results=None, error=None):
+        self.offset = offset
+        self.results = results
+        self.error = error
+
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+    def __repr__(self):
+        if self.ok:
+            return '<Page offset=%d results=%d>' % (self.offset, len(self.results))
+        return '<Page offset=%d error=%r>' % (self.offset, self.error)
+
+
+def iter_pages(fetch, page_size, offset=0, prefetch=False):
+    """
+    Yields successive pages of results, as lists, until count results
+    have been seen or an empty page comes back.
+
+    Parameters:
+        fetch        - callable taking (limit, offset) and returning a
+                       (results, count) tuple for that page.
+        page_size    - number of results to ask for per page.
+        offset       - offset of the first page.
+        prefetch     - if True, the next page is requested on a
+                       background thread while the caller works through
+                       the current one. At most two pages are held in
+                       memory either way.
+    """
+    if not prefetch:
+        while True:
+            results, count = fetch(page_size, offset)
+            if not results:
+                return
+            yield results
+            offset += len(results)
+            if offset >= count:
+                return
+
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = executor.submit(fetch, page_size, offset)
+        while pending is not None:
+            results, count = pending.result()
+            if not results:
+                return
+            offset += len(results)
+            pending = None
+            if offset < count:
+                pending = executor.submit(fetch, page_size, offset)
+            yield results
+    finally:
+        executor.shutdown(wait=False)
+
+
+class AsyncResults(object):
+    """
+    asyncio counterpart of iter_pages, returned by AsyncEtsy.paginate:
+    an async iterator over every result of the pages, one at a time.
+
+    Parameters:
+        fetch        - coroutine function taking (limit, offset) and
+                       returning a (results, count) tuple for that page.
+        page_size    - number of results to ask for per page.
+        offset       - offset of the first page.
+        prefetch     - if True, the next page is requested in a task of
+                       its own while the caller works through the
+                       current one.
+    """
+    def __init__(self, fetch, page_size, offset=0, prefetch=False):
+        self._fetch = fetch
+        self._page_size = page_size
+        self._offset = offset
+        self._prefetch = prefetch
+        self._pending = None
+        self._page = []
+        self._pos = 0
+
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self):
+        while self._pos >= len(self._page):
+            if self._offset is None:
+                raise StopAsyncIteration
+            if self._pending is not None:
+                pending, self._pending = self._pending, None
+                results, count = await pending
+            else:
+                results, count = await self._fetch(self._page_size, self._offset)
+            if not results:
+                self._offset = None
+                raise StopAsyncIteration
+            self._offset += len(results)
+            if self._offset >= count:
+                self._offset = None
+            elif self._prefetch:
+                import asyncio
+                self._pending = asyncio.ensure_future(
+                    self._fetch(self._page_size, self._offset))
+            self._page, self._pos = results, 0
+        result = self._page[self._pos]
+        self._pos += 1
+        return result
+
+
+    def close(self):
+        """
+        Cancels the prefetch of the next page, if any, for a caller that
+        stops iterating early.
+        """
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+
+def page_offsets(first_offset, first_results, count, page_size):
+    """
+    Offsets of the pages left to fetch once the first page and the
+    total count are known. Pages are assumed to be as long as the first
+    one, which is shorter than page_size if Etsy caps the limit.
+    """
+    if not first_results:
+        return []
+    step = min(page_size, len(first_results))
+    return list(range(first_offset + len(first_results), count, step))
+
+
+def fan_out(fetch, page_size, offset=0, max_workers=8, ordered=True):
+    """
+    Yields every page of results as a Page. The first page is fetched
+    on the calling thread to learn the total count; the rest are
+    fetched concurrently on a pool of max_workers threads.
+
+    With ordered=True pages are yielded in offset order, otherwise as
+    they arrive. A failed page is yielded with its error set rather than
+    stopping the others. An error fetching the first page is raised.
+    """
+    results, count = fetch(page_size, offset)
+    yield Page(offset, results)
+
+    offsets = page_offsets(offset, results, count, page_size)
+    if not offsets:
+        return
+
+    def fetch_page(offset):
+        try:
+            return Page(offset, fetch(page_size, offset)[0])
+        except Exception as e:
+            return Page(offset, error=e)
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(offsets)))
+    futures = []
+    try:
+        futures = [executor.submit(fetch_page, o) for o in offsets]
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,152 @@
+import os
+import time
+from ._core import missing
+from ._ratelimit import RateLimitExceeded
+
+
+class SharedQuota(object):
+    """
+    A request budget shared by every process using the same api key,
+    for use with the quota parameter of API objects:
+
+        quota = SharedQuota(limit=10000, priority='low')
+        api = Etsy(api_key=key, quota=quota)
+
+    Each process creates its own SharedQuota; they coordinate through a
+    SQLite file, by default quota.<api version>.sqlite in the same
+    directory as the method table cache. Before a request is sent, a
+    slot is reserved in a sliding window of the last window seconds. If
+    the window is full, the request waits until the oldest reservation
+    falls out of it.
+
+    Callers with a lower priority may only use part of the budget, which
+    leaves the rest for more important work. With the default shares, a
+    'low' caller stops at 50% of the limit, 'normal' at 90% and 'high'
+    can use all of it.
+
+    Use a different filename for each api key.
+    """
+    shares = {'high': 1.0, 'normal': 0.9, 'low': 0.5}
+
+    def __init__(self, limit=10000, window=60*60*24, filename=missing,
+                 priority='normal', shares=None, max_wait=None,
+                 clock=time.time, sleep=time.sleep):
+        """
+        Parameters:
+            limit        - Requests allowed per window by all processes
+                           together.
+            window       - Length of the sliding window in seconds.
+            filename     - The SQLite file to keep the reservations in.
+                           Defaults to a file next to the method table
+                           cache.
+            priority     - Priority of requests made through this
+                           object; a key of shares.
+            shares       - dict of priority to the fraction of limit
+                           that callers with that priority may use.
+            max_wait     - If a request would have to wait longer than
+                           this many seconds, RateLimitExceeded is raised
+                           instead. None waits as long as needed.
+        """
+        self.limit = limit
+        self.window = window
+        self.filename = filename
+        self.shares = dict(shares or self.shares)
+        if priority not in self.shares:
+            raise ValueError('Unknown priority: %s' % priority)
+        self.priority = priority
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self._initialized = False
+
+
+    def resolve_file(self, api):
+        """
+        Picks the default file for api if no filename was given.
+        """
+        if self.filename is missing:
+            etsy_home = api.etsy_home()
+            if os.path.isdir(etsy_home):
+                d = etsy_home
+            else:
+                import tempfile
+                d = tempfile.gettempdir()
+            self.filename = os.path.join(d, 'quota.%s.sqlite' % api.api_version)
+
+
+    def _connect(self):
+        if self.filename is missing:
+            raise AssertionError('SharedQuota has no filename; pass one or '
+                                 'give it to an API object first.')
+        import sqlite3
+        conn = sqlite3.connect(self.filename, timeout=60, isolation_level=None)
+        if not self._initialized:
+            conn.execute('CREATE TABLE IF NOT EXISTS reservations (ts REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS reservations_ts ON reservations (ts)')
+            self._initialized = True
+        return conn
+
+
+    def allowed(self, priority=None):
+        return int(self.limit * self.shares[priority or self.priority])
+
+
+    def reserve(self, n=1, priority=None):
+        """
+        Reserves n requests. Returns 0 on success. If there is not enough
+        budget left, nothing is reserved and the number of seconds until
+        there will be is returned instead.
+        """
+        allowed = self.allowed(priority)
+        if n > allowed:
+            raise ValueError('Cannot reserve %d requests, at most %d are allowed '
+                             'at this priority.' % (n, allowed))
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = self.clock()
+            conn.execute('DELETE FROM reservations WHERE ts <= ?', (now - self.window,))
+            used = conn.execute('SELECT COUNT(*) FROM reservations').fetchone()[0]
+            if used + n <= allowed:
+                conn.executemany('INSERT INTO reservations (ts) VALUES (?)',
+                                 [(now,)] * n)
+                conn.execute('COMMIT')
+                return 0
+            # the reservation that has to expire before n more fit
+            oldest = conn.execute(
+                'SELECT ts FROM reservations ORDER BY ts LIMIT 1 OFFSET ?',
+                (used + n - allowed - 1,)).fetchone()[0]
+            conn.execute('COMMIT')
+            return max(oldest + self.window - now, 0.001)
+        finally:
+            conn.close()
+
+
+    def acquire(self, n=1, priority=None):
+        """
+        Blocks until n requests have been reserved.
+        """
+        waited = 0
+        while True:
+            wait = self.reserve(n, priority)
+            if not wait:
+                return
+            if self.max_wait is not None and waited + wait > self.max_wait:
+                raise RateLimitExceeded(
+                    'Shared quota used up; next request allowed in %.1f seconds.' % wait)
+            self.sleep(wait)
+            waited += wait
+
+
+    def remaining(self, priority=None):
+        """
+        Requests that can still be reserved in the current window at the
+        given priority.
+        """
+        conn = self._connect()
+        try:
+            used = conn.execute('SELECT COUNT(*) FROM reservations WHERE ts > ?',
+                                (self.clock() - self.window,)).fetchone()[0]
+        finally:
+            conn.close()
+        return max(0, self.allowed(priority) - used)
@@ -0,0 +1,130 @@
+import threading
+import time
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+
+class TokenBucket(object):
+    """
+    Holds up to capacity tokens, refilled continuously at rate tokens
+    per second. Not thread safe on its own; RateLimiter locks around it.
+    """
+    def __init__(self, capacity, rate, now):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = now
+
+
+    def refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+
+    def wait_time(self, n):
+        """
+        Seconds until n tokens are available, assuming no one else
+        takes any.
+        """
+        if self.tokens >= n:
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+
+
+class RateLimiter(object):
+    """
+    Client-side throttle for Etsy's per-second and per-day request
+    limits, for use with the rate_limiter parameter of API objects.
+
+    Every request takes a token from a per-second bucket and from a
+    per-day bucket. When either is empty the request waits until a token
+    is refilled, so a burst of calls is spread out instead of being
+    rejected by Etsy. After each response the per-day bucket is
+    corrected from the X-RateLimit-Limit and X-RateLimit-Remaining
+    headers, so the limiter follows the real budget even when other
+    clients share the api key.
+
+    One limiter can be shared by every thread and API object using the
+    same api key.
+    """
+    def __init__(self, per_second=10, per_day=10000, max_wait=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Parameters:
+            per_second   - Requests allowed per second, also the largest
+                           burst sent back to back.
+            per_day      - Requests allowed per rolling 24 hours.
+            max_wait     - If a request would have to wait longer than
+                           this many seconds, RateLimitExceeded is raised
+                           instead. None waits as long as needed.
+            clock        - Returns the current time in seconds.
+            sleep        - Called with the number of seconds to wait.
+        """
+        now = clock()
+        self.second = TokenBucket(per_second, per_second, now)
+        self.day = TokenBucket(per_day, per_day / 86400.0, now)
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+
+    def reserve(self):
+        """
+        Takes a token from each bucket and returns how many seconds the
+        caller must wait before sending its request. Tokens may go
+        negative; later callers then queue up behind earlier ones.
+        """
+        with self._lock:
+            now = self.clock()
+            self.second.refill(now)
+            self.day.refill(now)
+            wait = max(self.second.wait_time(1), self.day.wait_time(1))
+            if self.max_wait is not None and wait > self.max_wait:
+                raise RateLimitExceeded(
+                    'Rate limit reached; next request allowed in %.1f seconds.' % wait)
+            self.second.tokens -= 1
+            self.day.tokens -= 1
+            return wait
+
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+
+
+    def update(self, headers):
+        """
+        Adjusts the per-day budget from a response's rate limit headers.
+        """
+        if not headers:
+            return
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        with self._lock:
+            self.day.refill(self.clock())
+            if limit is not None:
+                self.day.capacity = float(limit)
+                self.day.rate = float(limit) / 86400.0
+            if remaining is not None:
+                self.day.tokens = float(remaining)
+
+
+    @property
+    def remaining(self):
+        """
+        Requests left in today's budget, as far as the limiter knows.
+        """
+        with self._lock:
+            self.day.refill(self.clock())
+            return max(0, int(self.day.tokens))
@@ -0,0 +1,91 @@
+"""
+Process-wide registry of parsed method tables.
+
+Every API object created from the same method table (same api url,
+version and table contents) shares one read-only MethodTable, so
+creating more of them only costs a hash of the cache file. Tables are
+parsed and patched once per process; when workers are forked after a
+table has been loaded, they share its memory with the parent.
+"""
+import threading
+from types import MappingProxyType
+
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def digest(raw):
+    """
+    Identifies the contents of a method table from its encoded bytes.
+    """
+    import hashlib
+    return hashlib.sha1(raw).hexdigest()
+
+
+def patch_spec(spec):
+    """
+    Fixes known mistakes in the method table published by Etsy. Returns
+    a patched copy of spec.
+    """
+    spec = dict(spec)
+    # HACK: etsy api metadata isn't correct for submitTracking.
+    # We patch the correct data here.
+    if spec['name'] == 'submitTracking':
+        spec['params'] = dict(spec['params'])
+        spec['params']['shop_id'] = 'shop_id_or_name'
+        spec['params']['receipt_id'] = 'int'
+    return spec
+
+
+def freeze(spec):
+    """
+    A read-only view of a method spec, including its params and defaults.
+    """
+    spec = dict(spec)
+    for k in ('params', 'defaults'):
+        if isinstance(spec.get(k), dict):
+            spec[k] = MappingProxyType(dict(spec[k]))
+    return MappingProxyType(spec)
+
+
+
+class MethodTable(object):
+    """
+    A parsed method table: read-only method specs indexed by name, and
+    the RequestPlans compiled from them so far.
+    """
+    def __init__(self, methods, digest):
+        self.digest = digest
+        self.methods = MappingProxyType(dict(
+            (m['name'], freeze(patch_spec(m))) for m in methods))
+        self.plans = {}
+
+
+    def __len__(self):
+        return len(self.methods)
+
+
+
+def get_table(api_url, api_version, table_digest, load):
+    """
+    Returns the shared MethodTable for a table with the given digest,
+    calling load() to get its list of method specs only if no API object
+    in this process has used that table yet.
+    """
+    key = (api_url, api_version, table_digest)
+    table = _tables.get(key)
+    if table is None:
+        with _lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _tables[key] = MethodTable(load(), table_digest)
+    return table
+
+
+def clear():
+    """
+    Forgets every loaded table. API objects keep the tables they have.
+    """
+    with _lock:
+        _tables.clear()
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+import json
+import threading
+import time
+from ._core import missing
+
+
+class ResponseCache(object):
+    """
+    An in-memory cache of decoded responses to GET methods, for use with
+    the response_cache parameter of API objects:
+
+        cache = ResponseCache(default_ttl=30, ttls={'getShop': 300})
+        api = Etsy(api_key=key, response_cache=cache)
+
+    Entries are keyed on the method name, its parameters and the
+    identity the call was made with (api key or oauth token), and expire
+    after the method's ttl. When the cache holds more than max_bytes of
+    response data, the least recently used entries are evicted first.
+
+    Calls to POST, PUT and DELETE methods drop cached entries for the
+    resource they touch. The resource is the first two segments of the
+    url path, so e.g. updateListing on /listings/1 drops getListing and
+    findAllListingImages for listing 1, and createListing on /listings
+    drops every cached /listings/... entry. Entries cached under other
+    paths (such as /shops/:shop_id/listings/active) expire normally.
+
+    Cached results are shared between callers and must not be modified.
+    The cache can be shared between threads and API objects.
+    """
+    def __init__(self, default_ttl=60, ttls=None, max_bytes=64 * 1024 * 1024,
+                 clock=time.monotonic):
+        """
+        Parameters:
+            default_ttl  - Seconds a response is kept for, for methods
+                           not listed in ttls.
+            ttls         - dict of method name to ttl in seconds. A ttl
+                           of 0 disables caching for that method.
+            max_bytes    - Approximate upper bound on the size of the
+                           cached responses, measured as the length of
+                           the response bodies they were decoded from.
+            clock        - Returns the current time in seconds.
+        """
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def ttl(self, method_name):
+        return self.ttls.get(method_name, self.default_ttl)
+
+
+    def key(self, method_name, params, identity):
+        normalized = tuple(sorted((k, str(v)) for k, v in params.items()))
+        return (method_name, normalized, identity)
+
+
+    def get(self, key):
+        """
+        Returns the cached response for key, or missing.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+            self.misses += 1
+            return missing
+
+
+    def set(self, key, data, path, size=None):
+        """
+        Caches data, the decoded response for key. path is the url path
+        the response came from, used for invalidation. size is the length
+        of the response body; if it is not known, data is encoded as JSON
+        to measure it.
+        """
+        ttl = self.ttl(key[0])
+        if not ttl:
+            return
+        if size is None:
+            size = len(json.dumps(data, separators=(',', ':')))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + ttl, data, resource(path), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+
+    def invalidate(self, path):
+        """
+        Drops every entry for the resource at path, and for resources
+        below it.
+        """
+        r = resource(path)
+        prefix = r + '/'
+        with self._lock:
+            stale = [k for k, e in self._entries.items()
+                     if e[2] == r or e[2].startswith(prefix)]
+            for k in stale:
+                self._remove(k)
+            self.invalidations += len(stale)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations,
+                    'entries': len(self._entries), 'bytes': self.size}
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)[3]
+
+
+
+def resource(path):
+    """
+    The resource a url path refers to: its first two segments, without
+    the query string. '/listings/1/images' -> '/listings/1'.
+    """
+    path = path.split('?', 1)[0]
+    return '/'.join(path.split('/')[:3])
@@ -0,0 +1,128 @@
+import sys
+import threading
+import weakref
+
+
+class Result(object):
+    """
+    The outcome of one API call, returned by APIMethod.fetch:
+
+        result = api.findAllShopListingsActive.fetch(shop_id=1, limit=100)
+        result.results, result.count, result.pagination
+
+    Attributes:
+        method_name  - Name of the API method, or None.
+        http_method  - 'GET', 'POST', 'PUT' or 'DELETE'.
+        url          - The full url the request was sent to.
+        params       - The arguments the method was called with.
+        data         - The decoded response.
+        results      - data['results'].
+        count        - data['count'], the total number of results.
+        status_code  - HTTP status of the response.
+        headers      - Response headers.
+        elapsed      - Seconds spent sending the request and waiting
+                       for the response, including retries.
+        from_cache   - True if the result came from a ResponseCache.
+        shared       - True if the result came from an identical request
+                       made at the same time by another caller.
+        size         - Length of the response body it was decoded from,
+                       or None.
+    """
+    __slots__ = ('method_name', 'http_method', 'url', 'params', 'data',
+                 'results', 'count', 'status_code', 'headers', 'elapsed',
+                 'from_cache', 'shared', 'size')
+
+    def __init__(self, method_name, http_method, url, params):
+        self.method_name = method_name
+        self.http_method = http_method
+        self.url = url
+        self.params = params
+        self.data = None
+        self.results = None
+        self.count = None
+        self.status_code = None
+        self.headers = None
+        self.elapsed = None
+        self.from_cache = False
+        self.shared = False
+        self.size = None
+
+
+    def share(self, other):
+        """
+        Fills in this result from other, the result of an identical
+        request.
+        """
+        self.url = other.url
+        self.data = other.data
+        self.results = other.results
+        self.count = other.count
+        self.status_code = other.status_code
+        self.headers = other.headers
+        self.elapsed = other.elapsed
+        self.size = other.size
+        self.shared = True
+
+
+    def set_data(self, data):
+        self.data = data
+        self.results = data['results']
+        self.count = data['count']
+
+
+    @property
+    def pagination(self):
+        """
+        The pagination block of the response, if Etsy sent one.
+        """
+        return self.data.get('pagination') if self.data else None
+
+
+    @property
+    def type(self):
+        return self.data.get('type') if self.data else None
+
+
+    def __repr__(self):
+        return '<Result %s %s count=%r>' % (self.http_method, self.url, self.count)
+
+
+
+class CallState(object):
+    """
+    Remembers the last Result per thread, and per asyncio task, so that
+    one API object can be shared by many threads or tasks without them
+    seeing each other's calls. Everything is kept on this object, so
+    results are freed along with the API object that made them.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._tasks = weakref.WeakKeyDictionary()
+
+
+    def _task(self):
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is None:
+            return None
+        # python < 3.7 has only Task.current_task
+        current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+        try:
+            return current_task()
+        except RuntimeError:
+            # no event loop running in this thread
+            return None
+
+
+    def get(self):
+        task = self._task()
+        if task is not None:
+            return self._tasks.get(task)
+        return getattr(self._local, 'result', None)
+
+
+    def set(self, result):
+        task = self._task()
+        if task is not None:
+            self._tasks[task] = result
+        else:
+            self._local.result = result
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is sent again, for use with
+    the retry_policy parameter of API objects:
+
+        api = Etsy(api_key=key, retry_policy=RetryPolicy(max_attempts=5))
+
+    A request is retried when it fails with a network error (connection
+    reset, timeout) or comes back with one of status_codes, as long as
+    its http method is in methods. By default only GET, PUT and DELETE
+    are retried, since sending a POST twice may create something twice.
+
+    The delay before each retry grows exponentially from backoff up to
+    max_backoff, with full jitter so that many clients failing at once
+    do not retry in lockstep. If the response has a Retry-After header,
+    that delay is used instead, unless it is longer than max_retry_after
+    in which case the request is not retried.
+
+    Each API method also has a retry budget. Every request adds
+    budget_ratio to its method's budget, up to budget_max, and every
+    retry spends 1. Once a method's budget is spent its failures are
+    returned to the caller right away, so that during an outage retries
+    add at most budget_ratio extra load.
+
+    One policy can be shared by many threads and API objects.
+    """
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30, jitter=True,
+                 status_codes=(429, 500, 502, 503, 504),
+                 methods=('GET', 'PUT', 'DELETE'), max_retry_after=120,
+                 budget_ratio=0.2, budget_max=10, random=random.random,
+                 sleep=time.sleep, clock=time.time):
+        """
+        Parameters:
+            max_attempts - Total number of times a request is sent.
+            backoff      - Delay before the first retry, in seconds.
+            max_backoff  - Upper bound on the delay between retries.
+            jitter       - If True, each delay is drawn uniformly
+                           between 0 and the exponential backoff.
+            status_codes - Response status codes that are retried.
+            methods      - Http methods that are retried.
+            max_retry_after - Longest Retry-After delay that is honored,
+                           in seconds.
+            budget_ratio - Retries earned per request, per method.
+            budget_max   - Most retries a method can have saved up.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes)
+        self.methods = frozenset(methods)
+        self.max_retry_after = max_retry_after
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.random = random
+        self.sleep = sleep
+        self.clock = clock
+
+        self._budgets = {}
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+
+
+    def record_request(self, method_name):
+        """
+        Called once for every request before it is first sent.
+        """
+        with self._lock:
+            budget = self._budgets.get(method_name, self.budget_max)
+            self._budgets[method_name] = min(self.budget_max, budget + self.budget_ratio)
+
+
+    def budget(self, method_name):
+        with self._lock:
+            return self._budgets.get(method_name, self.budget_max)
+
+
+    def retry_delay(self, http_method, method_name, attempt, response=None):
+        """
+        Returns the number of seconds to wait before sending a request
+        again, or None if it should not be retried. attempt is the number
+        of times the request has been sent so far. response is None if
+        the request failed with a network error.
+        """
+        if attempt >= self.max_attempts or http_method not in self.methods:
+            return None
+
+        retry_after = None
+        if response is not None:
+            if response.status_code not in self.status_codes:
+                return None
+            retry_after = self.retry_after(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return None
+
+        with self._lock:
+            budget = self._budgets.get(method_name, self.budget_max)
+            if budget < 1:
+                self.exhausted += 1
+                return None
+            self._budgets[method_name] = budget - 1
+            self.retries += 1
+
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = self.random() * delay
+        return delay
+
+
+    def retry_after(self, response):
+        """
+        The delay requested by the response's Retry-After header, in
+        seconds, or None.
+        """
+        headers = getattr(response, 'headers', None)
+        value = headers.get('Retry-After') if headers else None
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_tz, mktime_tz
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, mktime_tz(parsed) - self.clock())
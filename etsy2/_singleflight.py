@@ -0,0 +1,95 @@
+import threading
+
+
+class Flight(object):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+
+class SingleFlight(object):
+    """
+    Lets identical GET requests that are in flight at the same time share
+    one request, for use with the single_flight parameter of API objects:
+
+        api = Etsy(api_key=key, single_flight=SingleFlight())
+
+    Requests are identical when they have the same url (which includes
+    every parameter) and are made as the same user. The first caller
+    sends the request; callers that ask for the same url before it has
+    finished wait for it and get its decoded response, or its exception.
+    Nothing is kept once the request has finished, so unlike a
+    ResponseCache this never returns stale data.
+
+    Shared results must not be modified. Works with threads, and with
+    asyncio tasks of AsyncEtsy. One SingleFlight can be shared by many
+    API objects.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._futures = {}
+        self.shared = 0
+
+
+    def do(self, key, fn):
+        """
+        Calls fn, unless a call with the same key is in progress, in which
+        case waits for it instead. Returns a (value, shared) tuple;
+        shared is True if the value came from another caller's call.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            flight.value = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value, False
+
+
+    async def do_async(self, key, fn):
+        """
+        Coroutine version of do, for calls made from one event loop.
+        fn returns an awaitable, which is run as a task of its own so
+        that cancelling one caller only stops that caller waiting for it.
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        key = (loop, key)
+        task = self._futures.get(key)
+        leader = task is None
+        if leader:
+            task = self._futures[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._landed(key, t))
+        else:
+            self.shared += 1
+        return (await asyncio.shield(task)), not leader
+
+
+    def _landed(self, key, task):
+        if self._futures.get(key) is task:
+            del self._futures[key]
+        if not task.cancelled():
+            # the callers may all have stopped waiting
+            task.exception()
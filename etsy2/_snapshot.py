@@ -0,0 +1,78 @@
+"""
+Method table snapshots, which let API objects be created without
+downloading the method table first.
+
+Snapshots are written by running this module with an api key:
+
+    $ ETSY_API_KEY=... python -m etsy2._snapshot methods.v2.json
+
+which downloads the live table and writes it, with a header naming the
+api version and when it was taken, to the given file. Pass that file as
+method_snapshot to use it.
+"""
+import json
+import os
+import sys
+import time
+
+
+format_version = 1
+
+
+def encode(methods, api_version, created=None):
+    """
+    Returns the encoded snapshot of a list of method specs.
+    """
+    if created is None:
+        created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    return json.dumps({
+        'format': format_version,
+        'api_version': api_version,
+        'created': created,
+        'methods': methods,
+    }, indent=1, sort_keys=True).encode('utf-8')
+
+
+def decode(raw, api_version):
+    """
+    Returns the list of method specs in an encoded snapshot. Raises
+    ValueError if it is not a snapshot of api_version's table.
+    """
+    snapshot = json.loads(raw.decode('utf-8'))
+    if not isinstance(snapshot, dict) or snapshot.get('format') != format_version:
+        raise ValueError('Unknown method table snapshot format.')
+    if snapshot.get('api_version') != api_version:
+        raise ValueError('Method table snapshot is for api %s, not %s.' % (
+                snapshot.get('api_version'), api_version))
+    return snapshot['methods']
+
+
+def write(api, filename):
+    """
+    Downloads api's live method table and writes it as a snapshot.
+    Returns the file name.
+    """
+    raw = encode(api.get_method_table(), api.api_version)
+    tmp = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp, filename)
+    return filename
+
+
+def main(argv):
+    from ._v2 import EtsyV2
+    if len(argv) != 2:
+        sys.stderr.write('Usage: python -m etsy2._snapshot <output file>\n')
+        return 2
+    api_key = os.environ.get('ETSY_API_KEY')
+    if not api_key:
+        sys.stderr.write('Set ETSY_API_KEY to download the method table.\n')
+        return 2
+    api = EtsyV2(api_key, method_cache=None, method_snapshot=None)
+    print('Wrote %s' % write(api, argv[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,346 @@
+import codecs
+import collections
+import json
+
+
+_end = object()
+_whitespace = ' \t\n\r'
+_number_chars = '0123456789.eE+-'
+
+
+class ResultStream(object):
+    """
+    The results of one call, parsed one at a time while the response
+    body is still arriving. Returned by APIMethod.stream:
+
+        with api.findAllShopListingsActive.stream(shop_id=1, limit=100,
+                                                  includes='Images') as stream:
+            print(stream.count)
+            for listing in stream:
+                save(listing)
+
+    Only the part of the body that has not been parsed yet, and the
+    record being parsed, are kept in memory. count reads the body up to
+    the count field, without parsing any results, so it is known before
+    the first record is. After iterating, result.data holds the rest of
+    the response (count, params, type, pagination), without the results.
+
+    A stream can be iterated once. The connection is released when the
+    iteration ends, or by close().
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, result, chunks, close=None):
+        """
+        Parameters:
+            result       - The Result of the call; its count and data are
+                           filled in as they are parsed.
+            chunks       - An iterable of the bytes of the response body.
+            close        - Called once the body is no longer needed.
+        """
+        self.result = result
+        self._chunks = iter(chunks)
+        self._close = close
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._state = 'start'
+        self._data = {}
+
+
+    @property
+    def count(self):
+        """
+        The total number of results, or None if the response has no count
+        before its results.
+        """
+        while self.result.count is None and self._state in ('start', 'keys'):
+            self._advance()
+        return self.result.count
+
+
+    def __iter__(self):
+        try:
+            while self._state != 'done':
+                if self._state == 'results':
+                    item = self._next_result()
+                    if item is not _end:
+                        yield item
+                else:
+                    self._advance()
+        finally:
+            self.close()
+
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _fill(self, need=1):
+        """
+        Reads at least need more characters of the body, unless it ends
+        first. Returns False at the end of the body.
+        """
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        added = 0
+        while added < need:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                text = self._text.decode(b'', True)
+                self._eof = True
+            else:
+                text = self._text.decode(chunk) if isinstance(chunk, bytes) else chunk
+            self._buf += text
+            added += len(text)
+            if self._eof:
+                return added > 0
+        return True
+
+
+    def _peek(self):
+        """
+        The next character that isn't whitespace, without consuming it.
+        """
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _whitespace:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                self._error('unexpected end of response')
+
+
+    def _expect(self, c):
+        if self._peek() != c:
+            self._error('expected %r' % c)
+        self._pos += 1
+
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except ValueError:
+                value = end = None
+            # a value that stops at the end of what has arrived so far may
+            # continue in the next chunk, e.g. a number, which may also
+            # stop short of a trailing '.' or exponent cut off by the chunk
+            if end is not None and (self._eof or not self._number_may_continue(value, end)):
+                self._pos = end
+                return value
+            if self._eof:
+                self._error('invalid JSON')
+            # read at least as much again, so large values are not
+            # re-parsed once per chunk
+            self._fill(max(len(self._buf) - self._pos, 1))
+
+
+    def _number_may_continue(self, value, end):
+        if end == len(self._buf):
+            return True
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        buf = self._buf
+        for i in range(end, len(buf)):
+            if buf[i] not in _number_chars:
+                return False
+        return True
+
+
+    def _advance(self):
+        if self._state == 'start':
+            self._expect('{')
+            self._state = 'keys'
+            return
+
+        c = self._peek()
+        if c == '}':
+            self._pos += 1
+            self._state = 'done'
+            self.result.data = self._data
+            return
+        if c == ',':
+            self._pos += 1
+        key = self._value()
+        self._expect(':')
+        if key == 'results':
+            self._expect('[')
+            self._state = 'results'
+            return
+        value = self._data[key] = self._value()
+        if key == 'count':
+            self.result.count = value
+
+
+    def _next_result(self):
+        c = self._peek()
+        if c == ']':
+            self._pos += 1
+            self._state = 'keys'
+            return _end
+        if c == ',':
+            self._pos += 1
+        return self._value()
+
+
+    def _error(self, problem):
+        self.close()
+        self._state = 'done'
+        raise ValueError('Could not decode response from Etsy as JSON: %s at %r, '
+                         'status_code: %r, url %r' % (
+                             problem, self._buf[self._pos:self._pos + 100],
+                             self.result.status_code, self.result.url))
+
+
+
+class _NeedMore(Exception):
+    """
+    Raised by AsyncResultStream._fill when the chunks received so far run
+    out; need is how many more characters it wanted.
+    """
+    def __init__(self, need):
+        Exception.__init__(self, need)
+        self.need = need
+
+
+
+class AsyncResultStream(ResultStream):
+    """
+    The asyncio counterpart of ResultStream, returned by APIMethod.stream
+    of an AsyncEtsy:
+
+        stream = await etsy.findAllShopListingsActive.stream(shop_id=1, limit=100)
+        async with stream:
+            print(await stream.count)
+            async for listing in stream:
+                save(listing)
+
+    The body is parsed by ResultStream's parser one step (a key, value or
+    result) at a time. When a step runs out of body, the next chunk is
+    awaited and the step is parsed again from where it started.
+    """
+    def __init__(self, result, chunks, close=None):
+        """
+        Parameters:
+            result       - The Result of the call; its count and data are
+                           filled in as they are parsed.
+            chunks       - An async iterator of the bytes of the response
+                           body.
+            close        - Called once the body is no longer needed.
+        """
+        ResultStream.__init__(self, result, (), close)
+        self._async_chunks = chunks
+        self._received = collections.deque()
+        self._ended = False
+
+
+    @property
+    def count(self):
+        """
+        Awaitable of the total number of results, or None if the response
+        has no count before its results.
+        """
+        return self._count()
+
+
+    async def _count(self):
+        while self.result.count is None and self._state in ('start', 'keys'):
+            await self._step(self._advance)
+        return self.result.count
+
+
+    def __iter__(self):
+        raise TypeError('Use async for to iterate over an AsyncResultStream.')
+
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self):
+        try:
+            while self._state != 'done':
+                if self._state == 'results':
+                    item = await self._step(self._next_result)
+                    if item is not _end:
+                        return item
+                else:
+                    await self._step(self._advance)
+        except BaseException:
+            self.close()
+            raise
+        self.close()
+        raise StopAsyncIteration
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+    async def _step(self, parse):
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        while True:
+            try:
+                return parse()
+            except _NeedMore as e:
+                # parse steps only change anything but the buffer position
+                # once they have read all they need
+                self._pos = 0
+                await self._receive(e.need)
+
+
+    async def _receive(self, need):
+        """
+        Awaits chunks of the body until about need more characters have
+        arrived, or the body ends.
+        """
+        got = 0
+        while got < need:
+            try:
+                chunk = await self._async_chunks.__anext__()
+            except StopAsyncIteration:
+                self._ended = True
+                return
+            self._received.append(chunk)
+            got += len(chunk)
+
+
+    def _fill(self, need=1):
+        added = 0
+        while added < need:
+            if self._received:
+                chunk = self._received.popleft()
+                text = self._text.decode(chunk) if isinstance(chunk, bytes) else chunk
+            elif self._ended:
+                text = self._text.decode(b'', True)
+                self._eof = True
+            else:
+                raise _NeedMore(need - added)
+            self._buf += text
+            added += len(text)
+            if self._eof:
+                return added > 0
+        return True
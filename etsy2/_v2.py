@@ -6,7 +6,8 @@ class EtsyV2(API):
     api_version = 'v2'
 
     def __init__(self, api_key='', key_file=None, method_cache=missing,
-                 etsy_env=EtsyEnvProduction(), log=None, etsy_oauth_client=None):
+                 etsy_env=EtsyEnvProduction(), log=None, etsy_oauth_client=None,
+                 **kwargs):
         self.api_url = etsy_env.api_url
         self.etsy_oauth_client = None
 
@@ -16,9 +17,20 @@ class EtsyV2(API):
             api_key = None
             key_file = None
 
-        super(EtsyV2, self).__init__(api_key, key_file, method_cache, log)
+        super(EtsyV2, self).__init__(api_key, key_file, method_cache, log, **kwargs)
 
-    def _get_url(self, url, http_method, body):
         if self.etsy_oauth_client is not None:
-            return self.etsy_oauth_client.do_oauth_request(url, http_method, body)
-        return API._get_url(self, url, http_method, body)
+            # share the keep-alive connection pool with the oauth session
+            self.mount_adapters(self.etsy_oauth_client.oauth1Session)
+
+    def _auth_identity(self):
+        if self.etsy_oauth_client is not None:
+            return self.etsy_oauth_client.resource_owner_key
+        return API._auth_identity(self)
+
+    def _get_url(self, url, http_method, body, stream=False):
+        if self.etsy_oauth_client is not None:
+            return self.etsy_oauth_client.do_oauth_request(url, http_method, body,
+                                                           timeout=self.timeout,
+                                                           stream=stream)
+        return API._get_url(self, url, http_method, body, stream)
@@ -1,7 +1,6 @@
-import requests
 from urllib.parse import quote
-from requests_oauthlib import OAuth1Session
 from .etsy_env import EtsyEnvProduction
+from ._multipart import MultipartBody
 
 # TODO add support for generating the oauth credentials - may want to inherit from OAuth1Session
 class EtsyOAuthClient():
@@ -15,25 +14,53 @@ class EtsyOAuthClient():
     resource_owner_secret is the oauth_token_secret for the user whose data is being retrieved.
     '''
     def __init__(self, client_key, client_secret, resource_owner_key, resource_owner_secret, logger=None):
+        from requests_oauthlib import OAuth1Session
         self.oauth1Session = OAuth1Session(client_key,
                                            client_secret=client_secret,
                                            resource_owner_key=resource_owner_key,
                                            resource_owner_secret=resource_owner_secret)
+        self.resource_owner_key = resource_owner_key
         self.logger = logger
 
-    def do_oauth_request(self, url, http_method, data):
+    def do_oauth_request(self, url, http_method, data, timeout=None, stream=False):
         # TODO data seems to work for PUT and POST /listing. See if data
         # can handle image/actual file data updates if so don't need to split path.
-        if (http_method == "POST"):
-            response = self.oauth1Session.request(http_method, url, files=data)
+        if isinstance(data, MultipartBody):
+            # the body is not part of the signature of multipart requests,
+            # so it can be streamed
+            response = self.oauth1Session.request(
+                http_method, url, data=data, headers={'Content-Type': data.content_type},
+                timeout=timeout, stream=stream)
+        elif (http_method == "POST"):
+            response = self.oauth1Session.request(http_method, url, files=data,
+                                                  timeout=timeout, stream=stream)
         else:
-            response = self.oauth1Session.request(http_method, url, data=data)
+            response = self.oauth1Session.request(http_method, url, data=data,
+                                                  timeout=timeout, stream=stream)
 
         if self.logger:
-            self.logger.debug('do_oauth_request: response = %r' % response)
+            self.logger.debug('do_oauth_request: response = %r', response)
 
         return response
 
+    def sign(self, url, http_method, body=None, headers=None):
+        '''
+        Signs a request without sending it. Returns the (url, headers, body)
+        tuple to send. Used by clients that bring their own transport, e.g.
+        AsyncEtsyV2. body must be a form-urlencoded string or None; multipart
+        bodies are not part of the oauth signature.
+        '''
+        url, headers, body = self.oauth1Session._client.client.sign(url, http_method, body, headers)
+        # the session's client is configured to return bytes
+        if isinstance(url, bytes):
+            url = url.decode('utf-8')
+        headers = dict((k.decode('utf-8') if isinstance(k, bytes) else k,
+                        v.decode('utf-8') if isinstance(v, bytes) else v)
+                       for k, v in headers.items())
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        return url, headers, body
+
 class EtsyOAuthHelper:
     '''
     Used to get the oauth token for the user you want to make requests with.
@@ -58,6 +85,7 @@ class EtsyOAuthHelper:
         callback_uri is a path in your application where the user should be redirected after login
         etsy_env is always prod because there is only one etsy environment as of now
         '''
+        from requests_oauthlib import OAuth1Session
         oauth = OAuth1Session(api_key, client_secret=shared_secret, callback_uri=callback_uri)
 
         request_token_url = etsy_env.request_token_url
@@ -91,6 +119,7 @@ class EtsyOAuthHelper:
             in get_request_url_and_token_secret with the query string etsy appended to it.
         etsy_env is always prod because there is only one etsy environment as of now.
         '''
+        from requests_oauthlib import OAuth1Session
         oauth = OAuth1Session(api_key, shared_secret)
         oauth_response = oauth.parse_authorization_response(auth_url)
         oauth = OAuth1Session(api_key,
@@ -125,6 +154,7 @@ class EtsyOAuthHelper:
             was specified in get_request_url_and_token_secret.
         etsy_env is always prod because there is only one etsy environment as of now.
         '''
+        from requests_oauthlib import OAuth1Session
         oauth = OAuth1Session(api_key, shared_secret)
         oauth = OAuth1Session(api_key,
                   client_secret=shared_secret,
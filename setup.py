@@ -21,4 +21,5 @@ setup(
         'Source Code': 'https://github.com/sscheetz/etsy-python2'
     },
     install_requires=['requests_oauthlib'],
+    extras_require={'async': ['aiohttp']},
 )
\ No newline at end of file
@@ -0,0 +1,216 @@
+from urllib.parse import urlparse, parse_qs
+import asyncio
+import threading
+import unittest
+
+import requests
+
+from etsy2._async import AsyncEtsyV2
+from etsy2._retry import RetryPolicy
+from .test_core import MockAPI
+from .util import Test
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+
+class StubEnv(object):
+    def __init__(self, api_url):
+        self.api_url = api_url
+
+
+class MockAsyncAPI(AsyncEtsyV2):
+    get_method_table = MockAPI.get_method_table
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class AsyncTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.loop = asyncio.new_event_loop()
+        self.requests = []
+        self.bodies = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def handler(request):
+            self.requests.append(request)
+            self.bodies.append(await request.read())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if 'offset' in request.query:
+                limit, offset = int(request.query['limit']), int(request.query['offset'])
+                if offset == 4:
+                    return web.Response(status=503, text='unavailable')
+                results = list(range(7))[offset:offset + limit]
+                return web.json_response({'count': 7, 'results': results})
+            return web.json_response({'count': 2, 'results': [1, 2]})
+
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        self.server = TestServer(app, loop=self.loop)
+        self.await_(self.server.start_server())
+        self.api = MockAsyncAPI('apikey', method_cache=None, max_concurrency=3,
+                                etsy_env=StubEnv(str(self.server.make_url('')).rstrip('/')))
+
+
+    def tearDown(self):
+        self.await_(self.api.aclose())
+        self.await_(self.server.close())
+        self.loop.close()
+        Test.tearDown(self)
+
+
+    def await_(self, coro):
+        return self.loop.run_until_complete(coro)
+
+
+    def test_methods_return_awaitables(self):
+        x = self.await_(self.api.testMethod(test_id='foo', limit=1))
+        self.assertEqual(x, [1, 2])
+
+
+    def test_fetch_returns_result(self):
+        result = self.await_(self.api.testMethod.fetch(test_id='foo', limit=1))
+        self.assertEqual(result.results, [1, 2])
+        self.assertEqual(result.count, 2)
+        self.assertEqual(result.status_code, 200)
+
+
+    def test_stream(self):
+        async def read():
+            stream = await self.api.testMethod.stream(test_id='foo', limit=1)
+            results = []
+            async with stream:
+                count = await stream.count
+                async for r in stream:
+                    results.append(r)
+            return count, results, stream.result
+
+        count, results, result = self.await_(read())
+        self.assertEqual(count, 2)
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data, {'count': 2})
+
+
+    def test_stream_validates_params(self):
+        self.assertRaises(ValueError, self.api.testMethod.stream, test_id='foo', fizz='goo')
+
+
+    def test_method_table_download_retried(self):
+        attempts = []
+
+        class DownAPI(AsyncEtsyV2):
+            def _get_url(self, url, http_method, data, stream=False):
+                attempts.append(url)
+                raise requests.ConnectionError('down')
+
+        policy = RetryPolicy(max_attempts=3, sleep=lambda s: None)
+        self.assertRaises(requests.ConnectionError, DownAPI, 'apikey', method_cache=None,
+                          retry_policy=policy, etsy_env=StubEnv('http://localhost'))
+        self.assertEqual(len(attempts), 3)
+
+
+    def test_url_built_like_sync_client(self):
+        result = self.await_(self.api.testMethod.fetch(test_id='foo', limit=1))
+        request = self.requests[0]
+        self.assertEqual(request.path, '/test/foo')
+        self.assertEqual(parse_qs(urlparse(result.url).query),
+                         {'api_key': ['apikey'], 'limit': ['1']})
+
+
+    def test_type_checked_before_await(self):
+        msg = self.assertRaises(ValueError, self.api.testMethod,
+                                test_id=1, limit=5.6)
+        self.assertEqual(msg, "Bad value for parameter limit of type 'int' - 5.6")
+
+
+    def test_concurrency_bounded(self):
+        async def many():
+            return await asyncio.gather(
+                *[self.api.testMethod(test_id=i) for i in range(10)])
+
+        self.assertEqual(self.await_(many()), [[1, 2]] * 10)
+        self.assertEqual(len(self.requests), 10)
+        self.assertTrue(self.max_in_flight <= 3)
+
+
+    def test_single_flight(self):
+        from etsy2 import SingleFlight
+        self.api.single_flight = SingleFlight()
+
+        async def many():
+            return await asyncio.gather(
+                *[self.api.testMethod.fetch(test_id=1) for i in range(10)])
+
+        results = self.await_(many())
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual([r.results for r in results], [[1, 2]] * 10)
+        self.assertEqual(sum(r.shared for r in results), 9)
+
+
+    def test_oauth_requests_are_signed(self):
+        from etsy2.oauth import EtsyOAuthClient
+        self.api.etsy_oauth_client = EtsyOAuthClient('ck', 'cs', 'rk', 'rs')
+        self.await_(self.api.testMethod(test_id='foo'))
+        auth = self.requests[0].headers['Authorization']
+        self.assertTrue(auth.startswith('OAuth '))
+        self.assertTrue('oauth_token="rk"' in auth)
+        self.assertTrue('oauth_signature=' in auth)
+
+
+    def test_oauth_posts_are_multipart(self):
+        from etsy2.oauth import EtsyOAuthClient
+        self.api.etsy_oauth_client = EtsyOAuthClient('ck', 'cs', 'rk', 'rs')
+        url = self.api.api_url + '/listings'
+        response = self.await_(self.api._get_url_async(
+            url, 'POST', {'title': (None, 'mug'), 'quantity': (None, '2')}))
+        self.assertEqual(response.status_code, 200)
+        request = self.requests[0]
+        self.assertTrue(request.headers['Content-Type'].startswith('multipart/form-data'))
+        self.assertTrue('oauth_signature=' in request.headers['Authorization'])
+        self.assertTrue(b'name="title"\r\n\r\nmug\r\n' in self.bodies[0])
+        self.assertTrue(b'name="quantity"\r\n\r\n2\r\n' in self.bodies[0])
+
+
+    def test_quota_reserved_off_the_event_loop(self):
+        threads = []
+
+        class Quota(object):
+            max_wait = None
+
+            def reserve(self):
+                threads.append(threading.current_thread())
+                return 0
+
+        self.api.quota = Quota()
+        self.await_(self.api.testMethod(test_id='foo'))
+        self.assertEqual(len(threads), 1)
+        self.assertFalse(threads[0] is threading.current_thread())
+
+
+    def test_paginate(self):
+        async def read(prefetch):
+            results = []
+            async for r in self.api.paginate('testMethod', page_size=3, prefetch=prefetch,
+                                             test_id=1):
+                results.append(r)
+            return results
+
+        for prefetch in (False, True):
+            self.requests = []
+            self.assertEqual(self.await_(read(prefetch)), list(range(7)))
+            self.assertEqual([r.query['offset'] for r in self.requests], ['0', '3', '6'])
+
+
+    def test_fetch_pages(self):
+        pages = self.await_(self.api.fetch_pages('testMethod', page_size=2, test_id=1))
+        self.assertEqual([p.offset for p in pages], [0, 2, 4, 6])
+        self.assertEqual([p.results for p in pages], [[0, 1], [2, 3], None, [6]])
+        self.assertTrue(isinstance(pages[2].error, ValueError))
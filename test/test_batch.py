@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+
+from etsy2 import BatchLoader
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class ListingAPI(object):
+    """
+    Stands in for getListing: returns one result per known id, and fails
+    the whole call if any id is 'bad'.
+    """
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+
+    def getListing(self, listing_id, includes=None):
+        with self.lock:
+            self.calls.append(list(listing_id))
+        if 'bad' in listing_id:
+            raise ValueError('bad listing id')
+        return [{'listing_id': int(i), 'includes': includes}
+                for i in listing_id if i != 404]
+
+
+
+class AsyncListingAPI(ListingAPI):
+    async def getListing(self, listing_id, includes=None):
+        await asyncio.sleep(0)
+        return ListingAPI.getListing(self, listing_id, includes)
+
+
+
+class ArrayAPI(MockAPI):
+    def get_method_table(self, *args):
+        return [{'name': 'getListing',
+                 'uri': '/listings/:listing_id',
+                 'http_method': 'GET',
+                 'params': {'listing_id': 'array(int)'},
+                 'type': 'Listing',
+                 'description': 'listings.'}]
+
+
+    def _get_url(self, url, http_method, data):
+        self.urls.append(url)
+        return MockResponse('{"count": 2, "results": [{"listing_id": 2}, {"listing_id": 1}]}')
+
+
+
+class BatchLoaderTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.api = ListingAPI()
+
+
+    def load_concurrently(self, loader, keys):
+        results = {}
+        errors = {}
+
+        def worker(k):
+            try:
+                results[k] = loader.load(k)
+            except Exception as e:
+                errors[k] = e
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in keys]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, errors
+
+
+    def test_threads_share_one_call(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', window=0.2)
+        results, errors = self.load_concurrently(loader, range(10))
+        self.assertEqual(errors, {})
+        self.assertEqual(len(self.api.calls), 1)
+        self.assertEqual(sorted(self.api.calls[0]), list(range(10)))
+        for k in range(10):
+            self.assertEqual(results[k]['listing_id'], k)
+
+
+    def test_batches_capped(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', max_batch=4, window=0.01)
+        results = loader.load_many(range(10))
+        self.assertEqual([r['listing_id'] for r in results], list(range(10)))
+        self.assertEqual([len(c) for c in self.api.calls], [4, 4, 2])
+
+
+    def test_load_many_does_not_wait_out_window(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', max_batch=4, window=60)
+        start = time.time()
+        loader.load_many(range(6))
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual([len(c) for c in self.api.calls], [4, 2])
+
+
+    def test_full_batch_not_delayed(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', max_batch=3, window=60)
+        results, errors = self.load_concurrently(loader, range(3))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(self.api.calls), 1)
+
+
+    def test_duplicate_ids_sent_once(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id')
+        results = loader.load_many([1, 2, 1])
+        self.assertEqual(self.api.calls, [[1, 2]])
+        self.assertTrue(results[0] is results[2])
+
+
+    def test_missing_result_fails_only_its_caller(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', window=0.2)
+        results, errors = self.load_concurrently(loader, [1, 404, 3])
+        self.assertEqual(sorted(results), [1, 3])
+        self.assertTrue(isinstance(errors[404], KeyError))
+        self.assertEqual(len(self.api.calls), 1)
+
+
+    def test_failed_batch_split(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', window=0.2)
+        results, errors = self.load_concurrently(loader, [1, 'bad', 3])
+        self.assertEqual(sorted(results), [1, 3])
+        self.assertTrue(isinstance(errors['bad'], ValueError))
+        self.assertEqual(len(self.api.calls), 4)
+
+
+    def test_failed_batch_not_split(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id',
+                             split_on_error=False)
+        self.assertRaises(ValueError, loader.load_many, [1, 'bad'])
+        self.assertEqual(len(self.api.calls), 1)
+
+
+    def test_params_and_key(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id', includes='Images',
+                             key=lambda r: r['listing_id'])
+        self.assertEqual(loader.load(10), {'listing_id': 10, 'includes': 'Images'})
+
+
+    def test_string_ids_match(self):
+        loader = BatchLoader(self.api, 'getListing', 'listing_id')
+        self.assertEqual(loader.load('7')['listing_id'], 7)
+
+
+    def test_ids_joined_in_url(self):
+        api = ArrayAPI('apikey', method_cache=None)
+        api.urls = []
+        loader = BatchLoader(api, 'getListing', 'listing_id')
+        self.assertEqual(loader.load_many([1, 2]), [{'listing_id': 1}, {'listing_id': 2}])
+        self.assertEqual(api.urls, ['http://host/listings/1,2?api_key=apikey'])
+
+
+    def test_async_tasks_share_one_call(self):
+        api = AsyncListingAPI()
+        loader = BatchLoader(api, 'getListing', 'listing_id', max_batch=4)
+
+        async def main():
+            return await asyncio.gather(loader.load_many_async(range(6)),
+                                        loader.load_async(404),
+                                        return_exceptions=True)
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(main())
+        finally:
+            loop.close()
+        self.assertEqual([r['listing_id'] for r in results[0]], list(range(6)))
+        self.assertTrue(isinstance(results[1], KeyError))
+        self.assertEqual([len(c) for c in api.calls], [4, 3])
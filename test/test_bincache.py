@@ -0,0 +1,128 @@
+import json
+import os
+import time
+
+from etsy2 import _registry, _bincache
+from .test_core import MockAPI, MockLog
+from .util import Test
+
+
+class BinaryCacheTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        _registry.clear()
+        self.json_file = os.path.join(self.scratch_dir, 'methods.json')
+        self.bin_file = os.path.join(self.scratch_dir, 'methods.bin')
+
+
+    def tearDown(self):
+        _registry.clear()
+        Test.tearDown(self)
+
+
+    def api(self, method_cache_format='binary'):
+        return MockAPI('key', method_cache=self.json_file, log=MockLog(self),
+                       method_cache_format=method_cache_format)
+
+
+    def test_writes_both_files(self):
+        self.api()
+        self.assertTrue(os.path.isfile(self.json_file))
+        self.assertTrue(os.path.isfile(self.bin_file))
+
+
+    def test_json_format_writes_no_binary(self):
+        self.api('json')
+        self.assertFalse(os.path.exists(self.bin_file))
+
+
+    def test_reads_binary(self):
+        first = self.api()
+        _registry.clear()
+        api = self.api()
+        api.log.assertLine('Reading method table cache: %s' % self.bin_file)
+        self.assertTrue(api.method_cache.used_cache)
+        self.assertFalse(api.method_cache.wrote_cache)
+        self.assertEqual(api.method_table.digest, first.method_table.digest)
+        self.assertEqual(dict(api.method_table.methods['testMethod']['params']),
+                         dict(first.method_table.methods['testMethod']['params']))
+        self.assertEqual(api.testMethod(test_id=1), [1, 2])
+
+
+    def test_same_table_as_json(self):
+        json_api = self.api('json')
+        self.api()
+        api = self.api()
+        self.assertTrue(api.method_table is json_api.method_table)
+
+
+    def test_newer_json_used_instead(self):
+        self.api()
+        methods = MockAPI.get_method_table(None)[:1]
+        with open(self.json_file, 'w') as f:
+            json.dump(methods, f)
+        os.utime(self.bin_file, (time.time() - 10, time.time() - 10))
+        _registry.clear()
+        api = self.api()
+        api.log.assertLine('Ignoring binary method table cache older than %s'
+                           % self.json_file)
+        self.assertEqual(len(api.method_table), 1)
+        # and the binary copy is brought up to date
+        _registry.clear()
+        api = self.api()
+        api.log.assertLine('Reading method table cache: %s' % self.bin_file)
+        self.assertEqual(len(api.method_table), 1)
+
+
+    def test_other_format_falls_back_to_json(self):
+        self.api()
+        with open(self.bin_file, 'r+b') as f:
+            f.write(b'etsy2-methods 99')
+        _registry.clear()
+        api = self.api()
+        api.log.assertLine('Ignoring binary method table cache in another '
+                           'format: %s' % self.bin_file)
+        api.log.assertLine('Reading method table cache: %s' % self.json_file)
+        self.assertEqual(len(api.method_table), 2)
+
+
+    def test_damaged_payload_falls_back_to_json(self):
+        self.api()
+        with open(self.bin_file, 'rb') as f:
+            header = f.readline()
+        with open(self.bin_file, 'wb') as f:
+            f.write(header + b'\x00garbage')
+        _registry.clear()
+        api = self.api()
+        api.log.assertLine('Binary method table cache is damaged: %s' % self.bin_file)
+        self.assertEqual(len(api.method_table), 2)
+
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, self.api, 'xml')
+
+
+    def test_binary_file_name(self):
+        self.assertEqual(_bincache.binary_file('/a/methods.v2.json'), '/a/methods.v2.bin')
+        self.assertEqual(_bincache.binary_file('/a/methods'), '/a/methods.bin')
+
+
+    def test_binary_written_from_json_cache(self):
+        self.api('json')
+        _registry.clear()
+        self.api()
+        self.assertTrue(os.path.isfile(self.bin_file))
+        _registry.clear()
+        self.api().log.assertLine('Reading method table cache: %s' % self.bin_file)
+
+
+    def test_no_binary_in_temp_dir(self):
+        import tempfile
+        self.json_file = os.path.join(tempfile.gettempdir(),
+                                      'etsy2-test-methods.%d.json' % os.getpid())
+        try:
+            api = self.api()
+            self.assertTrue(api.method_cache.binary_file is None)
+            self.assertFalse(os.path.exists(_bincache.binary_file(self.json_file)))
+        finally:
+            os.remove(self.json_file)
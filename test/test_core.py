@@ -1,13 +1,23 @@
 from urllib.parse import urlparse, parse_qs
+import gc
+import json
 import os
 import tempfile
+import threading
+import time
 
 from etsy2._core import API, MethodTableCache, missing
-from .util import Test
+from etsy2._result import Result
+from .util import Test, StubServer
 
 
 class MockResponse():
     text = '{ "count": 2, "results": [1, 2] }'
+    status_code = 200
+
+    def __init__(self, text=None):
+        if text is not None:
+            self.text = text
 
 
 class MockAPI(API):
@@ -78,6 +88,40 @@ class CoreTests(Test):
         self.assertTrue('testMethod' in dir(self.api))
 
 
+    def test_methods_created_on_first_use(self):
+        self.assertFalse('testMethod' in self.api.__dict__)
+        method = self.api.testMethod
+        self.assertTrue(self.api.__dict__['testMethod'] is method)
+        self.assertTrue(self.api.testMethod is method)
+
+
+    def test_request_plan_shared(self):
+        other = MockAPI('otherkey', method_cache=None)
+        self.api.testMethod(test_id=1)
+        other.testMethod(test_id=2)
+        self.assertTrue(self.api.testMethod.plan is other.testMethod.plan)
+
+
+    def test_request_plan(self):
+        from etsy2._core import RequestPlan
+        spec = {'uri': '/shops/:shop_id/sections/:shop_section_id',
+                'params': {'shop_id': 'shop_id_or_name', 'shop_section_id': 'int'}}
+        plan = RequestPlan(spec, self.api.type_checker)
+        self.assertEqual(plan.path_params, ('shop_id', 'shop_section_id'))
+        self.assertEqual(plan.uri_template % ('a', 1), '/shops/a/sections/1')
+
+
+    def test_url_params_quoted(self):
+        self.api.testMethod(test_id='a b/c')
+        self.assertEqual(self.api.last_url,
+                         'http://host/test/a%20b/c?api_key=apikey')
+
+
+    def test_unknown_attribute(self):
+        self.assertRaises(AttributeError, getattr, self.api, 'notAMethod')
+        self.assertFalse(hasattr(self.api, 'notAMethod'))
+
+
     def test_url_params(self):
         self.api.testMethod(test_id='foo')
         self.assertEqual(self.api.last_url,
@@ -207,6 +251,90 @@ class CoreTests(Test):
                 'fizz', 'enum(foo, bar, baz)', 'goo'))
 
 
+    def test_unhashable_value_for_enum(self):
+        msg = self.assertRaises(ValueError, self.api.testMethod,
+                                test_id=1, fizz=['foo'])
+        self.assertEqual(msg, self.bad_value_msg('fizz', 'enum(foo, bar, baz)', ['foo']))
+
+
+    def test_type_compiled_once(self):
+        checker = self.api.type_checker
+        self.assertTrue(checker.checker('array(int)') is checker.checker('array(int)'))
+
+
+    def check(self, t, value):
+        return self.api.type_checker.checker(t)(value)
+
+
+    def test_array_joined(self):
+        self.assertEqual(self.check('array(int)', [1, 2, 3]), (True, '1,2,3'))
+        self.assertEqual(self.check('array(string)', ('a', 'b')), (True, 'a,b'))
+
+
+    def test_array_single_item(self):
+        self.assertEqual(self.check('array(int)', 5), (True, '5'))
+        self.assertEqual(self.check('array(int)', '1,2'), (True, '1,2'))
+
+
+    def test_invalid_array_item(self):
+        self.assertFalse(self.check('array(int)', [1, 'x'])[0])
+        self.assertFalse(self.check('array(int)', 1.5)[0])
+
+
+    def test_array_of_enum(self):
+        t = 'array(enum(a, b))'
+        self.assertEqual(self.check(t, ['a', 'b']), (True, 'a,b'))
+        self.assertFalse(self.check(t, ['c'])[0])
+
+
+    def test_id_or_name(self):
+        self.assertTrue(self.check('shop_id_or_name', 12)[0])
+        self.assertTrue(self.check('shop_id_or_name', 'myshop')[0])
+        self.assertFalse(self.check('shop_id_or_name', '')[0])
+        self.assertFalse(self.check('user_id_or_name', 1.5)[0])
+
+
+    def test_color_triplet(self):
+        self.assertEqual(self.check('color_triplet', (255, 0, 10)), (True, '255,0,10'))
+        for ok in ('#FF00ff', 'FF00FF', '255, 255, 255', '360;100;100'):
+            self.assertTrue(self.check('color_triplet', ok)[0], ok)
+        for bad in ('#FF00F', 'red', (256, 0, 0), (1, 2), 7):
+            self.assertFalse(self.check('color_triplet', bad)[0], bad)
+
+
+    def test_color_wiggle(self):
+        self.assertTrue(self.check('color_wiggle', 15)[0])
+        self.assertFalse(self.check('color_wiggle', 31)[0])
+
+
+    def test_latitude_longitude(self):
+        self.assertTrue(self.check('latitude', -45.5)[0])
+        self.assertFalse(self.check('latitude', 91)[0])
+        self.assertTrue(self.check('longitude', 179)[0])
+        self.assertFalse(self.check('longitude', -181.0)[0])
+        self.assertFalse(self.check('longitude', '10')[0])
+
+
+    def test_imagefile(self):
+        import io
+        self.assertTrue(self.check('imagefile', io.BytesIO(b''))[0])
+        self.assertFalse(self.check('imagefile', 'path.jpg')[0])
+
+
+    def test_validate(self):
+        self.assertEqual(self.api.testMethod.validate(test_id=1, limit=2),
+                         {'test_id': 1, 'limit': 2})
+        self.assertRaises(ValueError, self.api.testMethod.validate, limit=2)
+
+
+    def test_validate_many(self):
+        errors = self.api.testMethod.validate_many([
+            {'test_id': 1}, {'test_id': 1, 'limit': 'x'}, {'limit': 2}])
+        self.assertEqual(errors[0], None)
+        self.assertEqual(str(errors[1]), self.bad_value_msg('limit', 'int', 'x'))
+        self.assertEqual(str(errors[2]), "Required argument 'test_id' not provided.")
+
+
     def test_parameter_type_string(self):
         self.api.testMethod(test_id=1, kind='blah')
         self.assertEqual(self.last_query()['kind'], ['blah'])
@@ -238,6 +366,240 @@ class CoreTests(Test):
 
 
 
+class ConnectionPoolTests(Test):
+    def api(self, **kwargs):
+        return MockAPI('apikey', method_cache=None, **kwargs)
+
+
+    def test_session_is_reused(self):
+        api = self.api()
+        self.assertTrue(api.session is api.session)
+
+
+    def test_pool_settings(self):
+        api = self.api(pool_connections=3, pool_maxsize=7, pool_block=True)
+        adapter = api.session.get_adapter('https://openapi.etsy.com')
+        self.assertEqual(adapter._pool_connections, 3)
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter._pool_block, True)
+
+
+    def test_adapters_can_be_shared(self):
+        import requests
+        api = self.api()
+        other = requests.Session()
+        api.mount_adapters(other)
+        self.assertTrue(other.get_adapter('https://x') is
+                        api.session.get_adapter('https://x'))
+
+
+    def test_connections_kept_alive(self):
+        with StubServer() as server:
+            with self.api(timeout=5) as api:
+                for _ in range(3):
+                    response = API._get_url(api, server.url + '/', 'GET', None)
+                    self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.connections, 1)
+
+
+    def test_close_then_reuse(self):
+        with StubServer() as server:
+            api = self.api(timeout=5)
+            API._get_url(api, server.url + '/', 'GET', None)
+            api.close()
+            response = API._get_url(api, server.url + '/', 'GET', None)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.connections, 2)
+
+
+
+
+
+
+class PagingAPI(MockAPI):
+    total = 7
+    fail_offsets = ()
+    max_limit = None
+
+    def _get_url(self, url, http_method, data):
+        self.urls.append(url)
+        qs = parse_qs(urlparse(url).query)
+        limit, offset = int(qs['limit'][0]), int(qs['offset'][0])
+        if self.max_limit is not None:
+            limit = min(limit, self.max_limit)
+        if offset in self.fail_offsets:
+            raise IOError('connection reset')
+        results = list(range(self.total))[offset:offset + limit]
+        return MockResponse(json.dumps({'count': self.total, 'results': results}))
+
+
+
+class PaginationTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.api = PagingAPI('apikey', method_cache=None)
+        self.api.urls = []
+
+
+    def test_paginate_yields_every_result(self):
+        results = list(self.api.paginate('testMethod', page_size=3, test_id=1))
+        self.assertEqual(results, list(range(7)))
+        self.assertEqual(len(self.api.urls), 3)
+
+
+    def test_paginate_is_lazy(self):
+        it = self.api.paginate('testMethod', page_size=3, test_id=1)
+        self.assertEqual(self.api.urls, [])
+        self.assertEqual(next(it), 0)
+        self.assertEqual(len(self.api.urls), 1)
+
+
+    def test_paginate_from_offset(self):
+        results = list(self.api.paginate('testMethod', page_size=3,
+                                         test_id=1, offset=5))
+        self.assertEqual(results, [5, 6])
+
+
+    def test_paginate_stops_on_exact_count(self):
+        self.api.total = 6
+        list(self.api.paginate('testMethod', page_size=3, test_id=1))
+        self.assertEqual(len(self.api.urls), 2)
+
+
+    def test_paginate_with_prefetch(self):
+        results = list(self.api.paginate('testMethod', page_size=2,
+                                         prefetch=True, test_id=1))
+        self.assertEqual(results, list(range(7)))
+        self.assertEqual(len(self.api.urls), 4)
+
+
+    def test_paginate_validates_params(self):
+        it = self.api.paginate('testMethod', page_size=3, test_id=1, fizz='goo')
+        self.assertRaises(ValueError, next, it)
+
+
+    def test_fetch_pages_in_order(self):
+        pages = list(self.api.fetch_pages('testMethod', page_size=2,
+                                          max_workers=3, test_id=1))
+        self.assertEqual([p.offset for p in pages], [0, 2, 4, 6])
+        self.assertEqual(sum([p.results for p in pages], []), list(range(7)))
+
+
+    def test_fetch_pages_unordered(self):
+        pages = list(self.api.fetch_pages('testMethod', page_size=2,
+                                          ordered=False, test_id=1))
+        self.assertEqual(pages[0].offset, 0)
+        self.assertEqual(sorted(p.offset for p in pages), [0, 2, 4, 6])
+
+
+    def test_fetch_pages_when_limit_capped(self):
+        self.api.total = 20
+        self.api.max_limit = 3
+        pages = list(self.api.fetch_pages('testMethod', page_size=5, test_id=1))
+        self.assertEqual([p.offset for p in pages], list(range(0, 20, 3)))
+        self.assertEqual(sum([p.results for p in pages], []), list(range(20)))
+
+
+    def test_fetch_pages_reports_failed_pages(self):
+        self.api.fail_offsets = (4,)
+        pages = list(self.api.fetch_pages('testMethod', page_size=2, test_id=1))
+        self.assertEqual([p.ok for p in pages], [True, True, False, True])
+        self.assertEqual(pages[2].results, None)
+        self.assertTrue(isinstance(pages[2].error, IOError))
+
+
+    def test_fetch_pages_first_page_error_raised(self):
+        self.api.fail_offsets = (0,)
+        pages = self.api.fetch_pages('testMethod', page_size=2, test_id=1)
+        self.assertRaises(IOError, list, pages)
+
+
+
+class EchoAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        # count is the test_id, so each caller knows what it should see
+        test_id = int(urlparse(url).path.rsplit('/', 1)[1])
+        time.sleep(0.0005 * (test_id % 3))
+        return MockResponse(json.dumps({'count': test_id, 'results': [test_id],
+                                        'pagination': {'next_page': 2}}))
+
+
+
+class CallResultTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.api = EchoAPI('apikey', method_cache=None)
+
+
+    def test_fetch_returns_result(self):
+        result = self.api.testMethod.fetch(test_id=5, limit=1)
+        self.assertEqual(result.results, [5])
+        self.assertEqual(result.count, 5)
+        self.assertEqual(result.pagination, {'next_page': 2})
+        self.assertEqual(result.params, {'test_id': 5, 'limit': 1})
+        self.assertEqual(result.method_name, 'testMethod')
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.elapsed >= 0)
+        self.assertFalse(result.from_cache)
+        self.assertTrue(self.api.last_result is result)
+
+
+    def test_fetch_validates_params(self):
+        self.assertRaises(ValueError, self.api.testMethod.fetch, test_id=1, fizz='goo')
+
+
+    def test_results_freed_with_api(self):
+        gc.collect()
+        before = sum(1 for o in gc.get_objects() if isinstance(o, Result))
+        for i in range(200):
+            api = EchoAPI('apikey', method_cache=None)
+            api.testMethod(test_id=i)
+            del api
+        gc.collect()
+        after = sum(1 for o in gc.get_objects() if isinstance(o, Result))
+        self.assertTrue(after - before < 5, after - before)
+
+
+    def test_state_is_per_thread(self):
+        self.api.testMethod(test_id=1)
+        seen = []
+        t = threading.Thread(target=lambda: seen.append(self.api.count))
+        t.start()
+        t.join()
+        self.assertEqual(seen, [None])
+        self.assertEqual(self.api.count, 1)
+
+
+    def test_concurrent_calls_see_their_own_results(self):
+        errors = []
+
+        def worker(n):
+            for i in range(50):
+                test_id = n * 1000 + i
+                try:
+                    results = self.api.testMethod(test_id=test_id)
+                    assert results == [test_id], results
+                    assert self.api.count == test_id, (self.api.count, test_id)
+                    assert self.api.last_url.endswith('/test/%d?api_key=apikey' % test_id)
+                    result = self.api.testMethod.fetch(test_id=test_id)
+                    assert result.count == test_id, (result.count, test_id)
+                    assert self.api.last_result is result
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 17)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+
+
+
+
 class MockAPI_NoMethods(MockAPI):
     def _get_methods(self, method_cache):
         pass
@@ -318,20 +680,104 @@ class MethodTableCacheTests(Test):
         self.assertFalse(self._cache.wrote_cache)
 
 
-    def make_old_cache(self):
+    def make_old_cache(self, age=48*60*60):
         self.get_cached()
         fn = self._cache.filename
         s = os.stat(fn)
-        os.utime(fn, (s.st_atime, s.st_mtime - 48*60*60))
+        os.utime(fn, (s.st_atime, s.st_mtime - age))
+
+
+    def join_refreshes(self):
+        for t in threading.enumerate():
+            if t.name == 'etsy2-refresh-methods':
+                t.join(5)
 
 
     def test_expired(self):
-        self.make_old_cache()
+        self.make_old_cache(MethodTableCache.max_age + MethodTableCache.max_stale + 60)
         c = self.cache()
         c.get()
         self.assertFalse(c.used_cache)
 
 
+    def test_stale_used_then_refreshed(self):
+        self.make_old_cache()
+        fn = self._cache.filename
+        c = self.cache()
+        c.get_table()
+        self.assertTrue(c.used_cache)
+        self.assertTrue(c.stale)
+        self.assertTrue(c.revalidate() is not None)
+        self.assertFalse(c.stale)
+        self.assertTrue(time.time() - os.stat(fn).st_mtime < 60)
+        self.assertFalse(os.path.exists(fn + '.lock'))
+
+
+    def test_stale_cache_refreshed_by_another_process(self):
+        self.make_old_cache()
+        fn = self._cache.filename
+        c = self.cache()
+        c.get_table()
+        self.assertTrue(c.stale)
+        # another process finishes refreshing it
+        os.utime(fn, None)
+        downloads = []
+        self.api.get_method_table = lambda: downloads.append(1)
+        self.assertTrue(c.revalidate() is not None)
+        self.assertEqual(downloads, [])
+        self.assertFalse(c.stale)
+        self.assertFalse(os.path.exists(fn + '.lock'))
+
+
+    def test_stale_cache_refreshed_in_background(self):
+        self.make_old_cache()
+        refreshes = []
+
+        class RecordingAPI(MockAPI):
+            def refresh_methods(self, background=False):
+                refreshes.append(background)
+
+        api = RecordingAPI('key')
+        self.assertTrue(api.method_cache.used_cache)
+        self.assertEqual(refreshes, [True])
+
+
+    def test_unchanged_table_not_rewritten(self):
+        self.make_old_cache()
+        table = MockAPI('key').method_table
+        self.join_refreshes()
+        api = MockAPI('key')
+        self.assertFalse(api.method_cache.wrote_cache)
+        self.assertTrue(api.method_table is table)
+
+
+    def test_refresh_skipped_while_locked(self):
+        self.make_old_cache()
+        fn = self._cache.filename
+        with open(fn + '.lock', 'w') as f:
+            f.write('1')
+        before = os.stat(fn).st_mtime
+        self.assertEqual(self._cache.revalidate(), None)
+        self.assertEqual(os.stat(fn).st_mtime, before)
+
+
+    def test_dead_lock_taken_over(self):
+        self.make_old_cache()
+        fn = self._cache.filename
+        with open(fn + '.lock', 'w') as f:
+            f.write('1')
+        s = os.stat(fn + '.lock')
+        os.utime(fn + '.lock', (s.st_atime, s.st_mtime - 600))
+        self.assertTrue(self._cache.revalidate() is not None)
+        self.assertFalse(os.path.exists(fn + '.lock'))
+
+
+    def test_write_leaves_no_temp_files(self):
+        self.get_uncached()
+        self.assertEqual(os.listdir(self.scratch_dir),
+                         [os.path.basename(self._cache.filename)])
+
+
     def test_none_passed_does_not_cache(self):
         self.get_cached()
         c = self.cache(method_cache=None)
@@ -351,6 +797,7 @@ class MethodTableCacheTests(Test):
     def test_logs_when_method_table_too_old(self):
         self.make_old_cache()
         self.log_tester().log.assertLine('Method table too old.')
+        self.join_refreshes()
 
 
     def test_logs_when_reading_cache(self):
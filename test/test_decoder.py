@@ -0,0 +1,90 @@
+import json
+
+from etsy2._decoder import get_decoder
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class BytesResponse(object):
+    status_code = 200
+    url = 'http://host/test/1'
+
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        raise AssertionError('text should not be used when content is available')
+
+
+
+class BytesAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        return BytesResponse(self.body)
+
+
+
+class DecoderTests(Test):
+    def installed(self):
+        names = ['json']
+        for name in ('orjson', 'ujson'):
+            try:
+                __import__(name)
+                names.append(name)
+            except ImportError:
+                pass
+        return names
+
+
+    def test_default_is_fastest_installed(self):
+        names = self.installed()
+        decode = get_decoder()
+        if 'orjson' in names:
+            self.assertEqual(decode.__module__, 'orjson')
+        self.assertEqual(decode(b'{"a": [1, "\\u00e9"]}'), {'a': [1, u'\xe9']})
+
+
+    def test_named_decoders_read_bytes_and_str(self):
+        for name in self.installed():
+            decode = get_decoder(name)
+            self.assertEqual(decode('{"a": 1}'.encode('utf-8')), {'a': 1})
+            self.assertEqual(decode('{"a": "caf\xe9"}'.encode('utf-8')), {'a': 'caf\xe9'})
+            self.assertEqual(decode('{"a": 1}'), {'a': 1})
+
+
+    def test_named_decoders_raise_value_error(self):
+        for name in self.installed():
+            self.assertRaises(ValueError, get_decoder(name), b'{"a": ')
+
+
+    def test_callable_returned_as_is(self):
+        self.assertTrue(get_decoder(json.loads) is json.loads)
+
+
+    def test_unknown_decoder(self):
+        self.assertRaises(ValueError, get_decoder, 'simplejson2')
+
+
+    def test_response_decoded_from_bytes(self):
+        api = BytesAPI('apikey', method_cache=None)
+        api.body = b'{"count": 1, "results": [{"title": "caf\\u00e9"}]}'
+        self.assertEqual(api.testMethod(test_id=1), [{'title': u'caf\xe9'}])
+
+
+    def test_json_decoder_parameter(self):
+        calls = []
+
+        def decode(raw):
+            calls.append(raw)
+            return json.loads(raw)
+
+        api = MockAPI('apikey', method_cache=None, json_decoder=decode)
+        self.assertEqual(api.testMethod(test_id=1), [1, 2])
+        self.assertEqual(calls, [MockResponse.text])
+
+
+    def test_invalid_response(self):
+        for name in self.installed():
+            api = BytesAPI('apikey', method_cache=None, json_decoder=name)
+            api.body = b'<html>Service Unavailable</html>'
+            self.assertRaises(ValueError, api.testMethod, test_id=1)
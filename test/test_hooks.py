@@ -0,0 +1,148 @@
+from etsy2 import OpenTelemetryHook, RetryPolicy
+from .test_core import MockAPI, MockResponse
+from .test_log import FlakyAPI
+from .util import Test
+
+
+class Recorder(object):
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+
+    def before_send(self, call):
+        self.events.append((self.name, 'before', call.method_name, call.url))
+
+    def after_receive(self, call):
+        self.events.append((self.name, 'after', call.result.status_code,
+                            call.result.count))
+
+    def on_error(self, call, error):
+        self.events.append((self.name, 'error', type(error).__name__))
+
+
+
+class Router(object):
+    def before_send(self, call):
+        call.url = call.url.replace('http://host', 'http://canary')
+
+
+
+class RecordingAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        self.urls.append(url)
+        if 'fail' in url:
+            raise IOError('connection reset')
+        if 'bad' in url:
+            return MockResponse('<html>')
+        return MockResponse()
+
+
+
+class FakeSpan(object):
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.exceptions = []
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, e):
+        self.exceptions.append(e)
+
+    def set_status(self, status):
+        self.status = status
+
+    def end(self):
+        self.ended = True
+
+
+
+class FakeTracer(object):
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, kind=None, attributes=None):
+        span = FakeSpan(name, attributes or {})
+        self.spans.append(span)
+        return span
+
+
+
+class HookTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.events = []
+
+
+    def api(self, *hooks, **kwargs):
+        api = RecordingAPI('apikey', method_cache=None, hooks=list(hooks), **kwargs)
+        api.urls = []
+        return api
+
+
+    def test_hooks_wrap_each_other(self):
+        api = self.api(Recorder('outer', self.events), Recorder('inner', self.events))
+        api.testMethod(test_id=1)
+        url = 'http://host/test/1?api_key=apikey'
+        self.assertEqual(self.events, [
+            ('outer', 'before', 'testMethod', url),
+            ('inner', 'before', 'testMethod', url),
+            ('inner', 'after', 200, 2),
+            ('outer', 'after', 200, 2)])
+
+
+    def test_before_send_can_change_url(self):
+        api = self.api(Router())
+        api.testMethod(test_id=1)
+        self.assertEqual(api.urls, ['http://canary/test/1?api_key=apikey'])
+        self.assertEqual(api.last_url, 'http://canary/test/1?api_key=apikey')
+
+
+    def test_on_error_for_network_errors(self):
+        api = self.api(Recorder('r', self.events))
+        self.assertRaises(IOError, api.testMethod, test_id='fail')
+        self.assertEqual(self.events[-1], ('r', 'error', 'OSError'))
+
+
+    def test_on_error_for_bad_responses(self):
+        api = self.api(Recorder('r', self.events))
+        self.assertRaises(ValueError, api.testMethod, test_id='bad')
+        self.assertEqual(self.events[-1], ('r', 'error', 'ValueError'))
+
+
+    def test_hooks_run_once_per_call_with_retries(self):
+        api = FlakyAPI('apikey', method_cache=None, hooks=[Recorder('r', self.events)],
+                       retry_policy=RetryPolicy(sleep=lambda s: None))
+        api.testMethod(test_id=1)
+        self.assertEqual([e[1] for e in self.events], ['before', 'after'])
+
+
+    def test_call_timing(self):
+        calls = []
+
+        class Timer(object):
+            def after_receive(self, call):
+                calls.append(call)
+
+        self.api(Timer()).testMethod(test_id=1)
+        self.assertTrue(calls[0].elapsed >= 0)
+        self.assertEqual(calls[0].spec['uri'], '/test/:test_id')
+
+
+    def test_open_telemetry_spans(self):
+        tracer = FakeTracer()
+        api = self.api(OpenTelemetryHook(tracer))
+        api.testMethod(test_id=1)
+        self.assertRaises(IOError, api.testMethod, test_id='fail')
+        ok, failed = tracer.spans
+        self.assertEqual(ok.name, 'etsy2 testMethod')
+        self.assertEqual(ok.attributes['http.method'], 'GET')
+        self.assertEqual(ok.attributes['http.url'],
+                         'http://host/test/1?api_key=REDACTED')
+        self.assertEqual(ok.attributes['etsy.uri'], '/test/:test_id')
+        self.assertEqual(ok.attributes['http.status_code'], 200)
+        self.assertTrue(ok.ended)
+        self.assertTrue(failed.ended)
+        self.assertTrue(isinstance(failed.exceptions[0], IOError))
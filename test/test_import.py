@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from .util import Test, this_dir
+
+
+root = os.path.dirname(this_dir)
+
+# loaded by the features that need them, never by importing etsy2
+deferred = ('requests', 'urllib3', 'requests_oauthlib', 'oauthlib', 'aiohttp',
+            'asyncio', 'mimetypes', 'tempfile', 'sqlite3', 'email',
+            'concurrent', 'logging', 'hashlib')
+
+
+def import_times(statement):
+    """
+    Runs statement in a new interpreter under -X importtime, without
+    site-packages. Returns a dict of every module it imported to its
+    (self, cumulative) import time in microseconds.
+    """
+    env = dict(os.environ, PYTHONPATH=root)
+    proc = subprocess.Popen([sys.executable, '-S', '-X', 'importtime', '-c', statement],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    if proc.returncode != 0:
+        raise AssertionError(err.decode('utf-8', 'replace'))
+    times = {}
+    for line in err.decode('utf-8').splitlines():
+        fields = line.split(':', 1)[-1].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime needs Python 3.7')
+class ImportTimeTests(Test):
+    def test_heavy_modules_deferred(self):
+        times = import_times('import etsy2')
+        self.assertTrue('etsy2' in times)
+        loaded = sorted(m for m in times if m.split('.')[0] in deferred)
+        self.assertEqual(loaded, [])
+
+
+    def test_oauth_module_deferred(self):
+        times = import_times('import etsy2.oauth')
+        loaded = sorted(m for m in times if m.split('.')[0] in deferred)
+        self.assertEqual(loaded, [])
+
+
+    def test_loaded_on_use(self):
+        times = import_times(
+            'import io, etsy2\n'
+            'from etsy2._multipart import MultipartBody\n'
+            'MultipartBody([("image", io.BytesIO(b"x"))])')
+        self.assertTrue('mimetypes' in times)
@@ -0,0 +1,165 @@
+import logging
+
+import socket
+
+from etsy2 import RetryPolicy
+from etsy2._log import Event, redact_text, redact_url
+from etsy2._core import API
+from .test_core import MockAPI, MockLog, MockResponse
+from .util import Test
+
+
+class Unprintable(object):
+    reprs = 0
+
+    def __repr__(self):
+        Unprintable.reprs += 1
+        return 'Unprintable()'
+
+    __str__ = __repr__
+
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+
+class FlakyAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        self.calls = getattr(self, 'calls', 0) + 1
+        response = MockResponse()
+        response.status_code = 503 if self.calls == 1 else 200
+        return response
+
+
+
+class LogTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.logger = logging.getLogger('etsy2')
+        self.handler = Records()
+        self.logger.addHandler(self.handler)
+        self.level = self.logger.level
+
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+        Test.tearDown(self)
+
+
+    def test_nothing_formatted_when_disabled(self):
+        self.logger.setLevel(logging.WARNING)
+        api = MockAPI('apikey', method_cache=None)
+        Unprintable.reprs = 0
+        api.testMethod(test_id=1, blah=Unprintable())
+        self.assertEqual(Unprintable.reprs, 1)  # once, to build the url
+        self.assertEqual(self.handler.records, [])
+
+
+    def test_log_callable_gets_events(self):
+        api = MockAPI('apikey', method_cache=None, log=MockLog(self))
+        api.testMethod(test_id=1, limit=5)
+        line = api.log.lines[-1]
+        self.assertTrue(line.startswith('request '), line)
+        self.assertTrue("method='testMethod'" in line, line)
+        self.assertTrue("uri='/test/:test_id'" in line, line)
+        self.assertTrue('status=200' in line, line)
+        self.assertTrue('bytes=%d' % len(MockResponse.text) in line, line)
+        self.assertTrue('elapsed=' in line, line)
+        self.assertTrue('api_key=REDACTED' in line, line)
+        self.assertFalse('apikey' in line, line)
+
+
+    def test_stdlib_logging(self):
+        self.logger.setLevel(logging.DEBUG)
+        api = MockAPI('apikey', method_cache=None)
+        api.testMethod(test_id=1)
+        record = self.handler.records[-1]
+        self.assertEqual(record.levelno, logging.DEBUG)
+        fields = record.etsy_event.redacted()
+        self.assertEqual(fields['method'], 'testMethod')
+        self.assertEqual(fields['status'], 200)
+        self.assertEqual(fields['url'], 'http://host/test/1?api_key=REDACTED')
+        self.assertTrue(record.getMessage().startswith('request '))
+
+
+    def test_messages_go_to_stdlib_logging(self):
+        self.logger.setLevel(logging.DEBUG)
+        MockAPI('apikey', method_cache=None)
+        messages = [r.getMessage() for r in self.handler.records]
+        self.assertTrue('Creating v1 Etsy API, base url=http://host.' in messages)
+
+
+    def test_retries_logged_as_warnings(self):
+        from etsy2 import RetryPolicy
+        self.logger.setLevel(logging.WARNING)
+        api = FlakyAPI('apikey', method_cache=None,
+                       retry_policy=RetryPolicy(sleep=lambda s: None))
+        api.testMethod(test_id=1)
+        self.assertEqual(len(self.handler.records), 1)
+        record = self.handler.records[0]
+        self.assertEqual(record.levelno, logging.WARNING)
+        self.assertEqual(record.etsy_event.fields['status'], 503)
+
+
+    def test_params_redacted(self):
+        event = Event('request', {'params': {
+            'api_key': 'secret', 'image': b'\x00' * 5000, 'title': 'mug',
+            'description': 'x' * 500}})
+        params = event.redacted()['params']
+        self.assertEqual(params['api_key'], 'REDACTED')
+        self.assertEqual(params['image'], '<5000 bytes>')
+        self.assertEqual(params['title'], 'mug')
+        self.assertEqual(len(params['description']), 103)
+
+
+    def test_redaction_can_be_disabled(self):
+        api = MockAPI('apikey', method_cache=None, log=MockLog(self))
+        api.events.redact = False
+        api.testMethod(test_id=1)
+        self.assertTrue('api_key=apikey' in api.log.lines[-1])
+
+
+    def test_redact_url(self):
+        self.assertEqual(redact_url('http://h/x?limit=1&api_key=abc&oauth_token=t'),
+                         'http://h/x?limit=1&api_key=REDACTED&oauth_token=REDACTED')
+        self.assertEqual(redact_url('http://h/x'), 'http://h/x')
+
+
+    def test_redact_text(self):
+        self.assertEqual(
+            redact_text("Max retries exceeded with url: /x?api_key=abc&limit=1 (Caused by"),
+            "Max retries exceeded with url: /x?api_key=REDACTED&limit=1 (Caused by")
+        self.assertEqual(redact_text('OAuth oauth_token="t", oauth_signature="s"'),
+                         'OAuth oauth_token="REDACTED", oauth_signature="REDACTED"')
+
+
+    def test_secrets_not_in_network_errors(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        class RefusedAPI(MockAPI):
+            api_url = 'http://127.0.0.1:%d' % port
+            _get_url = API._get_url
+
+        self.logger.setLevel(logging.DEBUG)
+        api = RefusedAPI('SECRETKEY', method_cache=None,
+                         retry_policy=RetryPolicy(max_attempts=2, sleep=lambda s: None))
+        self.assertRaises(IOError, api.testMethod, test_id=1)
+        api.get_method_table = lambda: API.get_method_table(api)
+        api.refresh_methods(background=True).join(10)
+        names = [r.etsy_event.name for r in self.handler.records
+                 if hasattr(r, 'etsy_event')]
+        self.assertTrue('retry' in names)
+        self.assertTrue('refresh_methods_failed' in names)
+        for record in self.handler.records:
+            self.assertFalse('SECRETKEY' in record.getMessage(), record.getMessage())
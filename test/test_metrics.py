@@ -0,0 +1,98 @@
+import io
+from urllib.request import urlopen
+
+from etsy2 import Metrics, ResponseCache, RetryPolicy
+from .test_core import MockAPI, MockResponse
+from .test_log import FlakyAPI
+from .util import Test
+
+
+class UploadAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        return MockResponse()
+
+
+
+class MetricsTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.metrics = Metrics()
+
+
+    def test_requests_counted_per_method(self):
+        api = MockAPI('apikey', method_cache=None, metrics=self.metrics)
+        api.testMethod(test_id=1)
+        api.testMethod(test_id=2)
+        api.method2()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['testMethod']['requests'], {'2xx': 2})
+        self.assertEqual(snapshot['method2']['requests'], {'2xx': 1})
+        self.assertEqual(snapshot['testMethod']['response_bytes'],
+                         2 * len(MockResponse.text))
+        latency = snapshot['testMethod']['latency']
+        self.assertEqual(latency['total']['count'], 2)
+        self.assertEqual(latency['decode']['count'], 2)
+        self.assertEqual(latency['total']['buckets'][-1], (float('inf'), 2))
+
+
+    def test_retries_and_status_classes(self):
+        api = FlakyAPI('apikey', method_cache=None, metrics=self.metrics,
+                       retry_policy=RetryPolicy(sleep=lambda s: None))
+        api.testMethod(test_id=1)
+        m = self.metrics.snapshot()['testMethod']
+        self.assertEqual(m['requests'], {'5xx': 1, '2xx': 1})
+        self.assertEqual(m['retries'], 1)
+
+
+    def test_cache_hits(self):
+        api = MockAPI('apikey', method_cache=None, metrics=self.metrics,
+                      response_cache=ResponseCache())
+        api.testMethod(test_id=1)
+        api.testMethod(test_id=1)
+        m = self.metrics.snapshot()['testMethod']
+        self.assertEqual(m['cache_misses'], 1)
+        self.assertEqual(m['cache_hits'], 1)
+        self.assertEqual(m['requests'], {'2xx': 1})
+
+
+    def test_request_bytes_of_uploads(self):
+        api = UploadAPI('apikey', method_cache=None, metrics=self.metrics)
+        f = io.BytesIO(b'x' * 1000)
+        f.name = 'a.jpg'
+        api._get('POST', '/listings/1/images', image=f)
+        self.assertTrue(self.metrics.snapshot()['']['request_bytes'] > 1000)
+
+
+    def test_exposition(self):
+        metrics = Metrics(buckets=[0.1, 1])
+        metrics.record_response('getListing', 200, 0.05, ttfb=0.04,
+                                response_bytes=100)
+        metrics.record_response('getListing', 404, 0.5)
+        metrics.record_retry('get"Listing')
+        text = metrics.exposition()
+        lines = text.splitlines()
+        self.assertTrue('# TYPE etsy2_requests_total counter' in lines)
+        self.assertTrue('etsy2_requests_total{method="getListing",status="2xx"} 1' in lines)
+        self.assertTrue('etsy2_requests_total{method="getListing",status="4xx"} 1' in lines)
+        self.assertTrue('etsy2_response_bytes_total{method="getListing"} 100' in lines)
+        self.assertTrue('etsy2_retries_total{method="get\\"Listing"} 1' in lines)
+        self.assertTrue('etsy2_request_duration_seconds_bucket'
+                        '{le="0.1",method="getListing",phase="total"} 1' in lines)
+        self.assertTrue('etsy2_request_duration_seconds_bucket'
+                        '{le="1",method="getListing",phase="total"} 2' in lines)
+        self.assertTrue('etsy2_request_duration_seconds_bucket'
+                        '{le="+Inf",method="getListing",phase="total"} 2' in lines)
+        self.assertTrue('etsy2_request_duration_seconds_count'
+                        '{method="getListing",phase="ttfb"} 1' in lines)
+
+
+    def test_serve(self):
+        self.metrics.record_response('getListing', 200, 0.05)
+        server = self.metrics.serve()
+        try:
+            url = 'http://127.0.0.1:%d/metrics' % server.server_address[1]
+            body = urlopen(url, timeout=5).read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(body, self.metrics.exposition())
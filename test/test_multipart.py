@@ -0,0 +1,165 @@
+import io
+import mmap
+import os
+
+from urllib3.filepost import encode_multipart_formdata
+
+from etsy2._multipart import MultipartBody
+from .test_core import MockAPI, MockResponse
+from .util import Test, StubServer
+
+
+class NamedBytesIO(io.BytesIO):
+    name = '/tmp/photos/mug.jpg'
+
+
+
+class Unseekable(object):
+    name = 'notes.txt'
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size=-1):
+        data, self.data = self.data, b''
+        return data
+
+
+
+class UploadAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        self.sent = data.read() if hasattr(data, 'read') else data
+        self.body = data
+        return MockResponse()
+
+
+
+class MultipartBodyTests(Test):
+    image = bytes(bytearray(range(256))) * 1000
+
+
+    def expected(self, body):
+        return encode_multipart_formdata(
+            [('listing_id', '12'),
+             ('image', ('mug.jpg', self.image, 'image/jpeg')),
+             ('rank', '1')], boundary=body.boundary)[0]
+
+
+    def body(self, f):
+        return MultipartBody([('listing_id', 12), ('image', f), ('rank', 1)])
+
+
+    def test_matches_standard_encoding(self):
+        body = self.body(NamedBytesIO(self.image))
+        expected = self.expected(body)
+        self.assertEqual(len(body), len(expected))
+        self.assertEqual(body.read(), expected)
+        self.assertEqual(body.read(), b'')
+
+
+    def test_read_in_chunks(self):
+        body = self.body(NamedBytesIO(self.image))
+        expected = self.expected(body)
+        for size in (1, 7, 1000, 65536):
+            body.rewind()
+            chunks = []
+            while True:
+                chunk = body.read(size)
+                if not chunk:
+                    break
+                self.assertTrue(len(chunk) <= size)
+                chunks.append(chunk)
+            self.assertEqual(b''.join(chunks), expected)
+        self.assertEqual(b''.join(body), expected)
+
+
+    def test_file_sent_from_current_position(self):
+        f = NamedBytesIO(b'header' + self.image)
+        f.seek(6)
+        body = self.body(f)
+        self.assertEqual(body.read(), self.expected(body))
+
+
+    def test_mmap(self):
+        path = os.path.join(self.scratch_dir, 'mug.jpg')
+        with open(path, 'wb') as f:
+            f.write(self.image)
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            body = MultipartBody([('listing_id', 12), ('mug.jpg', mm), ('rank', 1)])
+            expected = encode_multipart_formdata(
+                [('listing_id', '12'),
+                 ('mug.jpg', ('mug.jpg', self.image, 'image/jpeg')),
+                 ('rank', '1')], boundary=body.boundary)[0]
+            self.assertEqual(b''.join(body), expected)
+            mm.close()
+
+
+    def test_unseekable_file_read_into_memory(self):
+        body = MultipartBody([('file', Unseekable(b'abc'))])
+        expected = encode_multipart_formdata(
+            [('file', ('notes.txt', b'abc', 'text/plain'))], boundary=body.boundary)[0]
+        self.assertEqual(body.read(), expected)
+
+
+    def test_repr_does_not_include_contents(self):
+        body = self.body(NamedBytesIO(self.image))
+        self.assertTrue(len(repr(body)) < 200)
+
+
+
+class UploadTests(Test):
+    def test_files_not_read_before_sending(self):
+        api = UploadAPI('apikey', method_cache=None)
+        f = NamedBytesIO(b'x' * 1000)
+        api._get('POST', '/listings/1/images', image=f)
+        self.assertTrue(isinstance(api.body, MultipartBody))
+        self.assertTrue(b'x' * 1000 in api.sent)
+        self.assertTrue(b'name="api_key"' in api.sent)
+
+
+    def test_posts_without_files_unchanged(self):
+        api = UploadAPI('apikey', method_cache=None)
+        api._get('POST', '/listings', title='mug')
+        self.assertEqual(api.sent, {'title': (None, 'mug'), 'api_key': (None, 'apikey')})
+
+
+    def test_upload_over_http(self):
+        from etsy2._core import API
+        body = MultipartBody([('image', NamedBytesIO(MultipartBodyTests.image))])
+        with StubServer() as server:
+            api = MockAPI('apikey', method_cache=None, timeout=5)
+            API._get_url(api, server.url + '/listings/1/images', 'POST', body)
+            api.close()
+        method, path, headers, payload = server.requests[0]
+        body.rewind()
+        self.assertEqual(payload, body.read())
+        self.assertEqual(headers['Content-Type'], body.content_type)
+        self.assertEqual(int(headers['Content-Length']), len(body))
+
+
+    def test_oauth_upload_streamed_and_signed(self):
+        from etsy2.oauth import EtsyOAuthClient
+        client = EtsyOAuthClient('ck', 'cs', 'rk', 'rs')
+        signer = client.oauth1Session._client.client
+        signer.nonce = 'fixednonce'
+        signer.timestamp = '1500000000'
+
+        image = MultipartBodyTests.image
+        body = MultipartBody([('image', NamedBytesIO(image)), ('rank', 1)])
+        with StubServer() as server:
+            url = server.url + '/listings/1/images'
+            client.do_oauth_request(url, 'POST', body, timeout=5)
+
+        method, path, headers, payload = server.requests[0]
+        body.rewind()
+        self.assertEqual(payload, body.read())
+        self.assertEqual(headers['Content-Type'], body.content_type)
+
+        # multipart bodies are not part of the oauth signature
+        _, expected, _ = signer.sign(url, 'POST', None,
+                                     {'Content-Type': body.content_type})
+        expected = dict((k.decode('utf-8') if isinstance(k, bytes) else k,
+                         v.decode('utf-8') if isinstance(v, bytes) else v)
+                        for k, v in expected.items())['Authorization']
+        self.assertEqual(headers['Authorization'], expected)
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+
+from etsy2._quota import SharedQuota
+from etsy2._ratelimit import RateLimitExceeded
+from .test_core import MockAPI
+from .util import Test
+
+
+class FakeTime(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+
+def reserve_until_empty(filename, limit, results):
+    quota = SharedQuota(limit=limit, filename=filename, priority='high')
+    n = 0
+    while quota.reserve() == 0:
+        n += 1
+    results.put(n)
+
+
+
+class SharedQuotaTests(Test):
+    def quota(self, **kwargs):
+        kwargs.setdefault('filename', os.path.join(self.scratch_dir, 'quota.sqlite'))
+        kwargs.setdefault('clock', self.time.clock)
+        kwargs.setdefault('sleep', self.time.sleep)
+        return SharedQuota(**kwargs)
+
+
+    def setUp(self):
+        Test.setUp(self)
+        self.time = FakeTime()
+
+
+    def test_reserve_within_limit(self):
+        quota = self.quota(limit=3, priority='high')
+        self.assertEqual([quota.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(quota.remaining(), 0)
+
+
+    def test_full_window_returns_wait(self):
+        quota = self.quota(limit=2, window=100, priority='high')
+        quota.reserve()
+        self.time.now += 10
+        quota.reserve()
+        self.assertAlmostEqual(quota.reserve(), 90)
+
+
+    def test_acquire_waits_for_window(self):
+        quota = self.quota(limit=1, window=100, priority='high')
+        quota.acquire()
+        quota.acquire()
+        self.assertEqual(self.time.sleeps, [100])
+
+
+    def test_max_wait(self):
+        quota = self.quota(limit=1, window=100, priority='high', max_wait=10)
+        quota.acquire()
+        self.assertRaises(RateLimitExceeded, quota.acquire)
+
+
+    def test_shared_between_instances(self):
+        a = self.quota(limit=2, priority='high')
+        b = self.quota(limit=2, priority='high')
+        a.reserve()
+        b.reserve()
+        self.assertTrue(a.reserve() > 0)
+        self.assertEqual(b.remaining(), 0)
+
+
+    def test_priorities(self):
+        low = self.quota(limit=10, priority='low')
+        high = self.quota(limit=10, priority='high')
+        reserved = 0
+        while low.reserve() == 0:
+            reserved += 1
+        self.assertEqual(reserved, 5)
+        self.assertEqual(high.remaining(), 5)
+        self.assertEqual(high.reserve(), 0)
+
+
+    def test_unknown_priority(self):
+        self.assertRaises(ValueError, self.quota, priority='urgent')
+
+
+    def test_default_file_in_etsy_home(self):
+        quota = SharedQuota()
+        MockAPI('apikey', method_cache=None, quota=quota)
+        self.assertEqual(quota.filename, os.path.join(self.scratch_dir, 'quota.v1.sqlite'))
+
+
+    def test_api_reserves_before_sending(self):
+        quota = self.quota(limit=2, priority='high')
+        api = MockAPI('apikey', method_cache=None, quota=quota)
+        api.testMethod(test_id=1)
+        self.assertEqual(quota.remaining(), 1)
+
+
+    def test_processes_share_budget(self):
+        filename = os.path.join(self.scratch_dir, 'quota.sqlite')
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=reserve_until_empty,
+                                           args=(filename, 50, results))
+                   for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        self.assertEqual(sum(results.get() for _ in workers), 50)
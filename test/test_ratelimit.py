@@ -0,0 +1,110 @@
+import threading
+
+from etsy2._ratelimit import RateLimiter, RateLimitExceeded
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class FakeTime(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+
+class HeaderAPI(MockAPI):
+    headers = {}
+
+    def _get_url(self, url, http_method, data):
+        response = MockResponse()
+        response.headers = self.headers
+        return response
+
+
+
+class RateLimiterTests(Test):
+    def limiter(self, **kwargs):
+        self.time = FakeTime()
+        return RateLimiter(clock=self.time.clock, sleep=self.time.sleep, **kwargs)
+
+
+    def test_burst_up_to_per_second(self):
+        limiter = self.limiter(per_second=5)
+        for _ in range(5):
+            limiter.acquire()
+        self.assertEqual(self.time.sleeps, [])
+
+
+    def test_waits_once_bucket_empty(self):
+        limiter = self.limiter(per_second=5)
+        for _ in range(7):
+            limiter.acquire()
+        self.assertEqual(len(self.time.sleeps), 2)
+        self.assertAlmostEqual(self.time.now, 0.4)
+
+
+    def test_queued_callers_spread_out(self):
+        limiter = self.limiter(per_second=2)
+        waits = [limiter.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0, 0, 0.5, 1.0, 1.5])
+
+
+    def test_per_day_budget(self):
+        limiter = self.limiter(per_second=100, per_day=2)
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(limiter.remaining, 0)
+        limiter.acquire()
+        self.assertAlmostEqual(self.time.sleeps[0], 86400 / 2.0)
+
+
+    def test_max_wait(self):
+        limiter = self.limiter(per_second=1, max_wait=0.5)
+        limiter.acquire()
+        self.assertRaises(RateLimitExceeded, limiter.acquire)
+        self.time.now += 1
+        limiter.acquire()
+
+
+    def test_headers_adjust_daily_budget(self):
+        limiter = self.limiter(per_day=10000)
+        limiter.update({'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '3'})
+        self.assertEqual(limiter.remaining, 3)
+        self.assertEqual(limiter.day.capacity, 5000)
+
+
+    def test_shared_between_threads(self):
+        limiter = self.limiter(per_second=10)
+        lock = threading.Lock()
+        waits = []
+
+        def worker():
+            for _ in range(5):
+                w = limiter.reserve()
+                with lock:
+                    waits.append(w)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([round(w, 6) for w in sorted(waits)],
+                         [0] * 10 + [round(0.1 * i, 6) for i in range(1, 11)])
+
+
+    def test_api_uses_limiter(self):
+        limiter = self.limiter(per_second=1)
+        api = HeaderAPI('apikey', method_cache=None, rate_limiter=limiter)
+        api.headers = {'X-RateLimit-Remaining': '42'}
+        api.testMethod(test_id=1)
+        api.testMethod(test_id=1)
+        self.assertEqual(self.time.sleeps, [1.0])
+        self.assertEqual(limiter.remaining, 42)
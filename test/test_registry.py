@@ -0,0 +1,75 @@
+from etsy2 import _registry
+from .test_core import MockAPI
+from .util import Test
+
+
+class SubmitTrackingAPI(MockAPI):
+    def get_method_table(self, *args):
+        return [{'name': 'submitTracking',
+                 'uri': '/shops/:shop_id/receipts/:receipt_id/tracking',
+                 'http_method': 'POST',
+                 'params': {'shop_id': 'int', 'receipt_id': 'string',
+                            'tracking_code': 'string'},
+                 'type': 'Receipt',
+                 'description': 'Submits tracking information.'}]
+
+
+
+class MethodRegistryTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        _registry.clear()
+
+
+    def test_instances_share_method_table(self):
+        a = MockAPI('key')
+        b = MockAPI('key')
+        self.assertTrue(a.method_table is b.method_table)
+        self.assertTrue(a._methods['testMethod'] is b._methods['testMethod'])
+
+
+    def test_table_parsed_once(self):
+        MockAPI('key')
+        MockAPI('key')
+        loads = []
+        table = _registry.get_table(MockAPI.api_url, MockAPI.api_version,
+                                    MockAPI('key').method_table.digest,
+                                    lambda: loads.append(1))
+        self.assertEqual(loads, [])
+        self.assertEqual(len(table), 2)
+
+
+    def test_uncached_instances_share_table(self):
+        a = MockAPI('key', method_cache=None)
+        b = MockAPI('key', method_cache=None)
+        self.assertTrue(a.method_table is b.method_table)
+
+
+    def test_different_versions_not_shared(self):
+        class MockAPI2(MockAPI):
+            api_version = 'v3'
+
+        self.assertFalse(MockAPI('key', method_cache=None).method_table is
+                         MockAPI2('key', method_cache=None).method_table)
+
+
+    def test_specs_are_read_only(self):
+        spec = MockAPI('key').testMethod.spec
+
+        def assign(mapping, key, value):
+            mapping[key] = value
+
+        self.assertRaises(TypeError, assign, spec, 'uri', '/')
+        self.assertRaises(TypeError, assign, spec['params'], 'limit', 'string')
+
+
+    def test_submit_tracking_patched(self):
+        params = SubmitTrackingAPI('key', method_cache=None).submitTracking.spec['params']
+        self.assertEqual(params['shop_id'], 'shop_id_or_name')
+        self.assertEqual(params['receipt_id'], 'int')
+
+
+    def test_patch_does_not_modify_input(self):
+        spec = SubmitTrackingAPI.get_method_table(None)[0]
+        _registry.patch_spec(spec)
+        self.assertEqual(spec['params']['shop_id'], 'int')
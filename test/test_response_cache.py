@@ -0,0 +1,132 @@
+from etsy2._core import missing
+from etsy2._response_cache import ResponseCache, resource
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class Clock(object):
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+
+class CountingAPI(MockAPI):
+    def get_method_table(self, *args):
+        return MockAPI.get_method_table(self) + [
+            {'name': 'updateTest',
+             'uri': '/test/:test_id',
+             'http_method': 'PUT',
+             'params': {'test_id': 'int', 'kind': 'string'},
+             'type': 'int',
+             'description': 'mutates a test.'}]
+
+
+    def _get_url(self, url, http_method, data):
+        self.calls.append((http_method, url))
+        return MockResponse()
+
+
+
+class ResponseCacheTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.clock = Clock()
+        self.cache = ResponseCache(default_ttl=10, ttls={'method2': 0},
+                                   clock=self.clock)
+        self.api = self.make_api()
+
+
+    def make_api(self, api_key='apikey'):
+        api = CountingAPI(api_key, method_cache=None, response_cache=self.cache)
+        api.calls = []
+        return api
+
+
+    def test_repeated_call_served_from_cache(self):
+        self.assertEqual(self.api.testMethod(test_id=1, limit=2), [1, 2])
+        self.assertEqual(self.api.testMethod(test_id=1, limit=2), [1, 2])
+        self.assertEqual(len(self.api.calls), 1)
+        self.assertEqual(self.api.count, 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+    def test_params_are_part_of_key(self):
+        self.api.testMethod(test_id=1, limit=2)
+        self.api.testMethod(test_id=1, limit=3)
+        self.api.testMethod(test_id=2, limit=2)
+        self.assertEqual(len(self.api.calls), 3)
+
+
+    def test_param_order_does_not_matter(self):
+        self.api.testMethod(test_id=1, limit=2, offset=0)
+        self.api.testMethod(offset=0, limit=2, test_id=1)
+        self.assertEqual(len(self.api.calls), 1)
+
+
+    def test_identity_is_part_of_key(self):
+        other = self.make_api('otherkey')
+        self.api.testMethod(test_id=1)
+        other.testMethod(test_id=1)
+        self.assertEqual(len(other.calls), 1)
+
+
+    def test_entries_expire(self):
+        self.api.testMethod(test_id=1)
+        self.clock.now += 11
+        self.api.testMethod(test_id=1)
+        self.assertEqual(len(self.api.calls), 2)
+
+
+    def test_zero_ttl_disables_caching(self):
+        self.api.method2()
+        self.api.method2()
+        self.assertEqual(len(self.api.calls), 2)
+
+
+    def test_mutation_invalidates_resource(self):
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=2)
+        self.api.updateTest(test_id=1, kind='x')
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=2)
+        self.assertEqual([c[0] for c in self.api.calls], ['GET', 'GET', 'PUT', 'GET'])
+        self.assertEqual(self.cache.invalidations, 1)
+
+
+    def test_lru_eviction(self):
+        entry_size = len(MockResponse.text)
+        self.cache.max_bytes = entry_size * 2
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=2)
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=3)
+        self.assertEqual(self.cache.evictions, 1)
+        self.api.testMethod(test_id=1)
+        self.assertEqual(len(self.api.calls), 3)
+        self.api.testMethod(test_id=2)
+        self.assertEqual(len(self.api.calls), 4)
+
+
+    def test_size_is_response_body_length(self):
+        self.api.testMethod(test_id=1)
+        self.assertEqual(self.cache.size, len(MockResponse.text))
+        self.cache.set(('testMethod', (), None), {'results': []}, '/test', size=5000)
+        self.assertEqual(self.cache.size, len(MockResponse.text) + 5000)
+
+
+    def test_stats(self):
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+
+    def test_get_missing(self):
+        self.assertTrue(self.cache.get(('x', (), None)) is missing)
+
+
+    def test_resource(self):
+        self.assertEqual(resource('/listings/1/images?x=1'), '/listings/1')
+        self.assertEqual(resource('/listings'), '/listings')
@@ -0,0 +1,127 @@
+import requests
+
+from etsy2._retry import RetryPolicy
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class FlakyAPI(MockAPI):
+    def get_method_table(self, *args):
+        return MockAPI.get_method_table(self) + [
+            {'name': 'createTest',
+             'uri': '/test',
+             'http_method': 'POST',
+             'params': {'kind': 'string'},
+             'type': 'int',
+             'description': 'creates a test.'}]
+
+
+    def _get_url(self, url, http_method, data):
+        self.sent += 1
+        failure = self.failures.pop(0) if self.failures else None
+        if isinstance(failure, Exception):
+            raise failure
+        if failure is not None:
+            response = MockResponse('Service Unavailable')
+            response.status_code, response.headers = failure
+            response.url = url
+            return response
+        return MockResponse()
+
+
+
+class RetryPolicyTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.sleeps = []
+        self.policy = RetryPolicy(backoff=1, jitter=False, sleep=self.sleeps.append)
+        self.api = FlakyAPI('apikey', method_cache=None, retry_policy=self.policy)
+        self.api.sent = 0
+
+
+    def fail_with(self, *failures):
+        self.api.failures = list(failures)
+
+
+    def test_retries_server_errors(self):
+        self.fail_with((503, {}), (502, {}))
+        self.assertEqual(self.api.testMethod(test_id=1), [1, 2])
+        self.assertEqual(self.api.sent, 3)
+        self.assertEqual(self.sleeps, [1, 2])
+
+
+    def test_retries_network_errors(self):
+        self.fail_with(requests.ConnectionError('reset'))
+        self.assertEqual(self.api.testMethod(test_id=1), [1, 2])
+        self.assertEqual(self.api.sent, 2)
+
+
+    def test_gives_up_after_max_attempts(self):
+        self.fail_with((503, {}), (503, {}), (503, {}))
+        self.assertRaises(ValueError, self.api.testMethod, test_id=1)
+        self.assertEqual(self.api.sent, 3)
+
+
+    def test_network_error_raised_after_max_attempts(self):
+        self.fail_with(*[requests.Timeout('slow')] * 3)
+        self.assertRaises(requests.Timeout, self.api.testMethod, test_id=1)
+
+
+    def test_client_errors_not_retried(self):
+        self.fail_with((400, {}))
+        self.assertRaises(ValueError, self.api.testMethod, test_id=1)
+        self.assertEqual(self.api.sent, 1)
+
+
+    def test_post_not_retried_by_default(self):
+        self.fail_with((503, {}))
+        self.assertRaises(ValueError, self.api.createTest, kind='x')
+        self.assertEqual(self.api.sent, 1)
+
+
+    def test_retry_after_seconds(self):
+        self.fail_with((429, {'Retry-After': '7'}))
+        self.api.testMethod(test_id=1)
+        self.assertEqual(self.sleeps, [7])
+
+
+    def test_retry_after_date(self):
+        policy = RetryPolicy(clock=lambda: 784111777.0)
+        response = MockResponse()
+        response.headers = {'Retry-After': 'Sun, 06 Nov 1994 08:49:47 GMT'}
+        self.assertEqual(policy.retry_after(response), 10)
+
+
+    def test_long_retry_after_not_honored(self):
+        self.fail_with((429, {'Retry-After': '3600'}))
+        self.assertRaises(ValueError, self.api.testMethod, test_id=1)
+        self.assertEqual(self.api.sent, 1)
+
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff=4, random=lambda: 0.25)
+        self.assertEqual(policy.retry_delay('GET', 'm', 2, None), 2)
+
+
+    def test_backoff_capped(self):
+        policy = RetryPolicy(backoff=4, max_backoff=5, jitter=False, max_attempts=10)
+        self.assertEqual(policy.retry_delay('GET', 'm', 6, None), 5)
+
+
+    def test_budget_limits_retry_storm(self):
+        self.policy.budget_max = 2
+        self.policy.max_attempts = 2
+        for _ in range(5):
+            self.fail_with((503, {}), (503, {}))
+            self.assertRaises(ValueError, self.api.testMethod, test_id=1)
+        # two retries saved up, then only the first attempt of each call
+        self.assertEqual(self.api.sent, 5 + 2)
+        self.assertEqual(self.policy.exhausted, 3)
+
+
+    def test_budget_is_per_method(self):
+        self.policy.budget_max = 1
+        self.fail_with((503, {}), (503, {}), (503, {}))
+        self.assertRaises(ValueError, self.api.testMethod, test_id=1)
+        self.fail_with((503, {}))
+        self.assertEqual(self.api.method2(), [1, 2])
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+from etsy2 import SingleFlight
+from .test_core import MockAPI, MockResponse
+from .util import Test
+
+
+class GatedAPI(MockAPI):
+    def _get_url(self, url, http_method, data):
+        with self.lock:
+            self.urls.append(url)
+        self.release.wait(5)
+        if 'fail' in url:
+            raise IOError('connection reset')
+        return MockResponse()
+
+
+
+class SingleFlightTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.flight = SingleFlight()
+        self.api = GatedAPI('apikey', method_cache=None, single_flight=self.flight)
+        self.api.urls = []
+        self.api.lock = threading.Lock()
+        self.api.release = threading.Event()
+
+
+    def call_concurrently(self, n, **kwargs):
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                results.append(self.api.testMethod.fetch(**kwargs))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(n)]
+        for t in threads:
+            t.start()
+        deadline = time.time() + 5
+        while self.flight.shared < n - 1 and time.time() < deadline:
+            time.sleep(0.001)
+        self.api.release.set()
+        for t in threads:
+            t.join()
+        return results, errors
+
+
+    def test_identical_requests_share_one_call(self):
+        results, errors = self.call_concurrently(10, test_id=1)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.api.urls), 1)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(sorted(r.shared for r in results), [False] + [True] * 9)
+        for r in results:
+            self.assertEqual(r.results, [1, 2])
+            self.assertEqual(r.count, 2)
+            self.assertEqual(r.url, 'http://host/test/1?api_key=apikey')
+
+
+    def test_errors_shared(self):
+        results, errors = self.call_concurrently(5, test_id='fail')
+        self.assertEqual(len(self.api.urls), 1)
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(all(isinstance(e, IOError) for e in errors))
+
+
+    def test_nothing_kept_after_call(self):
+        self.api.release.set()
+        self.api.testMethod(test_id=1)
+        self.api.testMethod(test_id=1)
+        self.assertEqual(len(self.api.urls), 2)
+        self.assertEqual(self.flight.shared, 0)
+
+
+    def test_do(self):
+        self.assertEqual(self.flight.do('k', lambda: 5), (5, False))
+
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 7
+
+        async def run():
+            leader = asyncio.ensure_future(
+                asyncio.wait_for(self.flight.do_async('k', fn), 0.02))
+            while not self.flight._futures:
+                await asyncio.sleep(0)
+            return await asyncio.gather(leader, self.flight.do_async('k', fn),
+                                        return_exceptions=True)
+
+        loop = asyncio.new_event_loop()
+        try:
+            timed_out, follower = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertTrue(isinstance(timed_out, asyncio.TimeoutError))
+        self.assertEqual(follower, (7, True))
+        self.assertEqual(calls, [1])
+        self.assertEqual(self.flight._futures, {})
+
+
+    def test_private_single_flight(self):
+        api = MockAPI('apikey', method_cache=None, single_flight=True)
+        self.assertTrue(isinstance(api.single_flight, SingleFlight))
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+
+from etsy2 import _snapshot
+from etsy2._core import APIMethod
+from .test_core import MockAPI, MockLog
+from .util import Test
+
+
+SNAPSHOT_METHODS = [{'name': 'snapshotMethod',
+                     'uri': '/snapshot/:id',
+                     'http_method': 'GET',
+                     'params': {'id': 'int'},
+                     'type': 'int',
+                     'description': 'from the snapshot.'}]
+
+
+class CountingAPI(MockAPI):
+    downloads = 0
+
+    def get_method_table(self, *args):
+        CountingAPI.downloads += 1
+        return MockAPI.get_method_table(self)
+
+
+
+class SnapshotTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        CountingAPI.downloads = 0
+        self.snapshot = os.path.join(self.scratch_dir, 'methods.v1.json')
+        self.cache = os.path.join(self.scratch_dir, 'cache.json')
+        with open(self.snapshot, 'wb') as f:
+            f.write(_snapshot.encode(SNAPSHOT_METHODS, 'v1'))
+
+
+    def api(self, **kwargs):
+        kwargs.setdefault('method_cache', self.cache)
+        kwargs.setdefault('method_snapshot', self.snapshot)
+        return CountingAPI('apikey', **kwargs)
+
+
+    def test_snapshot_used_without_download(self):
+        api = self.api()
+        self.assertEqual(CountingAPI.downloads, 0)
+        self.assertTrue(api.method_cache.used_snapshot)
+        self.assertEqual(list(api.method_table.methods), ['snapshotMethod'])
+        self.assertFalse(os.path.exists(self.cache))
+
+
+    def test_fresh_cache_preferred(self):
+        self.api(method_snapshot=None)
+        api = self.api()
+        self.assertEqual(CountingAPI.downloads, 1)
+        self.assertFalse(api.method_cache.used_snapshot)
+        self.assertTrue('testMethod' in api.method_table.methods)
+
+
+    def test_snapshot_disabled(self):
+        self.api(method_snapshot=None)
+        self.assertEqual(CountingAPI.downloads, 1)
+
+
+    def test_missing_snapshot_downloads(self):
+        api = self.api(method_snapshot=os.path.join(self.scratch_dir, 'nope.json'))
+        self.assertEqual(CountingAPI.downloads, 1)
+        self.assertFalse(api.method_cache.used_snapshot)
+
+
+    def test_wrong_version_rejected(self):
+        with open(self.snapshot, 'wb') as f:
+            f.write(_snapshot.encode(SNAPSHOT_METHODS, 'v3'))
+        self.assertRaises(ValueError, self.api)
+
+
+    def test_logs_snapshot(self):
+        api = self.api(log=MockLog(self))
+        api.log.assertLine('Reading method table snapshot: %s' % self.snapshot)
+
+
+    def test_refresh_methods(self):
+        api = self.api()
+        self.assertTrue(isinstance(api.snapshotMethod, APIMethod))
+        table = api.refresh_methods()
+        self.assertTrue(api.method_table is table)
+        self.assertTrue('testMethod' in table.methods)
+        self.assertFalse(hasattr(api, 'snapshotMethod'))
+        self.assertTrue(os.path.exists(self.cache))
+
+
+    def test_revalidate_in_background(self):
+        api = self.api(revalidate_methods=True)
+        for t in threading.enumerate():
+            if t.name == 'etsy2-refresh-methods':
+                t.join(5)
+        self.assertEqual(CountingAPI.downloads, 1)
+        self.assertTrue('testMethod' in api.method_table.methods)
+
+
+    def test_background_errors_keep_table(self):
+        api = self.api(log=MockLog(self))
+
+        def fail():
+            raise IOError('etsy is down')
+
+        api.get_method_table = fail
+        api.refresh_methods(background=True).join(5)
+        self.assertEqual(list(api.method_table.methods), ['snapshotMethod'])
+        self.assertTrue(any('refresh_methods_failed' in str(l) for l in api.log.lines))
+
+
+    def test_write(self):
+        api = self.api(method_snapshot=None)
+        fn = _snapshot.write(api, os.path.join(self.scratch_dir, 'out.json'))
+        with open(fn, 'rb') as f:
+            raw = f.read()
+        self.assertEqual(json.loads(raw.decode('utf-8'))['api_version'], 'v1')
+        self.assertEqual(len(_snapshot.decode(raw, 'v1')), 2)
+
+
+    def test_no_snapshot_by_default(self):
+        api = CountingAPI('apikey', method_cache=self.cache)
+        self.assertEqual(CountingAPI.downloads, 1)
+        self.assertFalse(api.method_cache.used_snapshot)
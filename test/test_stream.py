@@ -0,0 +1,233 @@
+import asyncio
+import json
+
+from etsy2._core import API
+from etsy2._result import Result
+from etsy2._stream import ResultStream, AsyncResultStream
+from .test_core import MockAPI
+from .util import Test, StubServer
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+
+class ChunkedResponse(object):
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body, size):
+        self.body = body
+        self.size = size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.body, self.size))
+
+    def close(self):
+        self.closed = True
+
+
+
+class AsyncChunks(object):
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+
+
+class StreamAPI(MockAPI):
+    chunk = 7
+
+    def _get_url(self, url, http_method, data, stream=False):
+        self.streamed = stream
+        self.response = ChunkedResponse(self.body, self.chunk)
+        return self.response
+
+
+
+class ServerAPI(MockAPI):
+    def _get_url(self, url, http_method, data, stream=False):
+        return API._get_url(self, self.server.url + '/', http_method, data, stream)
+
+
+
+class ResultStreamTests(Test):
+    page = {'count': 3,
+            'results': [{'listing_id': 1, 'title': u'caf\xe9 ☕',
+                         'Images': [{'rank': 1}, {'rank': 2}]},
+                        {'listing_id': 22, 'price': '12.50'},
+                        1234567],
+            'params': {'limit': 3},
+            'type': 'Listing',
+            'pagination': {'next_offset': None}}
+
+
+    def stream(self, body, size):
+        result = Result('testMethod', 'GET', 'http://host/test', {})
+        return ResultStream(result, chunked(body, size))
+
+
+    def test_results_parsed_across_chunk_boundaries(self):
+        body = json.dumps(self.page, ensure_ascii=False, indent=1).encode('utf-8')
+        for size in (1, 2, 3, 5, 64, len(body)):
+            stream = self.stream(body, size)
+            self.assertEqual(list(stream), self.page['results'])
+            self.assertEqual(stream.count, 3)
+
+
+    def test_rest_of_response_kept_in_data(self):
+        body = json.dumps(self.page).encode('utf-8')
+        stream = self.stream(body, 10)
+        list(stream)
+        self.assertEqual(stream.result.data, {
+            'count': 3, 'params': {'limit': 3}, 'type': 'Listing',
+            'pagination': {'next_offset': None}})
+        self.assertEqual(stream.result.pagination, {'next_offset': None})
+
+
+    def test_count_known_before_results_parsed(self):
+        body = b'{"count": 50000, "results": [{"a": 1}, ' + b'x' * 1000
+        stream = self.stream(body, 4)
+        self.assertEqual(stream.count, 50000)
+        it = iter(stream)
+        self.assertEqual(next(it), {'a': 1})
+        self.assertRaises(ValueError, next, it)
+
+
+    def test_count_after_results(self):
+        stream = self.stream(b'{"results": [1, 2], "count": 2}', 3)
+        self.assertEqual(stream.count, None)
+        self.assertEqual(list(stream), [1, 2])
+        self.assertEqual(stream.count, 2)
+
+
+    def test_number_split_by_chunk(self):
+        for head, tail in ((b'-25000000000.', b'0, 2]}'), (b'1.5e', b'+3, 2]}'),
+                           (b'7', b'0, 2]}'), (b'-', b'1, 2]}')):
+            chunks = [b'{"count": 1, "results": [' + head, tail]
+            stream = ResultStream(Result('testMethod', 'GET', 'http://host/test', {}), chunks)
+            self.assertEqual(list(stream), [json.loads(head + tail[:tail.index(b',')]), 2])
+
+
+    def test_empty_results(self):
+        stream = self.stream(b'{"count":0,"results":[]}', 5)
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.count, 0)
+
+
+    def test_not_json(self):
+        stream = self.stream(b'Invalid API key', 4)
+        msg = self.assertRaises(ValueError, list, stream)
+        self.assertTrue('Could not decode response' in msg)
+
+
+    def test_truncated(self):
+        stream = self.stream(b'{"count": 2, "results": [1, ', 4)
+        self.assertRaises(ValueError, list, stream)
+
+
+
+class AsyncResultStreamTests(Test):
+    page = ResultStreamTests.page
+
+    def stream(self, body, size):
+        result = Result('testMethod', 'GET', 'http://host/test', {})
+        self.closed = []
+        return AsyncResultStream(result, AsyncChunks(chunked(body, size)),
+                                 lambda: self.closed.append(True))
+
+
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+
+    def read(self, stream):
+        async def read():
+            results = []
+            async for result in stream:
+                results.append(result)
+            return results
+        return self.run_async(read())
+
+
+    def test_results_parsed_across_chunk_boundaries(self):
+        body = json.dumps(self.page, ensure_ascii=False, indent=1).encode('utf-8')
+        for size in (1, 2, 3, 5, 64, len(body)):
+            stream = self.stream(body, size)
+            self.assertEqual(self.read(stream), self.page['results'])
+            self.assertEqual(stream.result.count, 3)
+            self.assertEqual(stream.result.data['pagination'], {'next_offset': None})
+            self.assertEqual(self.closed, [True])
+
+
+    def test_count_known_before_results_parsed(self):
+        body = b'{"count": 50000, "results": [{"a": 1}, ' + b'x' * 1000
+        stream = self.stream(body, 4)
+        self.assertEqual(self.run_async(stream.count), 50000)
+        self.assertEqual(self.run_async(stream.__anext__()), {'a': 1})
+        self.assertRaises(ValueError, self.run_async, stream.__anext__())
+        self.assertEqual(self.closed, [True])
+
+
+    def test_truncated(self):
+        stream = self.stream(b'{"count": 2, "results": [1, ', 4)
+        self.assertRaises(ValueError, self.read, stream)
+
+
+    def test_not_iterable_without_await(self):
+        self.assertRaises(TypeError, iter, self.stream(b'{}', 1))
+
+
+
+class StreamMethodTests(Test):
+    def setUp(self):
+        Test.setUp(self)
+        self.api = StreamAPI('apikey', method_cache=None)
+        self.api.body = b'{"count": 2, "results": [{"id": 1}, {"id": 2}], "type": "int"}'
+
+
+    def test_stream_yields_results(self):
+        stream = self.api.testMethod.stream(test_id=1, limit=2)
+        self.assertTrue(self.api.streamed)
+        self.assertEqual(stream.count, 2)
+        self.assertEqual(self.api.count, 2)
+        self.assertEqual(list(stream), [{'id': 1}, {'id': 2}])
+        self.assertTrue(self.api.response.closed)
+        self.assertEqual(stream.result.params, {'test_id': 1, 'limit': 2})
+
+
+    def test_close_releases_connection(self):
+        with self.api.testMethod.stream(test_id=1) as stream:
+            next(iter(stream))
+        self.assertTrue(self.api.response.closed)
+
+
+    def test_stream_validates_params(self):
+        self.assertRaises(ValueError, self.api.testMethod.stream, test_id=1, fizz='goo')
+
+
+    def test_stream_over_http(self):
+        results = [{'listing_id': i, 'description': 'x' * 500} for i in range(500)]
+        body = json.dumps({'count': 500, 'results': results}).encode('utf-8')
+        with StubServer(body) as server:
+            api = ServerAPI('apikey', method_cache=None, timeout=5)
+            api.server = server
+            stream = api.testMethod.stream(test_id=1)
+            self.assertEqual(stream.count, 500)
+            self.assertEqual(list(stream), results)
+            api.close()
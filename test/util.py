@@ -31,3 +31,63 @@ class Test(TestCase):
         else:
             name = cls.__name__ if hasattr(cls, '__name__') else str(cls)
             raise self.failureException("%s not raised" % name)
+
+
+
+class StubServer(object):
+    """
+    A keep-alive HTTP server on localhost that answers every request with
+    the same JSON body. Runs on a background thread; use as a context
+    manager.
+    """
+    body = b'{"count": 2, "results": [1, 2]}'
+
+    def __init__(self, body=None):
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from socketserver import ThreadingMixIn
+        import threading
+
+        stub = self
+        self.body = body or self.body
+        self.requests = []
+        self.connections = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                stub.connections += 1
+
+            def respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = self.rfile.read(length) if length else b''
+                stub.requests.append((self.command, self.path, self.headers, payload))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(stub.body)))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = respond
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.05})
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()